@@ -0,0 +1,48 @@
+from hashlib import sha256
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+
+from .cache_stats import CacheStats
+
+TOKEN_KEY = 'auth:token:{}'
+token_stats = CacheStats('auth_tokens')
+
+
+def get_token_cache_key(key):
+    """Ключ кеша для токена. Сам токен в ключ не попадает."""
+
+    return TOKEN_KEY.format(sha256(key.encode()).hexdigest())
+
+
+def invalidate_token(key):
+    """Удаляет токен и его пользователя из кеша."""
+
+    cache.delete(get_token_cache_key(key))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Авторизация по токену с кешированием пользователя.
+
+    Токен вместе с пользователем хранится в кеше Django
+    AUTH_TOKEN_CACHE_TIMEOUT секунд, поэтому запрос с тёплым токеном
+    не обращается к БД. Запись удаляется при выходе, изменении или
+    деактивации пользователя (см. api.signals).
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = get_token_cache_key(key)
+        token = cache.get(cache_key)
+        if token is None:
+            token_stats.record(misses=1)
+            user, token = super().authenticate_credentials(key)
+            cache.set(cache_key, token, settings.AUTH_TOKEN_CACHE_TIMEOUT)
+            return user, token
+
+        token_stats.record(hits=1)
+        if not token.user.is_active:
+            raise AuthenticationFailed('User inactive or deleted.')
+        return token.user, token
@@ -0,0 +1,489 @@
+import asyncio
+import json
+import math
+import re
+from collections import defaultdict, namedtuple
+from itertools import accumulate
+from time import perf_counter
+from urllib.parse import quote
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Q
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from recipes.models import (AmountIngredientRecipe, Favorite, Ingredient,
+                            Recipe, ShoppingCart, Tag)
+from rest_framework.authtoken.models import Token
+
+User = get_user_model()
+
+Request = namedtuple(
+    'Request', 'method path body on_success', defaults=(None, None)
+)
+Endpoint = namedtuple('Endpoint', 'name weight make_request')
+
+PERCENTILES = (50, 95, 99)
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAA'
+    'DUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=='
+)
+SERVER_TIMING_DB = re.compile(r'\bdb;desc="(\d+) queries";dur=([\d.]+)')
+TOGGLE_CANDIDATES = 50
+OWN_RECIPES = 5
+
+
+class Dataset:
+    """Данные из БД, общие для всех виртуальных пользователей."""
+
+    def __init__(self, rnd, recipes=1000):
+        recipe_ids = list(
+            Recipe.objects.order_by('pk').values_list('pk', flat=True)
+        )
+        self.recipe_ids = rnd.sample(
+            recipe_ids, min(recipes, len(recipe_ids))
+        )
+        self.tag_ids = list(Tag.objects.values_list('pk', flat=True))
+        self.tag_slugs = list(Tag.objects.values_list('slug', flat=True))
+        ingredients = list(
+            Ingredient.objects.order_by('pk').values_list('pk', 'name')
+        )
+        self.ingredient_ids = [pk for pk, _ in ingredients]
+        self.prefixes = sorted({
+            name[:rnd.randint(1, 3)].lower()
+            for _, name in rnd.sample(ingredients, min(50, len(ingredients)))
+        })
+
+
+class Session:
+    """
+    Виртуальный пользователь, от имени которого идут запросы.
+
+    Хранит рецепты, которые он добавил в избранное и корзину и создал во
+    время замера, чтобы запросы не конфликтовали и всё добавленное можно
+    было удалить после замера.
+    """
+
+    def __init__(self, rnd, dataset, user=None):
+        self.rnd = rnd
+        self.dataset = dataset
+        self.user = user
+        self.headers = {}
+        self.candidates = []
+        self.own_recipes = {}
+        self.toggled = {'favorite': set(), 'shopping_cart': set()}
+        self.created = []
+        if user is not None:
+            token, _ = Token.objects.get_or_create(user=user)
+            self.headers['Authorization'] = f'Token {token.key}'
+            self.load_user_data()
+
+    def load_user_data(self):
+        """Выбирает рецепты для переключения и рецепты пользователя."""
+
+        listed = set(Recipe.objects.filter(
+            Q(favorite__user=self.user) | Q(shoppingcart__user=self.user)
+        ).values_list('pk', flat=True))
+        self.candidates = [
+            pk for pk in self.dataset.recipe_ids if pk not in listed
+        ][:TOGGLE_CANDIDATES]
+        recipes = Recipe.objects.filter(author=self.user).order_by(
+            'pk'
+        ).prefetch_related('tags')[:OWN_RECIPES]
+        for recipe in recipes:
+            self.own_recipes[recipe.pk] = {
+                'name': recipe.name,
+                'text': recipe.text,
+                'cooking_time': recipe.cooking_time,
+                'tags': [tag.pk for tag in recipe.tags.all()],
+                'ingredients': [
+                    {'id': ingredient_id, 'amount': amount}
+                    for ingredient_id, amount
+                    in AmountIngredientRecipe.objects.filter(
+                        recipe=recipe
+                    ).values_list('ingredient_id', 'amount')
+                ],
+            }
+
+    def cleanup(self):
+        """Удаляет всё, что пользователь добавил и создал во время замера."""
+
+        for kind, model in (('favorite', Favorite),
+                            ('shopping_cart', ShoppingCart)):
+            for item in model.objects.filter(
+                user=self.user, recipe_id__in=self.toggled[kind]
+            ):
+                item.delete()
+            self.toggled[kind].clear()
+        for recipe in Recipe.objects.filter(pk__in=self.created):
+            recipe.delete()
+        self.created.clear()
+
+
+def recipes_list(session):
+    return Request('GET', f'/api/recipes/?page={session.rnd.randint(1, 5)}')
+
+
+def recipes_by_tags(session):
+    slugs = session.rnd.sample(
+        session.dataset.tag_slugs, min(2, len(session.dataset.tag_slugs))
+    )
+    return Request(
+        'GET', '/api/recipes/?' + '&'.join(f'tags={slug}' for slug in slugs)
+    )
+
+
+def recipes_favorited(session):
+    return Request('GET', '/api/recipes/?is_favorited=1')
+
+
+def recipes_in_cart(session):
+    return Request('GET', '/api/recipes/?is_in_shopping_cart=1')
+
+
+def recipes_detail(session):
+    pk = session.rnd.choice(session.dataset.recipe_ids)
+    return Request('GET', f'/api/recipes/{pk}/')
+
+
+def tags_list(session):
+    return Request('GET', '/api/tags/')
+
+
+def ingredients_search(session):
+    prefix = session.rnd.choice(session.dataset.prefixes)
+    return Request('GET', f'/api/ingredients/?name={quote(prefix)}')
+
+
+def subscriptions(session):
+    return Request('GET', '/api/users/subscriptions/?recipes_limit=3')
+
+
+def make_toggle(kind):
+    """
+    Запрос, который добавляет рецепт в список или убирает из него.
+
+    Состояние списка меняется только после успешного ответа, поэтому
+    запросы не получают 400 из-за повторного добавления.
+    """
+
+    def toggle(session):
+        pk = session.rnd.choice(session.candidates)
+        added = session.toggled[kind]
+        path = f'/api/recipes/{pk}/{kind}/'
+        if pk in added:
+            return Request('DELETE', path,
+                           on_success=lambda content: added.discard(pk))
+        return Request('POST', path, on_success=lambda content: added.add(pk))
+
+    return toggle
+
+
+def recipe_create(session):
+    rnd = session.rnd
+    dataset = session.dataset
+    body = {
+        'name': f'bench {rnd.randrange(10 ** 6)}',
+        'text': 'Рецепт для нагрузочного теста',
+        'cooking_time': rnd.randint(5, 120),
+        'image': IMAGE,
+        'tags': rnd.sample(dataset.tag_ids, 1),
+        'ingredients': [
+            {'id': pk, 'amount': rnd.randint(1, 500)}
+            for pk in rnd.sample(dataset.ingredient_ids, rnd.randint(2, 10))
+        ],
+    }
+    return Request(
+        'POST', '/api/recipes/', body,
+        on_success=lambda content: session.created.append(
+            json.loads(content)['id']
+        )
+    )
+
+
+def recipe_update(session):
+    """Сохраняет рецепт пользователя с теми же данными."""
+
+    pk = session.rnd.choice(list(session.own_recipes))
+    return Request('PATCH', f'/api/recipes/{pk}/', session.own_recipes[pk])
+
+
+def download_shopping_cart(session):
+    return Request('GET', '/api/recipes/download_shopping_cart/')
+
+
+SCENARIOS = {
+    'read': (
+        Endpoint('recipes-list', 1, recipes_list),
+        Endpoint('recipes-detail', 1, recipes_detail),
+        Endpoint('tags-list', 1, tags_list),
+        Endpoint('ingredients-search', 1, ingredients_search),
+        Endpoint('users-subscriptions', 1, subscriptions),
+    ),
+    'mixed': (
+        Endpoint('recipes-list', 20, recipes_list),
+        Endpoint('recipes-list-tags', 10, recipes_by_tags),
+        Endpoint('recipes-list-favorited', 5, recipes_favorited),
+        Endpoint('recipes-list-in-cart', 3, recipes_in_cart),
+        Endpoint('recipes-detail', 20, recipes_detail),
+        Endpoint('ingredients-search', 10, ingredients_search),
+        Endpoint('users-subscriptions', 5, subscriptions),
+        Endpoint('favorite-toggle', 8, make_toggle('favorite')),
+        Endpoint('shopping-cart-toggle', 5, make_toggle('shopping_cart')),
+        Endpoint('recipe-create', 2, recipe_create),
+        Endpoint('recipe-update', 2, recipe_update),
+        Endpoint('download-shopping-cart', 2, download_shopping_cart),
+    ),
+}
+
+
+def get_endpoints(scenario, authenticated):
+    """Эндпоинты сценария, доступные пользователю."""
+
+    anonymous = {
+        'recipes-list', 'recipes-list-tags', 'recipes-detail', 'tags-list',
+        'ingredients-search',
+    }
+    return [
+        endpoint for endpoint in SCENARIOS[scenario]
+        if authenticated or endpoint.name in anonymous
+    ]
+
+
+def get_users(prefix, count):
+    """
+    Пользователи для сценария с записью.
+
+    Нужны авторы с непустой корзиной, чтобы работали обновление
+    рецепта и скачивание списка покупок.
+    """
+
+    return list(User.objects.filter(
+        username__startswith=prefix,
+        is_active=True,
+        recipes_count__gt=0,
+        shoppingcart__isnull=False,
+    ).distinct().order_by('pk')[:count])
+
+
+class Connection:
+    """Минимальный клиент HTTP/1.1 с keep-alive поверх asyncio."""
+
+    def __init__(self, host, port, headers):
+        self.host = host
+        self.port = port
+        self.headers = headers
+        self.reader = self.writer = None
+
+    async def request(self, method, path, body=b''):
+        """
+        Выполняет запрос и читает ответ целиком.
+
+        :return: Код ответа, заголовки и тело ответа.
+        """
+
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(
+                self.host, self.port
+            )
+        lines = [f'{method} {path} HTTP/1.1', f'Host: {self.host}']
+        lines += [f'{name}: {value}' for name, value in self.headers.items()]
+        if body:
+            lines += ['Content-Type: application/json',
+                      f'Content-Length: {len(body)}']
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode() + body)
+        await self.writer.drain()
+
+        status = int((await self.reader.readline()).split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b'\r\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        if method == 'HEAD' or status in (204, 304):
+            content = b''
+        elif 'content-length' in headers:
+            content = await self.reader.readexactly(
+                int(headers['content-length'])
+            )
+        elif headers.get('transfer-encoding') == 'chunked':
+            content = await self.read_chunked()
+        else:
+            content = await self.reader.read()
+            headers['connection'] = 'close'
+        if headers.get('connection', '').lower() == 'close':
+            self.close()
+        return status, headers, content
+
+    async def read_chunked(self):
+        chunks = []
+        while True:
+            size = int((await self.reader.readline()).split(b';')[0], 16)
+            if not size:
+                await self.reader.readline()
+                return b''.join(chunks)
+            chunks.append(await self.reader.readexactly(size))
+            await self.reader.readline()
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+def percentile(values, percent):
+    """Процентиль по методу ближайшего ранга для отсортированного списка."""
+
+    if not values:
+        return 0.0
+    return values[max(math.ceil(percent / 100 * len(values)) - 1, 0)]
+
+
+def parse_server_timing(value):
+    """
+    Данные о запросах к БД из заголовка Server-Timing.
+
+    :param value: Значение заголовка или пустая строка.
+    :return: Пара (количество запросов, время БД в мс) или None, если
+        сервер их не передал.
+    """
+
+    match = SERVER_TIMING_DB.search(value)
+    if match is None:
+        return None
+    return int(match[1]), float(match[2])
+
+
+def summarize(latencies, statuses, duration, timings=()):
+    """
+    Сводка по задержкам одного эндпоинта.
+
+    :param latencies: Задержки успешных запросов в секундах.
+    :param statuses: Счётчик кодов неуспешных ответов.
+    :param duration: Длительность замера в секундах.
+    :param timings: Пары (запросов к БД, время БД в мс) из заголовков
+        Server-Timing успешных ответов.
+    :return: Словарь с пропускной способностью и процентилями в мс.
+    """
+
+    latencies = sorted(latencies)
+    summary = {
+        'requests': len(latencies),
+        'errors': sum(statuses.values()),
+        'error_statuses': dict(sorted(statuses.items())),
+        'rps': round(len(latencies) / duration, 1),
+        'mean_ms': round(
+            sum(latencies) / len(latencies) * 1000 if latencies else 0.0, 2
+        ),
+    }
+    for percent in PERCENTILES:
+        summary[f'p{percent}_ms'] = round(
+            percentile(latencies, percent) * 1000, 2
+        )
+    if timings:
+        summary['db_queries_mean'] = round(
+            sum(queries for queries, _ in timings) / len(timings), 1
+        )
+        summary['db_mean_ms'] = round(
+            sum(db_time for _, db_time in timings) / len(timings), 2
+        )
+    return summary
+
+
+async def run_session(connection, session, endpoints, deadline, timeout,
+                      results):
+    """Выполняет запросы одного пользователя до истечения времени."""
+
+    loop = asyncio.get_running_loop()
+    cum_weights = list(accumulate(endpoint.weight for endpoint in endpoints))
+    while loop.time() < deadline:
+        endpoint = session.rnd.choices(endpoints, cum_weights=cum_weights)[0]
+        request = endpoint.make_request(session)
+        body = json.dumps(request.body).encode() if request.body else b''
+        result = results[endpoint.name]
+        start = perf_counter()
+        try:
+            status, headers, content = await asyncio.wait_for(
+                connection.request(request.method, request.path, body),
+                timeout
+            )
+        except asyncio.TimeoutError:
+            connection.close()
+            result['statuses']['timeout'] += 1
+            continue
+        except (OSError, asyncio.IncompleteReadError, ValueError,
+                IndexError):
+            connection.close()
+            result['statuses']['connection'] += 1
+            continue
+        if status >= 400:
+            result['statuses'][str(status)] += 1
+            continue
+        result['latencies'].append(perf_counter() - start)
+        timing = parse_server_timing(headers.get('server-timing', ''))
+        if timing:
+            result['timings'].append(timing)
+        if request.on_success:
+            request.on_success(content)
+    connection.close()
+
+
+async def run_load(host, port, sessions, endpoints, duration, timeout):
+    """
+    Нагружает сервер: одно постоянное соединение на пользователя.
+
+    :return: Словарь {название эндпоинта:
+        {'latencies', 'statuses', 'timings'}}.
+    """
+
+    results = defaultdict(
+        lambda: {'latencies': [], 'statuses': defaultdict(int),
+                 'timings': []}
+    )
+    deadline = asyncio.get_running_loop().time() + duration
+    await asyncio.gather(*(
+        run_session(
+            Connection(host, port, {'Accept': 'application/json',
+                                    **session.headers}),
+            session, endpoints, deadline, timeout, results
+        )
+        for session in sessions
+    ))
+    return results
+
+
+def count_queries(session, endpoints, repeats=2):
+    """
+    Считает запросы к БД для каждого эндпоинта.
+
+    Запросы выполняются в этом процессе через тестовый клиент Django,
+    поэтому сервер не нужно менять. Учитывается последний повтор, когда
+    кеши уже прогреты.
+
+    :return: Словарь {название эндпоинта: количество запросов}.
+    """
+
+    client = Client(
+        HTTP_ACCEPT='application/json',
+        **{f'HTTP_{name.upper()}': value
+           for name, value in session.headers.items()}
+    )
+    queries = {}
+    for endpoint in endpoints:
+        for _ in range(repeats):
+            request = endpoint.make_request(session)
+            with CaptureQueriesContext(connection) as context:
+                response = client.generic(
+                    request.method,
+                    request.path,
+                    json.dumps(request.body) if request.body else '',
+                    content_type='application/json'
+                )
+                content = response.getvalue()
+            if response.status_code < 400 and request.on_success:
+                request.on_success(content)
+        queries[endpoint.name] = len(context.captured_queries)
+    return queries
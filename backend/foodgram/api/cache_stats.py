@@ -0,0 +1,92 @@
+import threading
+import time
+
+from django.db.models import F
+
+from .models import CacheCounter
+
+
+class CacheStats:
+    """
+    Счётчики попаданий и промахов кеша.
+
+    Значения хранятся в БД, поэтому учитываются запросы всех процессов
+    и не теряются при вытеснении записей из кеша. Чтобы не писать в БД
+    на каждом запросе, процесс копит значения в памяти и добавляет их
+    одним UPDATE раз в flush_every записей или flush_interval секунд,
+    а также перед чтением счётчиков.
+    """
+
+    flush_every = 100
+    flush_interval = 10
+
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._records = 0
+        self._flushed_at = time.monotonic()
+
+    def record(self, hits=0, misses=0):
+        """Увеличивает счётчики на переданные значения."""
+
+        with self._lock:
+            self._hits += hits
+            self._misses += misses
+            self._records += 1
+            flush = (
+                self._records >= self.flush_every
+                or time.monotonic() - self._flushed_at >= self.flush_interval
+            )
+        if flush:
+            self.flush()
+
+    def flush(self):
+        """Добавляет накопленные процессом значения к счётчикам в БД."""
+
+        with self._lock:
+            hits, misses = self._hits, self._misses
+            self._hits = self._misses = self._records = 0
+            self._flushed_at = time.monotonic()
+        if not hits and not misses:
+            return
+        updated = CacheCounter.objects.filter(name=self.name).update(
+            hits=F('hits') + hits, misses=F('misses') + misses
+        )
+        if not updated:
+            _, created = CacheCounter.objects.get_or_create(
+                name=self.name, defaults={'hits': hits, 'misses': misses}
+            )
+            if not created:
+                CacheCounter.objects.filter(name=self.name).update(
+                    hits=F('hits') + hits, misses=F('misses') + misses
+                )
+
+    def get(self):
+        """
+        Текущие значения счётчиков.
+
+        Значения, которые другие процессы ещё не записали в БД,
+        не учитываются.
+
+        :return: Словарь с ключами hits, misses и hit_rate.
+        """
+
+        self.flush()
+        hits, misses = CacheCounter.objects.filter(
+            name=self.name
+        ).values_list('hits', 'misses').first() or (0, 0)
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / total if total else 0.0,
+        }
+
+    def reset(self):
+        """Обнуляет счётчики."""
+
+        with self._lock:
+            self._hits = self._misses = self._records = 0
+        CacheCounter.objects.filter(name=self.name).delete()
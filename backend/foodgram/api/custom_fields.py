@@ -2,6 +2,7 @@ import base64
 from time import time
 
 from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
 from rest_framework import serializers
 
 
@@ -16,3 +17,24 @@ class Base64ImageField(serializers.ImageField):
             )
 
         return super().to_internal_value(data)
+
+
+class ImageVariantsField(serializers.ReadOnlyField):
+    """
+    Ссылки на уменьшенные копии изображения.
+
+    Возвращает словарь {размер: {формат: url}}. Пока копии не созданы,
+    словарь пустой и клиент использует исходное изображение.
+    """
+
+    def to_representation(self, value):
+        request = self.context.get('request')
+        variants = {}
+        for size, formats in value.items():
+            variants[size] = {}
+            for image_format, name in formats.items():
+                url = default_storage.url(name)
+                if request is not None:
+                    url = request.build_absolute_uri(url)
+                variants[size][image_format] = url
+        return variants
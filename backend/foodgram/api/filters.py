@@ -1,11 +1,15 @@
 from django_filters import rest_framework as filters
+from recipes.catalog import get_tag_masks
 from recipes.models import Ingredient, Recipe
 
 
 class RecipeFilter(filters.FilterSet):
     """Класс для настройки фильтра рецептов"""
 
-    tags = filters.AllValuesMultipleFilter(field_name='tags__slug')
+    tags = filters.MultipleChoiceFilter(
+        choices=lambda: [(slug, slug) for slug in get_tag_masks()],
+        method='filter_tags',
+    )
     is_favorited = filters.BooleanFilter(
         field_name='favorite',
         method='filter_is_list'
@@ -14,6 +18,7 @@ class RecipeFilter(filters.FilterSet):
         field_name='shoppingcart',
         method='filter_is_list'
     )
+    search = filters.CharFilter(method='filter_search')
 
     class Meta:
         model = Recipe
@@ -21,7 +26,8 @@ class RecipeFilter(filters.FilterSet):
             'is_favorited',
             'author',
             'is_in_shopping_cart',
-            'tags'
+            'tags',
+            'search'
         ]
 
     def filter_is_list(self, queryset, name, value):
@@ -39,6 +45,38 @@ class RecipeFilter(filters.FilterSet):
         lookup = '__'.join([name, 'user'])
         return queryset.filter(**{lookup: self.request.user.id})
 
+    def filter_tags(self, queryset, name, value):
+        """
+        Фильтрует рецепты по slug тегов через маску тегов рецепта.
+
+        :param queryset: Кверисет рецептов.
+        :param name: Имя поля.
+        :param value: Список slug тегов.
+        :return: Рецепты, у которых есть хотя бы один из тегов.
+        """
+
+        if not value:
+            return queryset
+        tag_masks = get_tag_masks()
+        return queryset.filter_tags(
+            sum(tag_masks[slug] for slug in set(value))
+        )
+
+    def filter_search(self, queryset, name, value):
+        """
+        Полнотекстовый поиск по названию и тексту рецепта.
+
+        :param queryset: Кверисет рецептов.
+        :param name: Имя поля.
+        :param value: Строка поиска.
+        :return: Найденные рецепты, самые релевантные первыми.
+        """
+
+        value = value.strip()
+        if not value:
+            return queryset
+        return queryset.search(value)
+
 
 class IngredientFilter(filters.FilterSet):
     """Класс для настройки фильтра ингредиентов"""
@@ -0,0 +1,267 @@
+import asyncio
+import json
+import random
+import subprocess
+from collections import Counter
+from urllib.parse import urlsplit
+
+from api.benchmark import (SCENARIOS, Dataset, Session, count_queries,
+                           get_endpoints, get_users, run_load, summarize)
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+
+def get_commit():
+    """Текущий коммит git или None, если его не удалось определить."""
+
+    try:
+        return subprocess.run(
+            ('git', 'rev-parse', '--short', 'HEAD'),
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+            check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = ('Нагрузочный тест API по HTTP против запущенного сервера и '
+            'той же БД. Выводит rps, задержки p50/p95/p99 и количество '
+            'запросов к БД для каждого эндпоинта, сохраняет результат в '
+            'JSON и сравнивает его с предыдущим замером.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            default='http://127.0.0.1:8000',
+            help='Адрес сервера'
+        )
+        parser.add_argument(
+            '--scenario',
+            choices=sorted(SCENARIOS),
+            default='mixed',
+            help=('read — только чтение, mixed — чтение и запись в '
+                  'пропорциях реального использования')
+        )
+        parser.add_argument(
+            '--prefix',
+            default='synthetic',
+            help=('Префикс пользователей из seed_synthetic, от имени '
+                  'которых идут запросы')
+        )
+        parser.add_argument(
+            '--token',
+            help='Токен одного пользователя для всех соединений (read)'
+        )
+        parser.add_argument(
+            '--anonymous',
+            action='store_true',
+            help='Запросы без авторизации (read)'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=64,
+            help='Количество одновременных соединений и пользователей'
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=30,
+            help='Длительность замера, секунды'
+        )
+        parser.add_argument(
+            '--warmup',
+            type=float,
+            default=3,
+            help='Длительность прогрева перед замером, секунды'
+        )
+        parser.add_argument(
+            '--timeout',
+            type=float,
+            default=30,
+            help='Время ожидания одного ответа, секунды'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Зерно генератора случайных чисел'
+        )
+        parser.add_argument(
+            '--skip-queries',
+            action='store_true',
+            help='Не считать запросы к БД по эндпоинтам'
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл для сохранения результатов в JSON'
+        )
+        parser.add_argument(
+            '--compare',
+            help='JSON-файл предыдущего замера для сравнения'
+        )
+
+    def handle(self, *args, **options):
+        url = options['url'].rstrip('/')
+        parts = urlsplit(url)
+        if parts.scheme != 'http':
+            raise CommandError('Поддерживаются только адреса http://')
+        if options['scenario'] != 'read' and (options['token']
+                                              or options['anonymous']):
+            raise CommandError(
+                '--token и --anonymous подходят только для --scenario read'
+            )
+
+        rnd = random.Random(options['seed'])
+        dataset = Dataset(rnd)
+        if not dataset.recipe_ids:
+            raise CommandError(
+                'В БД нет рецептов: заполните её командой seed_synthetic'
+            )
+        sessions = self.get_sessions(rnd, dataset, options)
+        endpoints = get_endpoints(
+            options['scenario'], sessions[0].user is not None
+        )
+
+        load = (parts.hostname, parts.port or 80, sessions, endpoints)
+        try:
+            if options['warmup']:
+                asyncio.run(run_load(
+                    *load, options['warmup'], options['timeout']
+                ))
+            results = asyncio.run(run_load(
+                *load, options['duration'], options['timeout']
+            ))
+        finally:
+            for session in sessions:
+                session.cleanup()
+
+        queries = {}
+        if not options['skip_queries']:
+            try:
+                queries = count_queries(sessions[0], endpoints)
+            finally:
+                sessions[0].cleanup()
+
+        report = self.make_report(results, queries, options, url)
+        self.print_report(report)
+        if options['compare']:
+            with open(options['compare'], encoding='utf-8') as file:
+                self.print_comparison(json.load(file), report)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+
+    def get_sessions(self, rnd, dataset, options):
+        """Виртуальные пользователи, по одному на соединение."""
+
+        count = options['concurrency']
+        if options['anonymous']:
+            users = [None] * count
+        elif options['token']:
+            token = Token.objects.select_related('user').filter(
+                key=options['token']
+            ).first()
+            if token is None:
+                raise CommandError('Токен не найден в БД')
+            users = [token.user] * count
+        else:
+            users = get_users(options['prefix'], count)
+            if len(users) < count:
+                raise CommandError(
+                    f'Нужно {count} пользователей с префиксом '
+                    f'{options["prefix"]}, у которых есть рецепты и '
+                    f'корзина, найдено {len(users)}: заполните БД '
+                    f'командой seed_synthetic'
+                )
+        return [
+            Session(random.Random(rnd.random()), dataset, user)
+            for user in users
+        ]
+
+    def make_report(self, results, queries, options, url):
+        duration = options['duration']
+        return {
+            'url': url,
+            'scenario': options['scenario'],
+            'concurrency': options['concurrency'],
+            'duration': duration,
+            'seed': options['seed'],
+            'commit': get_commit(),
+            'created': timezone.now().isoformat(timespec='seconds'),
+            'endpoints': {
+                name: {
+                    **summarize(
+                        result['latencies'], result['statuses'], duration,
+                        result['timings']
+                    ),
+                    'queries': queries.get(name),
+                }
+                for name, result in sorted(results.items())
+            },
+            'total': summarize(
+                [latency for result in results.values()
+                 for latency in result['latencies']],
+                sum((Counter(result['statuses'])
+                     for result in results.values()), Counter()),
+                duration,
+                [timing for result in results.values()
+                 for timing in result['timings']]
+            ),
+        }
+
+    def print_report(self, report):
+        self.stdout.write(
+            f'{"эндпоинт":<24}{"запросов":>9}{"ошибок":>8}{"rps":>9}'
+            f'{"p50, мс":>10}{"p95, мс":>10}{"p99, мс":>10}{"SQL":>6}'
+            f'{"БД, мс":>9}'
+        )
+        rows = list(report['endpoints'].items())
+        rows.append(('всего', report['total']))
+        for name, stats in rows:
+            queries = stats.get('queries')
+            db_time = stats.get('db_mean_ms')
+            self.stdout.write(
+                f'{name:<24}{stats["requests"]:>9}{stats["errors"]:>8}'
+                f'{stats["rps"]:>9.1f}{stats["p50_ms"]:>10.1f}'
+                f'{stats["p95_ms"]:>10.1f}{stats["p99_ms"]:>10.1f}'
+                f'{"" if queries is None else queries:>6}'
+                f'{"" if db_time is None else f"{db_time:.1f}":>9}'
+            )
+        for name, stats in rows:
+            if stats['errors']:
+                self.stdout.write(self.style.WARNING(
+                    f'{name}: ошибки {stats["error_statuses"]}'
+                ))
+
+    def print_comparison(self, before, after):
+        """Выводит изменение rps, p99, запросов и времени работы БД."""
+
+        self.stdout.write(
+            f'\nСравнение с замером {before.get("commit") or ""} '
+            f'({before["url"]}):'
+        )
+        rows = [
+            (name, before['endpoints'].get(name), stats)
+            for name, stats in after['endpoints'].items()
+        ]
+        rows.append(('всего', before['total'], after['total']))
+        for name, old, new in rows:
+            if not old or not old['rps'] or not old['p99_ms']:
+                continue
+            line = (
+                f'{name:<24}'
+                f'rps {old["rps"]:>8.1f} -> {new["rps"]:<8.1f}'
+                f'({new["rps"] / old["rps"] - 1:+.0%})  '
+                f'p99 {old["p99_ms"]:>7.1f} -> {new["p99_ms"]:<7.1f}'
+                f'({new["p99_ms"] / old["p99_ms"] - 1:+.0%})'
+            )
+            if None not in (old.get('queries'), new.get('queries')):
+                line += f'  SQL {old["queries"]} -> {new["queries"]}'
+            if None not in (old.get('db_mean_ms'), new.get('db_mean_ms')):
+                line += (f'  БД {old["db_mean_ms"]:.1f} -> '
+                         f'{new["db_mean_ms"]:.1f} мс')
+            self.stdout.write(line)
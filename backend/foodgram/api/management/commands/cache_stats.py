@@ -0,0 +1,30 @@
+from api.authentication import token_stats
+from api.recipe_cache import fragment_stats
+from django.core.management.base import BaseCommand
+
+STATS = (fragment_stats, token_stats)
+
+
+class Command(BaseCommand):
+    help = ('Показывает статистику попаданий в кеш данных рецептов '
+            'и токенов авторизации')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Обнуляет счётчики после вывода'
+        )
+
+    def handle(self, *args, **options):
+        for stats in STATS:
+            values = stats.get()
+            self.stdout.write(
+                f'{stats.name}: попаданий {values["hits"]}, '
+                f'промахов {values["misses"]}, '
+                f'доля попаданий {values["hit_rate"]:.1%}'
+            )
+            if options['reset']:
+                stats.reset()
+        if options['reset']:
+            self.stdout.write(self.style.SUCCESS('Счётчики обнулены.'))
@@ -0,0 +1,186 @@
+import os
+import socket
+
+from django.conf import settings
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, Gauge, Histogram,
+                               generate_latest, multiprocess)
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+
+from .authentication import token_stats
+from .recipe_cache import fragment_stats
+
+CACHE_STATS = (fragment_stats, token_stats)
+LABELS = ('view', 'method')
+MULTIPROCESS = 'PROMETHEUS_MULTIPROC_DIR' in os.environ
+METHODS = ('GET', 'HEAD', 'OPTIONS', 'POST', 'PUT', 'PATCH', 'DELETE')
+
+requests_total = Counter(
+    'foodgram_requests_total',
+    'Обработанные запросы',
+    LABELS + ('status',)
+)
+request_duration = Histogram(
+    'foodgram_request_duration_seconds',
+    'Время обработки запроса',
+    LABELS,
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+response_size = Histogram(
+    'foodgram_response_size_bytes',
+    'Размер тела ответа',
+    LABELS,
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576)
+)
+db_queries = Histogram(
+    'foodgram_db_queries',
+    'Количество запросов к БД на один запрос',
+    LABELS,
+    buckets=(0, 1, 2, 5, 10, 20, 50, 100)
+)
+db_duration = Histogram(
+    'foodgram_db_duration_seconds',
+    'Время работы с БД на один запрос',
+    LABELS,
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+)
+worker_requests = Gauge(
+    'foodgram_worker_requests',
+    'Запросы, обработанные процессом с момента запуска',
+    ('host', 'mode'),
+    multiprocess_mode='liveall'
+)
+# Контейнер и режим сервера процесса. Под gunicorn prometheus_client
+# добавляет к значениям worker_requests метку pid каждого воркера.
+WORKER_LABELS = {
+    'host': socket.gethostname(),
+    'mode': 'asgi' if settings.ASYNC_READ_VIEWS else 'wsgi',
+}
+
+
+def get_labels(request):
+    """
+    Метки запроса: имя маршрута и HTTP-метод.
+
+    Используется имя маршрута, а не путь, чтобы id в адресах не
+    порождали новые ряды метрик. Неизвестные методы и адреса без
+    маршрута объединяются.
+    """
+
+    match = request.resolver_match
+    return {
+        'view': match.view_name if match else 'unresolved',
+        'method': request.method if request.method in METHODS else 'other',
+    }
+
+
+def observe_queries(labels, stats):
+    """Записывает количество запросов к БД и время работы с ней."""
+
+    if stats is not None:
+        db_queries.labels(**labels).observe(stats.count)
+        db_duration.labels(**labels).observe(stats.time)
+
+
+def count_streaming_size(content, labels, stats=None):
+    """
+    Передаёт потоковый ответ дальше и учитывает его размер в конце.
+
+    Запросы к БД тоже записываются в конце: часть из них выполняется
+    при чтении тела.
+    """
+
+    size = 0
+    try:
+        for chunk in content:
+            size += len(chunk)
+            yield chunk
+    finally:
+        response_size.labels(**labels).observe(size)
+        observe_queries(labels, stats)
+
+
+def observe_request(request, response, duration, stats=None):
+    """
+    Записывает метрики обработанного запроса.
+
+    :param request: Запрос.
+    :param response: Ответ.
+    :param duration: Время обработки, секунды.
+    :param stats: Статистика запросов к БД или None, если не собиралась.
+    """
+
+    labels = get_labels(request)
+    requests_total.labels(
+        status=str(response.status_code), **labels
+    ).inc()
+    request_duration.labels(**labels).observe(duration)
+    if response.streaming:
+        response.streaming_content = count_streaming_size(
+            response.streaming_content, labels, stats
+        )
+    else:
+        response_size.labels(**labels).observe(len(response.content))
+        observe_queries(labels, stats)
+    worker_requests.labels(**WORKER_LABELS).inc()
+
+
+class CacheStatsCollector:
+    """
+    Счётчики попаданий в кеш из CacheStats.
+
+    Значения уже общие для всех процессов, поэтому читаются из БД при
+    каждом запросе метрик, а не хранятся в файлах prometheus_client.
+    """
+
+    def get_families(self):
+        return (
+            CounterMetricFamily(
+                'foodgram_cache_hits', 'Попадания в кеш', labels=('cache',)
+            ),
+            CounterMetricFamily(
+                'foodgram_cache_misses', 'Промахи кеша', labels=('cache',)
+            ),
+            GaugeMetricFamily(
+                'foodgram_cache_hit_ratio', 'Доля попаданий в кеш',
+                labels=('cache',)
+            ),
+        )
+
+    def describe(self):
+        # Без describe() регистрация вызвала бы collect() и запрос к БД
+        # при импорте модуля.
+        return self.get_families()
+
+    def collect(self):
+        hits, misses, ratio = self.get_families()
+        for stats in CACHE_STATS:
+            values = stats.get()
+            hits.add_metric((stats.name,), values['hits'])
+            misses.add_metric((stats.name,), values['misses'])
+            ratio.add_metric((stats.name,), values['hit_rate'])
+        return hits, misses, ratio
+
+
+cache_collector = CacheStatsCollector()
+if not MULTIPROCESS:
+    REGISTRY.register(cache_collector)
+
+
+def render_metrics():
+    """
+    Метрики в текстовом формате Prometheus.
+
+    Под gunicorn с несколькими воркерами каждый процесс пишет значения
+    в файлы каталога PROMETHEUS_MULTIPROC_DIR, а здесь они суммируются,
+    поэтому ответ не зависит от того, какой воркер его отдал.
+
+    :return: Пара (тело ответа, Content-Type).
+    """
+
+    registry = REGISTRY
+    if MULTIPROCESS:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(cache_collector)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
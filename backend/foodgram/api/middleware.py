@@ -0,0 +1,154 @@
+import asyncio
+import logging
+from time import perf_counter
+
+from django.conf import settings
+from django.utils.decorators import sync_and_async_middleware
+
+from .metrics import observe_request
+from .query_stats import collect_queries, current_stats
+
+logger = logging.getLogger(__name__)
+
+SQL_PREVIEW_LENGTH = 300
+
+
+def get_server_timing(stats, duration):
+    """
+    Значение заголовка Server-Timing.
+
+    :param stats: Статистика запросов к БД.
+    :param duration: Полное время обработки запроса, секунды.
+    :return: Строка с метриками db и total, время в мс.
+    """
+
+    return (
+        f'db;desc="{stats.count} queries";dur={stats.time * 1000:.1f}, '
+        f'total;dur={duration * 1000:.1f}'
+    )
+
+
+def log_queries(request, response, stats, duration):
+    """
+    Пишет в лог медленные запросы и повторяющиеся запросы к БД.
+
+    Пороги задаются настройками SQL_LOG_REQUEST_TIME, SQL_LOG_DB_TIME
+    (мс), SQL_LOG_QUERIES и SQL_REPEAT_THRESHOLD.
+    """
+
+    repeated = stats.repeated(settings.SQL_REPEAT_THRESHOLD)
+    slow = (
+        duration * 1000 >= settings.SQL_LOG_REQUEST_TIME
+        or stats.time * 1000 >= settings.SQL_LOG_DB_TIME
+        or stats.count >= settings.SQL_LOG_QUERIES
+    )
+    if not (slow or repeated):
+        return
+    lines = [
+        f'{request.method} {request.get_full_path()} '
+        f'{response.status_code}: {stats.count} запросов к БД, '
+        f'БД {stats.time * 1000:.1f} мс, всего {duration * 1000:.1f} мс'
+    ]
+    lines += [
+        f'  повторён {count} раз: {sql[:SQL_PREVIEW_LENGTH]}'
+        for sql, count in repeated
+    ]
+    logger.warning('\n'.join(lines))
+
+
+def stream_with_queries(content, stats, on_close):
+    """
+    Передаёт потоковый ответ дальше, учитывая запросы к БД при его чтении.
+
+    Тело потокового ответа формируется после выхода из middleware,
+    поэтому статистика подключается заново на время получения каждой
+    части.
+
+    :param content: Итератор частей ответа.
+    :param stats: Статистика запросов HTTP-запроса.
+    :param on_close: Функция, вызываемая после отправки тела.
+    """
+
+    iterator = iter(content)
+    try:
+        while True:
+            with collect_queries(stats):
+                try:
+                    chunk = next(iterator)
+                except StopIteration:
+                    return
+            yield chunk
+    finally:
+        on_close()
+
+
+@sync_and_async_middleware
+def query_timing_middleware(get_response):
+    """
+    Учитывает запросы к БД при обработке каждого HTTP-запроса.
+
+    Добавляет к ответу заголовок Server-Timing с количеством запросов,
+    временем работы с БД и полным временем обработки, а медленные
+    запросы и признаки N+1 пишет в лог. Работает и под WSGI, и под ASGI.
+
+    Потоковые ответы заголовка не получают: он отправляется раньше
+    тела, а запросы к БД выполняются во время его чтения. Такие ответы
+    проверяются и пишутся в лог после отправки тела, с учётом всех
+    запросов.
+    """
+
+    def finish(request, response, stats, start):
+        if response.streaming:
+            response.streaming_content = stream_with_queries(
+                response.streaming_content,
+                stats,
+                lambda: log_queries(request, response, stats,
+                                    perf_counter() - start)
+            )
+            return response
+        duration = perf_counter() - start
+        response['Server-Timing'] = get_server_timing(stats, duration)
+        log_queries(request, response, stats, duration)
+        return response
+
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request):
+            start = perf_counter()
+            with collect_queries() as stats:
+                response = await get_response(request)
+            return finish(request, response, stats, start)
+    else:
+        def middleware(request):
+            start = perf_counter()
+            with collect_queries() as stats:
+                response = get_response(request)
+            return finish(request, response, stats, start)
+
+    return middleware
+
+
+@sync_and_async_middleware
+def metrics_middleware(get_response):
+    """
+    Собирает метрики запросов для /metrics.
+
+    Должна стоять после query_timing_middleware, чтобы учитывать
+    запросы к БД из её статистики.
+    """
+
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request):
+            start = perf_counter()
+            response = await get_response(request)
+            observe_request(request, response, perf_counter() - start,
+                            current_stats.get())
+            return response
+    else:
+        def middleware(request):
+            start = perf_counter()
+            response = get_response(request)
+            observe_request(request, response, perf_counter() - start,
+                            current_stats.get())
+            return response
+
+    return middleware
@@ -0,0 +1,27 @@
+# Generated by Django 3.2.16 on 2026-10-18 17:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CacheCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True, verbose_name='Кеш')),
+                ('hits', models.PositiveBigIntegerField(default=0, verbose_name='Попаданий')),
+                ('misses', models.PositiveBigIntegerField(default=0, verbose_name='Промахов')),
+            ],
+            options={
+                'verbose_name': 'Статистика кеша',
+                'verbose_name_plural': 'Статистика кеша',
+            },
+        ),
+    ]
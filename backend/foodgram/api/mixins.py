@@ -1,9 +1,32 @@
-from recipes.models import Recipe
+from hashlib import md5
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import parse_etags
+from recipes.catalog import get_catalog_version
+from recipes.counters import change_counters
+from recipes.models import Recipe, ShoppingCart, ShoppingListIngredient
 from rest_framework import status
 from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
 
-from .serializers import ShortRecipesSerializer
+from .serializers import RecipeIdsSerializer, ShortRecipesSerializer
+
+User = get_user_model()
+
+
+def lock_user_lists(user):
+    """
+    Блокирует избранное и корзину пользователя до конца транзакции.
+
+    Блокируется строка пользователя, поэтому запросы, меняющие его
+    списки, выполняются по очереди и видят записи друг друга.
+
+    :param user: Пользователь.
+    """
+
+    User.objects.select_for_update().only('pk').get(pk=user.pk)
 
 
 class FavoriteShoppingcartMixin:
@@ -23,28 +46,166 @@ class FavoriteShoppingcartMixin:
 
         user = request.user
         recipe = get_object_or_404(Recipe, id=pk)
-        exists_in_db = related_model.objects.filter(
-            user=user,
-            recipe=recipe
-        ).exists()
+        with transaction.atomic():
+            lock_user_lists(user)
+            exists_in_db = related_model.objects.filter(
+                user=user,
+                recipe=recipe
+            ).exists()
+
+            if request.method == 'DELETE':
+                if not exists_in_db:
+                    return Response(
+                        {'errors': 'Рецепта не было в списке'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+
+                related_model.objects.get(user=user, recipe=recipe).delete()
+                return Response(status=status.HTTP_204_NO_CONTENT)
 
-        if request.method == 'DELETE':
-            if not exists_in_db:
+            if exists_in_db:
                 return Response(
-                    {'errors': 'Рецепта не было в списке'},
+                    {'errors': 'Этот рецепт уже был добавлен в избранное '
+                               'ранее'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            related_model.objects.get(user=user, recipe=recipe).delete()
-            return Response(status=status.HTTP_204_NO_CONTENT)
-
-        if exists_in_db:
-            return Response(
-                {'errors': 'Этот рецепт уже был добавлен в избранное ранее'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-        related_model.objects.create(user=user, recipe=recipe)
+            related_model.objects.create(user=user, recipe=recipe)
         serializer = ShortRecipesSerializer(recipe)
 
         return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def bulk_add_del_to_db(self, request, related_model):
+        """
+        Добавляет или удаляет несколько рецептов за один запрос.
+
+        Добавление выполняется одним bulk_create, удаление — одним
+        DELETE. Счётчики рецептов и списки продуктов обновляются
+        в той же транзакции. Списки пользователя на это время
+        блокируются, поэтому рецепты, добавленные параллельным
+        запросом, не учитываются в счётчиках второй раз.
+
+        :param request: данные запроса со списком id в поле recipes.
+        :param related_model: Модель связанных данных.
+
+        :return: Ответ со статусом каждого id: added или exists при
+                 добавлении, removed или absent при удалении, not_found
+                 для несуществующих рецептов.
+        """
+
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = serializer.validated_data['recipes']
+        user = request.user
+
+        with transaction.atomic():
+            lock_user_lists(user)
+            found = set(Recipe.objects.filter(
+                pk__in=recipe_ids
+            ).values_list('pk', flat=True))
+            in_list = set(related_model.objects.filter(
+                user=user, recipe__in=found
+            ).values_list('recipe_id', flat=True))
+            if request.method == 'DELETE':
+                changed = in_list
+                statuses = ('removed', 'absent')
+                self.bulk_remove_from_list(user, related_model, changed)
+            else:
+                changed = found - in_list
+                statuses = ('added', 'exists')
+                self.bulk_add_to_list(user, related_model, changed)
+
+        return Response({'results': [
+            {
+                'id': recipe_id,
+                'status': (statuses[recipe_id not in changed]
+                           if recipe_id in found else 'not_found'),
+            }
+            for recipe_id in recipe_ids
+        ]})
+
+    def bulk_add_to_list(self, user, related_model, recipe_ids):
+        """Создаёт записи списка и обновляет зависящие от них данные."""
+
+        if not recipe_ids:
+            return
+        related_model.objects.bulk_create(
+            (related_model(user=user, recipe_id=pk) for pk in recipe_ids),
+            ignore_conflicts=True
+        )
+        change_counters(related_model, recipe_ids, 1)
+        if related_model is ShoppingCart:
+            ShoppingListIngredient.objects.add_recipes([user.pk], recipe_ids)
+
+    def bulk_remove_from_list(self, user, related_model, recipe_ids):
+        """
+        Удаляет записи списка и обновляет зависящие от них данные.
+
+        Счётчики рецептов и списки продуктов обновляют обработчики
+        сигнала post_delete.
+        """
+
+        if not recipe_ids:
+            return
+        related_model.objects.filter(
+            user=user, recipe__in=recipe_ids
+        ).delete()
+
+
+class CatalogCacheMixin:
+    """
+    Условные GET-запросы для справочников.
+
+    Ответ помечается ETag по версии справочников. При совпадении
+    If-None-Match возвращается 304 без запросов к БД: версия читается
+    из общего кеша. Сериализованные данные кешируются для каждой
+    версии отдельно.
+    """
+
+    cache_control = 'public, max-age=0, must-revalidate'
+    catalog_version = None
+
+    def list(self, request, *args, **kwargs):
+        return self.get_catalog_response(super().list, request, *args,
+                                         **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.get_catalog_response(super().retrieve, request, *args,
+                                         **kwargs)
+
+    def get_catalog_response(self, handler, request, *args,
+                             cache_data=True, **kwargs):
+        """
+        Формирует ответ с ETag по версии справочников.
+
+        Версия читается один раз за запрос и доступна обработчику
+        в атрибуте catalog_version.
+
+        :param handler: Метод вьюсета, формирующий ответ.
+        :param request: данные запроса.
+        :param cache_data: Кешировать ли данные ответа.
+        :return: Ответ 304, если данные клиента актуальны, иначе 200
+                 с данными из кеша.
+        """
+
+        version = self.catalog_version = get_catalog_version()
+        etag = f'"{version}-{request.accepted_renderer.format}"'
+        headers = {'ETag': etag, 'Cache-Control': self.cache_control}
+
+        if_none_match = parse_etags(request.headers.get('If-None-Match', ''))
+        if etag in if_none_match or '*' in if_none_match:
+            return Response(status=status.HTTP_304_NOT_MODIFIED,
+                            headers=headers)
+
+        if not cache_data:
+            return Response(handler(request, *args, **kwargs).data,
+                            headers=headers)
+
+        # Путь хешируется: memcached не принимает ключи длиннее 250 байт.
+        path = md5(request.get_full_path().encode()).hexdigest()
+        cache_key = f'catalog:{version}:{path}'
+        data = cache.get(cache_key)
+        if data is None:
+            data = handler(request, *args, **kwargs).data
+            cache.set(cache_key, data)
+        return Response(data, headers=headers)
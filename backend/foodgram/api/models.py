@@ -0,0 +1,26 @@
+from django.db import models
+
+
+class CacheCounter(models.Model):
+    """Счётчики попаданий и промахов кеша, общие для всех процессов"""
+
+    name = models.CharField(
+        max_length=100,
+        unique=True,
+        verbose_name='Кеш',
+    )
+    hits = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='Попаданий',
+    )
+    misses = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='Промахов',
+    )
+
+    class Meta:
+        verbose_name = 'Статистика кеша'
+        verbose_name_plural = 'Статистика кеша'
+
+    def __str__(self):
+        return self.name
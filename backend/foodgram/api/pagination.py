@@ -0,0 +1,139 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class RecipePagination(PageNumberPagination):
+    """
+    Пагинация рецептов.
+
+    По умолчанию постраничная. Если в запросе есть параметр cursor,
+    используется пагинация по ключу (pub_date, id): без COUNT(*) и OFFSET,
+    поэтому любая страница ленты стоит одинаково. Для первой страницы
+    cursor передаётся пустым, следующая страница доступна по ссылке next.
+
+    В режиме курсора рецепты всегда идут по дате публикации, поэтому
+    вместе с поиском, который сортирует по релевантности, cursor
+    не принимается.
+    """
+
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор'
+    search_query_param = 'search'
+    cursor_with_search_message = (
+        'Параметр cursor нельзя использовать вместе с search: результаты '
+        'поиска сортируются по релевантности'
+    )
+    keyset_only = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.use_cursor = (self.keyset_only
+                           or self.cursor_query_param in request.query_params)
+        if not self.use_cursor:
+            return super().paginate_queryset(queryset, request, view)
+        if (not self.keyset_only
+                and request.query_params.get(self.search_query_param,
+                                             '').strip()):
+            raise ValidationError(
+                {self.cursor_query_param: self.cursor_with_search_message}
+            )
+
+        self.request = request
+        page_size = self.get_page_size(request)
+        cursor = request.query_params.get(self.cursor_query_param)
+        position = self.decode_cursor(cursor) if cursor else None
+        queryset = self.get_keyset_queryset(queryset, position, page_size + 1)
+
+        results = list(queryset[:page_size + 1])
+        self.has_next = len(results) > page_size
+        results = results[:page_size]
+        self.last = results[-1] if results else None
+        return results
+
+    def get_keyset_queryset(self, queryset, position, limit):
+        """
+        Рецепты после позиции курсора в порядке публикации.
+
+        :param queryset: Кверисет рецептов.
+        :param position: Кортеж (pub_date, id) или None для первой страницы.
+        :param limit: Сколько рецептов будет прочитано.
+        :return: Отсортированный кверисет.
+        """
+
+        queryset = queryset.order_by('-pub_date', '-pk')
+        if position is None:
+            return queryset
+        pub_date, pk = position
+        return queryset.filter(pub_date__lte=pub_date).filter(
+            Q(pub_date__lt=pub_date) | Q(pk__lt=pk)
+        )
+
+    def get_paginated_response(self, data):
+        if not self.use_cursor:
+            return super().get_paginated_response(data)
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_next_link(self):
+        if not self.use_cursor:
+            return super().get_next_link()
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.last)
+        )
+
+    def encode_cursor(self, recipe):
+        """Кодирует позицию (pub_date, id) последнего рецепта страницы."""
+
+        position = f'{recipe.pub_date.isoformat()}|{recipe.pk}'
+        return urlsafe_b64encode(position.encode()).decode()
+
+    def decode_cursor(self, cursor):
+        """
+        Раскодирует позицию из параметра cursor.
+
+        :param cursor: Значение параметра cursor.
+        :return: Кортеж (pub_date, id).
+        """
+
+        try:
+            position = urlsafe_b64decode(cursor.encode()).decode()
+            pub_date, pk = position.split('|')
+            pub_date, pk = parse_datetime(pub_date), int(pk)
+        except (BinasciiError, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if pub_date is None:
+            raise NotFound(self.invalid_cursor_message)
+        return pub_date, pk
+
+
+class FeedPagination(RecipePagination):
+    """
+    Пагинация ленты подписок.
+
+    Всегда по ключу (pub_date, id). В PostgreSQL для каждого автора
+    читается не больше limit рецептов по индексу (author, pub_date),
+    поэтому запрос остаётся ограниченным при сотнях подписок.
+    """
+
+    keyset_only = True
+
+    def get_keyset_queryset(self, queryset, position, limit):
+        return super().get_keyset_queryset(
+            queryset.limit_feed(self.request.user, limit, position),
+            position,
+            limit
+        )
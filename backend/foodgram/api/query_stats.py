@@ -0,0 +1,81 @@
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+
+current_stats = ContextVar('query_stats', default=None)
+
+
+class QueryStats:
+    """Запросы к БД, выполненные при обработке одного HTTP-запроса."""
+
+    __slots__ = ('count', 'time', 'shapes')
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+        self.shapes = Counter()
+
+    def repeated(self, threshold):
+        """
+        Запросы, повторённые с разными параметрами.
+
+        Django передаёт параметры отдельно от текста SQL, поэтому
+        одинаковый текст означает один и тот же запрос, выполненный
+        в цикле, — признак проблемы N+1.
+
+        :param threshold: Минимальное количество повторов.
+        :return: Список пар (текст SQL, количество) по убыванию.
+        """
+
+        return [
+            (sql, count) for sql, count in self.shapes.most_common()
+            if count >= threshold
+        ]
+
+
+def track_query(execute, sql, params, many, context):
+    """Обёртка execute_wrapper: учитывает запрос в текущей статистике."""
+
+    stats = current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.time += perf_counter() - start
+        stats.count += 1
+        stats.shapes[sql] += 1
+
+
+def install_query_tracker(connection):
+    """
+    Подключает учёт запросов к соединению с БД.
+
+    Объект соединения у каждого потока свой, а статистика берётся из
+    контекстной переменной, поэтому учитываются и запросы, выполненные
+    в пуле потоков асинхронных вьюх.
+    """
+
+    if track_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(track_query)
+
+
+@contextmanager
+def collect_queries(stats=None):
+    """
+    Собирает статистику запросов к БД внутри блока with.
+
+    :param stats: Объект QueryStats, который нужно дополнить,
+        или None для новой статистики.
+    :return: Объект QueryStats, заполняемый по ходу выполнения.
+    """
+
+    if stats is None:
+        stats = QueryStats()
+    token = current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        current_stats.reset(token)
@@ -0,0 +1,74 @@
+from hashlib import md5
+
+from django.core.cache import cache
+from django.db.models import prefetch_related_objects
+from recipes.catalog import get_catalog_version
+from recipes.models import Recipe
+
+from .cache_stats import CacheStats
+
+FRAGMENT_KEY = 'recipes:fragment:{catalog}:{origin}:{pk}:{version}'
+fragment_stats = CacheStats('recipe_fragments')
+
+
+def get_origin(request):
+    """
+    Часть ключа, зависящая от адреса сайта.
+
+    Ссылки на изображения в ответе абсолютные, поэтому данные для разных
+    хостов кешируются отдельно.
+    """
+
+    if request is None:
+        return ''
+    return md5(request.build_absolute_uri('/').encode()).hexdigest()[:8]
+
+
+def get_recipe_fragments(recipes, serializer_class, context):
+    """
+    Данные рецептов, одинаковые для всех пользователей.
+
+    Ключ кеша включает версию рецепта из Recipe.cache_version, которая
+    загружается вместе с рецептом, поэтому устаревшие данные никогда
+    не читаются, даже если кеш потерял часть записей.
+
+    Готовые данные берутся из кеша одним запросом. Для остальных рецептов
+    связанные данные подгружаются только сейчас, а результат
+    сериализации сохраняется в кеш.
+
+    :param recipes: Список объектов рецептов.
+    :param serializer_class: Сериализатор данных без признаков
+        пользователя.
+    :param context: Контекст сериализатора.
+    :return: Словарь {id рецепта: данные}.
+    """
+
+    catalog = get_catalog_version()
+    origin = get_origin(context.get('request'))
+    keys = {
+        recipe.pk: FRAGMENT_KEY.format(catalog=catalog, origin=origin,
+                                       pk=recipe.pk,
+                                       version=recipe.cache_version.hex)
+        for recipe in recipes
+    }
+    cached = cache.get_many(keys.values())
+    fragments = {
+        pk: cached[key] for pk, key in keys.items() if key in cached
+    }
+
+    misses = [recipe for recipe in recipes if recipe.pk not in fragments]
+    if misses:
+        prefetch_related_objects(
+            misses, 'author', *Recipe.objects.get_related_lookups()
+        )
+        data = serializer_class(misses, many=True, context=context).data
+        new_fragments = {
+            recipe.pk: fragment for recipe, fragment in zip(misses, data)
+        }
+        cache.set_many(
+            {keys[pk]: fragment for pk, fragment in new_fragments.items()}
+        )
+        fragments.update(new_fragments)
+
+    fragment_stats.record(len(recipes) - len(misses), len(misses))
+    return fragments
@@ -0,0 +1,97 @@
+import csv
+import json
+
+from rest_framework import renderers
+
+
+class EchoBuffer:
+    """Буфер, который сразу возвращает записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+class ShoppingListRendererMixin:
+    """
+    Потоковая выгрузка списка покупок.
+
+    Рендерер выбирается по параметру format или заголовку Accept,
+    а сам файл формируется построчно методом stream. По умолчанию
+    это текстовый список, форматы CSV и JSON переопределяют stream.
+    """
+
+    extension = 'txt'
+
+    def stream(self, user, ingredients):
+        """
+        Формирует файл списка покупок по частям.
+
+        :param user: Пользователь, для которого формируется список.
+        :param ingredients: Итератор словарей с ключами ingredient_name,
+            measurement_unit и amount.
+        :return: Генератор строк файла.
+        """
+
+        yield (f'Список продуктов для пользователя с именем: '
+               f'{user.get_full_name()}\n\n')
+        for ingredient in ingredients:
+            yield (f'{ingredient["ingredient_name"]} '
+                   f'({ingredient["measurement_unit"]}) - '
+                   f'{ingredient["amount"]}\n')
+
+
+class TextShoppingListRenderer(ShoppingListRendererMixin,
+                               renderers.BaseRenderer):
+    """Список покупок в виде текстового файла."""
+
+    media_type = 'text/plain'
+    format = 'txt'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Отдаёт ответы с ошибками простым текстом."""
+
+        if data is None:
+            return b''
+        if isinstance(data, dict) and 'detail' in data:
+            data = data['detail']
+        return str(data).encode(self.charset)
+
+
+class CSVShoppingListRenderer(TextShoppingListRenderer):
+    """Список покупок в формате CSV."""
+
+    media_type = 'text/csv'
+    format = 'csv'
+    extension = 'csv'
+
+    def stream(self, user, ingredients):
+        writer = csv.writer(EchoBuffer())
+        yield writer.writerow(('name', 'measurement_unit', 'amount'))
+        for ingredient in ingredients:
+            yield writer.writerow((
+                ingredient['ingredient_name'],
+                ingredient['measurement_unit'],
+                ingredient['amount'],
+            ))
+
+
+class JSONShoppingListRenderer(ShoppingListRendererMixin,
+                               renderers.JSONRenderer):
+    """Список покупок в формате JSON."""
+
+    extension = 'json'
+
+    def stream(self, user, ingredients):
+        yield '{"user": %s, "ingredients": [' % json.dumps(
+            user.get_full_name(), ensure_ascii=False
+        )
+        separator = ''
+        for ingredient in ingredients:
+            yield separator + json.dumps({
+                'name': ingredient['ingredient_name'],
+                'measurement_unit': ingredient['measurement_unit'],
+                'amount': ingredient['amount'],
+            }, ensure_ascii=False)
+            separator = ', '
+        yield ']}'
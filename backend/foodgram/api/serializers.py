@@ -1,8 +1,13 @@
-from api.custom_fields import Base64ImageField
+from collections import Counter, defaultdict
+
+from api.custom_fields import Base64ImageField, ImageVariantsField
+from api.recipe_cache import get_recipe_fragments
 from django.contrib.auth import get_user_model
-from django.shortcuts import get_object_or_404
+from django.db import models, transaction
 from recipes.models import (AmountIngredientRecipe, Favorite, Ingredient,
-                            Recipe, ShoppingCart, Tag)
+                            Recipe, ShoppingCart, ShoppingListIngredient, Tag,
+                            delete_rows)
+from recipes.tasks import schedule_image_variants
 from rest_framework import serializers
 
 User = get_user_model()
@@ -12,7 +17,8 @@ class UsersSerializer(serializers.ModelSerializer):
     """
     Сериализатор для User.
 
-    Поле is_subscribed вычисляется в методе get_is_subscribed.
+    Поле is_subscribed берётся из аннотации кверисета, а при её отсутствии
+    вычисляется в методе get_is_subscribed.
     """
 
     is_subscribed = serializers.SerializerMethodField()
@@ -36,6 +42,9 @@ class UsersSerializer(serializers.ModelSerializer):
         :return: Если подписан, то возвращается True, иначе False.
         """
 
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
+
         user = self.context['request'].user
 
         return (False if user.is_anonymous or (user == obj)
@@ -70,21 +79,47 @@ class CreateUserSerializer(serializers.ModelSerializer):
 class ShortRecipesSerializer(serializers.ModelSerializer):
     """Краткий сериализатор рецепта"""
 
+    image_variants = ImageVariantsField()
+
     class Meta:
         model = Recipe
         fields = (
             'id',
             'name',
             'image',
+            'image_variants',
             'cooking_time',
         )
 
 
+class RecipeIdsSerializer(serializers.Serializer):
+    """Список id рецептов для пакетных операций."""
+
+    MAX_RECIPES = 100
+
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_RECIPES,
+    )
+
+    def validate_recipes(self, value):
+        """Убирает повторы, сохраняя порядок id."""
+
+        return list(dict.fromkeys(value))
+
+
 class FollowSerializer(UsersSerializer):
-    """Сериализатор для подписчиков."""
+    """
+    Сериализатор для подписчиков.
+
+    Рецепты берутся из предзагруженного атрибута limited_recipes, если
+    он есть, а их количество — из счётчика User.recipes_count.
+    Ограничение числа рецептов передаётся в контексте как recipes_limit.
+    """
 
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
+    recipes_count = serializers.IntegerField(read_only=True)
 
     class Meta:
         model = User
@@ -107,19 +142,22 @@ class FollowSerializer(UsersSerializer):
         :return: Сериализованные данные сериализатором RecipeFollowing
         """
 
-        recipes = obj.recipes.all()
+        if hasattr(obj, 'limited_recipes'):
+            recipes = obj.limited_recipes
+        else:
+            recipes = obj.recipes.all()
+            recipes_limit = self.context.get('recipes_limit')
+            if recipes_limit is not None:
+                recipes = recipes[:recipes_limit]
         return ShortRecipesSerializer(instance=recipes, many=True).data
 
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
-
 
 class TagSerializer(serializers.ModelSerializer):
     """Сериализатор для тегов."""
 
     class Meta:
         model = Tag
-        fields = '__all__'
+        fields = ('id', 'name', 'color', 'slug')
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -157,8 +195,69 @@ class IngredientsForRecipeSerializer(serializers.ModelSerializer):
         )
 
 
+class RecipeAuthorSerializer(serializers.ModelSerializer):
+    """Автор рецепта без признака подписки."""
+
+    class Meta:
+        model = User
+        fields = (
+            'username',
+            'id',
+            'email',
+            'first_name',
+            'last_name',
+        )
+
+
+class RecipeFragmentSerializer(serializers.ModelSerializer):
+    """Данные рецепта, одинаковые для всех пользователей."""
+
+    author = RecipeAuthorSerializer(read_only=True)
+    tags = TagSerializer(many=True, read_only=True)
+    ingredients = IngredientsForRecipeSerializer(
+        many=True, source='amount_ingredients', read_only=True
+    )
+    image_variants = ImageVariantsField()
+
+    class Meta:
+        model = Recipe
+        fields = (
+            'id',
+            'tags',
+            'author',
+            'ingredients',
+            'name',
+            'image',
+            'image_variants',
+            'text',
+            'cooking_time',
+        )
+
+
+class RecipeListSerializer(serializers.ListSerializer):
+    """Список рецептов с данными из кеша для всей страницы сразу."""
+
+    def to_representation(self, data):
+        recipes = list(
+            data.all() if isinstance(data, models.Manager) else data
+        )
+        fragments = get_recipe_fragments(
+            recipes, RecipeFragmentSerializer, self.context
+        )
+        return [
+            self.child.add_user_flags(fragments[recipe.pk], recipe)
+            for recipe in recipes
+        ]
+
+
 class RecipesSerializer(serializers.ModelSerializer):
-    """Сериализатор для рецепта."""
+    """
+    Сериализатор для рецепта.
+
+    Данные, одинаковые для всех пользователей, берутся из кеша
+    (см. api.recipe_cache), а признаки is_favorited, is_in_shopping_cart
+    и author.is_subscribed добавляются для каждого запроса.
+    """
 
     author = UsersSerializer(read_only=True)
     tags = TagSerializer(many=True, read_only=True)
@@ -166,6 +265,7 @@ class RecipesSerializer(serializers.ModelSerializer):
         many=True, source='amount_ingredients', read_only=True
     )
     image = Base64ImageField()
+    image_variants = ImageVariantsField()
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
 
@@ -180,13 +280,55 @@ class RecipesSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_variants',
             'text',
             'cooking_time',
         )
+        list_serializer_class = RecipeListSerializer
+
+    def to_representation(self, instance):
+        fragment = get_recipe_fragments(
+            [instance], RecipeFragmentSerializer, self.context
+        )[instance.pk]
+        return self.add_user_flags(fragment, instance)
+
+    def add_user_flags(self, fragment, instance):
+        """
+        Дополняет данные рецепта признаками текущего пользователя.
+
+        :param fragment: Данные рецепта из RecipeFragmentSerializer.
+        :param instance: Объект рецепта.
+        :return: Данные рецепта в порядке полей Meta.fields.
+        """
+
+        flags = {
+            'author': {
+                **fragment['author'],
+                'is_subscribed': self.get_author_is_subscribed(instance),
+            },
+            'is_favorited': self.get_is_favorited(instance),
+            'is_in_shopping_cart': self.get_is_in_shopping_cart(instance),
+        }
+        return {
+            field: flags[field] if field in flags else fragment[field]
+            for field in self.Meta.fields
+        }
+
+    def get_author_is_subscribed(self, obj):
+        """Проверяем подписку на автора рецепта"""
+
+        if hasattr(obj, 'author_is_subscribed'):
+            return obj.author_is_subscribed
+        return UsersSerializer(context=self.context).get_is_subscribed(
+            obj.author
+        )
 
     def get_is_favorited(self, obj):
         """Проверяем наличие рецепта в избранном"""
 
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
+
         user = self.context['request'].user
 
         if user.is_anonymous:
@@ -200,6 +342,9 @@ class RecipesSerializer(serializers.ModelSerializer):
     def get_is_in_shopping_cart(self, obj):
         """Проверяем наличие рецепта в корзине покупок"""
 
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
+
         user = self.context['request'].user
 
         if user.is_anonymous:
@@ -214,35 +359,51 @@ class RecipesSerializer(serializers.ModelSerializer):
         """
         Валидацияя данных перед выполнением метода create(validated_data)
 
+        Теги и ингредиенты проверяются одним запросом на каждую таблицу,
+        в ответе перечисляются все несуществующие и повторяющиеся id.
+
         :param attrs: атрибуты полученные для валидации.
         :return: возвращает провалидированные данные.
         """
 
         ingredients = self.initial_data.get('ingredients')
         tags = self.initial_data.get('tags')
-        list_tags = Tag.objects.all().values_list('id', flat=True)
 
-        for tag in tags:
-            if tag not in list_tags:
-                raise serializers.ValidationError(
-                    {'tags': f'Тег <<{tag}>> не существует'}
-                )
+        if not tags:
+            raise serializers.ValidationError({'tags': 'Обязательное поле'})
+        missing_tags = set(tags) - set(
+            Tag.objects.filter(id__in=tags).values_list('id', flat=True)
+        )
+        if missing_tags:
+            raise serializers.ValidationError(
+                {'tags': [f'Тег <<{tag}>> не существует'
+                          for tag in sorted(missing_tags, key=str)]}
+            )
 
         if not ingredients:
             raise serializers.ValidationError(
                 {'ingredients': 'Обязательное поле'}
             )
-        ingredient_list = []
-        for ingredient_item in ingredients:
-            ingredient = get_object_or_404(
-                Ingredient,
-                id=ingredient_item['id']
+        ingredient_ids = Counter(
+            ingredient_item['id'] for ingredient_item in ingredients
+        )
+        errors = [
+            f'Ингредиент <<{ingredient_id}>> не существует'
+            for ingredient_id in sorted(
+                ingredient_ids.keys() - set(
+                    Ingredient.objects.filter(
+                        id__in=ingredient_ids
+                    ).values_list('id', flat=True)
+                ),
+                key=str
             )
-            if ingredient in ingredient_list:
-                raise serializers.ValidationError(
-                    'Ингредиенты не должны повторяться'
-                )
-            ingredient_list.append(ingredient)
+        ]
+        errors += [
+            f'Ингредиент <<{ingredient_id}>> повторяется'
+            for ingredient_id, count in ingredient_ids.items() if count > 1
+        ]
+        if errors:
+            raise serializers.ValidationError({'ingredients': errors})
 
         attrs['ingredients'] = ingredients
         return attrs
@@ -251,55 +412,151 @@ class RecipesSerializer(serializers.ModelSerializer):
         """
         Создание ингредиентов в таблице recipes_amountingredientrecipe.
 
+        bulk_create не отправляет сигналы, поэтому списки продуктов
+        здесь не меняются: новый рецепт ещё не может быть в корзине,
+        а при изменении рецепта их обновляет _update_ingredients.
+
         :param ingredients: список словарей с ключами:
             'id' - id ингредиента,
             'amount' - количество ингредиентов
         :param recipe: объект рецепта
         """
-        for ingredient in ingredients:
-            AmountIngredientRecipe.objects.create(
+        AmountIngredientRecipe.objects.bulk_create(
+            AmountIngredientRecipe(
                 recipe=recipe,
                 ingredient_id=ingredient.get('id'),
                 amount=ingredient.get('amount')
             )
+            for ingredient in ingredients
+        )
+
+    def _update_ingredients(self, ingredients, recipe):
+        """
+        Заменяет ингредиенты рецепта.
+
+        Старые строки удаляются без загрузки и сигналов, а разница
+        между старым и новым количеством переносится в списки продуктов
+        одним вызовом apply_changes. Так число запросов не зависит
+        от числа ингредиентов. Обработчики сигналов ингредиентов
+        нужны только для правки рецепта в админке.
+
+        :param ingredients: список словарей с ключами 'id' и 'amount'.
+        :param recipe: объект рецепта
+        """
+
+        amounts = AmountIngredientRecipe.objects.filter(recipe=recipe)
+        changes = defaultdict(int)
+        for ingredient_id, amount in amounts.values_list(
+            'ingredient_id', 'amount'
+        ):
+            changes[ingredient_id] -= amount
+        for ingredient in ingredients:
+            changes[int(ingredient['id'])] += int(ingredient['amount'])
+        delete_rows(amounts)
+        self._create_ingredients(ingredients, recipe)
+        ShoppingListIngredient.objects.apply_changes(
+            recipe.shoppingcart.values_list('user_id', flat=True), changes
+        )
+
+    def _get_tags_mask(self, tags):
+        """
+        Битовая маска тегов для Recipe.tags_mask.
+
+        :param tags: список id тегов.
+        :return: Маска тегов.
+        """
+
+        return sum(
+            tag.mask for tag in Tag.objects.filter(pk__in=tags).only('bit')
+        )
+
+    def _set_tags(self, tags, recipe):
+        """
+        Записывает теги рецепта.
+
+        Строки связи пишутся напрямую, без сигналов m2m_changed: маску
+        тегов задаёт вызывающий код, а кеш рецепта сбрасывает сохранение
+        рецепта, поэтому версия меняется один раз.
+
+        :param tags: список id тегов.
+        :param recipe: объект рецепта
+        """
+
+        through = Recipe.tags.through
+        delete_rows(through.objects.filter(recipe=recipe))
+        through.objects.bulk_create(
+            through(recipe=recipe, tag_id=tag_id) for tag_id in tags
+        )
 
     def create(self, validated_data):
         """
         Создаёт рецепт.
 
+        Теги и ингредиенты записываются без сигналов, маска тегов
+        сохраняется вместе с рецептом. Версия кеша назначается новому
+        рецепту при создании и больше не меняется. Уменьшенные копии
+        изображения создаются фоновой задачей и не задерживают ответ.
+
         :param validated_data: провалидированные данные.
         :return: возвращает объект созданного рецепта.
         """
         current_user = self.context.get('request').user
         tags = self.initial_data.get('tags')
         ingredients = validated_data.pop('ingredients')
-        recipe = Recipe.objects.create(
-            author=current_user,
-            **validated_data
-        )
-        self._create_ingredients(ingredients, recipe)
-        recipe.tags.set(tags)
+        with transaction.atomic():
+            recipe = Recipe.objects.create(
+                author=current_user,
+                tags_mask=self._get_tags_mask(tags),
+                **validated_data
+            )
+            self._set_tags(tags, recipe)
+            self._create_ingredients(ingredients, recipe)
+            schedule_image_variants(recipe)
         return recipe
 
     def update(self, instance, validated_data):
         """
         Обновляет рецепт новыми данными.
+
+        Списки продуктов пользователей, у которых рецепт в корзине,
+        изменяются в той же транзакции (см. _update_ingredients).
+        Теги и ингредиенты записываются без сигналов, поэтому версию
+        кеша один раз меняет обработчик post_save рецепта.
+
         :param instance: объект который будет изменяться.
         :param validated_data: провалидированные полученные данные.
         :return: возвращает изменённый объект.
         """
 
+        with transaction.atomic():
+            self._update_recipe(instance, validated_data)
+        return instance
+
+    def _update_recipe(self, instance, validated_data):
+        """
+        Записывает новые данные рецепта, тегов и ингредиентов.
+
+        Сохраняются только поля, которые меняет запрос, чтобы
+        не затереть данные, записанные фоновыми задачами.
+
+        :param instance: объект который будет изменяться.
+        :param validated_data: провалидированные полученные данные.
+        """
+
+        update_fields = ['name', 'text', 'cooking_time', 'tags_mask']
         instance.name = validated_data.get('name', instance.name)
         instance.text = validated_data.get('text', instance.text)
-        instance.image = validated_data.get('image', instance.image)
+        if 'image' in validated_data:
+            instance.image = validated_data['image']
+            stale_variants = instance.image_variants
+            instance.image_variants = {}
+            schedule_image_variants(instance, stale_variants)
+            update_fields += ['image', 'image_variants']
         instance.cooking_time = validated_data.get(
             'cooking_time', instance.cooking_time
         )
-        instance.tags.clear()
         tags = self.initial_data.get('tags')
-        instance.tags.set(tags)
-        AmountIngredientRecipe.objects.filter(recipe=instance).all().delete()
-        ingredients = validated_data.get('ingredients')
-        self._create_ingredients(ingredients, instance)
-        instance.save()
-        return instance
+        instance.tags_mask = self._get_tags_mask(tags)
+        self._set_tags(tags, instance)
+        self._update_ingredients(validated_data.get('ingredients'), instance)
+        instance.save(update_fields=update_fields)
@@ -0,0 +1,42 @@
+from django.contrib.auth import get_user_model
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidate_token
+from .query_stats import install_query_tracker
+
+User = get_user_model()
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(instance, **kwargs):
+    """Сбрасывает кеш токена при выходе пользователя."""
+
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(instance, created, update_fields, **kwargs):
+    """
+    Сбрасывает кеш токенов пользователя после его изменения.
+
+    Так в кеше не остаются пользователь со старым паролем, ролью
+    или признаком is_active. Обновление last_login при входе
+    кеш не сбрасывает.
+    """
+
+    if created or (update_fields and set(update_fields) <= {'last_login'}):
+        return
+    for key in Token.objects.filter(user=instance).values_list(
+        'key', flat=True
+    ):
+        invalidate_token(key)
+
+
+@receiver(connection_created)
+def track_connection_queries(connection, **kwargs):
+    """Подключает учёт запросов к каждому новому соединению с БД."""
+
+    install_query_tracker(connection)
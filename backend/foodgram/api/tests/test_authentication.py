@@ -0,0 +1,65 @@
+from api.authentication import (CachedTokenAuthentication, get_token_cache_key,
+                                token_stats)
+from django.contrib.auth.models import update_last_login
+from django.core.cache import cache
+from recipes.tests.factories import make_user
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APITestCase
+
+
+class CachedTokenAuthenticationTests(APITestCase):
+    """Кеширование пользователя по токену."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = make_user()
+        self.token = Token.objects.create(user=self.user)
+        self.authentication = CachedTokenAuthentication()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+        self.authenticate()
+
+    def authenticate(self):
+        return self.authentication.authenticate_credentials(self.token.key)
+
+    def is_cached(self):
+        return cache.get(get_token_cache_key(self.token.key)) is not None
+
+    def test_cached_hit_without_queries(self):
+        token_stats.flush()
+
+        with self.assertNumQueries(0):
+            user, token = self.authenticate()
+
+        self.assertEqual(user, self.user)
+        self.assertEqual(token.key, self.token.key)
+
+    def test_logout(self):
+        response = self.client.post('/api/auth/token/logout/')
+
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(self.is_cached())
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_password_change(self):
+        response = self.client.post('/api/users/set_password/', {
+            'current_password': 'password',
+            'new_password': 'new-Password-123',
+        })
+
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(self.is_cached())
+
+    def test_deactivation(self):
+        self.user.is_active = False
+        self.user.save(update_fields=['is_active'])
+
+        self.assertFalse(self.is_cached())
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_last_login_keeps_entry(self):
+        update_last_login(None, self.user)
+
+        self.assertTrue(self.is_cached())
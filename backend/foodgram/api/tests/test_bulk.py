@@ -0,0 +1,91 @@
+from django.core.cache import cache
+from recipes.models import (Favorite, Recipe, ShoppingCart,
+                            ShoppingListIngredient)
+from recipes.tests.factories import make_ingredient, make_recipe, make_user
+from rest_framework.test import APITestCase
+
+
+class BulkListTests(APITestCase):
+    """Пакетное добавление и удаление рецептов в избранном и корзине."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = make_user()
+        author = make_user()
+        self.salt = make_ingredient()
+        self.soup = make_recipe(author, {self.salt: 5})
+        self.salad = make_recipe(author, {self.salt: 2})
+        self.client.force_authenticate(self.user)
+
+    def request(self, method, url, recipe_ids):
+        response = getattr(self.client, method)(
+            url, {'recipes': recipe_ids}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        return {
+            result['id']: result['status']
+            for result in response.data['results']
+        }
+
+    def get_counts(self, field):
+        return dict(Recipe.objects.values_list('pk', field))
+
+    def test_add_favorites(self):
+        Favorite.objects.create(user=self.user, recipe=self.soup)
+
+        statuses = self.request('post', '/api/recipes/favorite/',
+                                [self.soup.pk, self.salad.pk, 999])
+
+        self.assertEqual(statuses, {
+            self.soup.pk: 'exists',
+            self.salad.pk: 'added',
+            999: 'not_found',
+        })
+        self.assertEqual(self.get_counts('favorites_count'), {
+            self.soup.pk: 1, self.salad.pk: 1,
+        })
+
+    def test_remove_favorites(self):
+        Favorite.objects.create(user=self.user, recipe=self.soup)
+
+        statuses = self.request('delete', '/api/recipes/favorite/',
+                                [self.soup.pk, self.salad.pk])
+
+        self.assertEqual(statuses, {
+            self.soup.pk: 'removed', self.salad.pk: 'absent',
+        })
+        self.assertFalse(Favorite.objects.exists())
+        self.assertEqual(self.get_counts('favorites_count'), {
+            self.soup.pk: 0, self.salad.pk: 0,
+        })
+
+    def test_add_and_remove_shopping_cart(self):
+        self.request('post', '/api/recipes/shopping_cart/',
+                     [self.soup.pk, self.salad.pk])
+
+        self.assertEqual(self.get_counts('in_carts_count'), {
+            self.soup.pk: 1, self.salad.pk: 1,
+        })
+        self.assertEqual(
+            ShoppingListIngredient.objects.get(user=self.user).total_amount,
+            7
+        )
+
+        self.request('delete', '/api/recipes/shopping_cart/', [self.soup.pk])
+
+        self.assertEqual(
+            list(ShoppingCart.objects.values_list('recipe_id', flat=True)),
+            [self.salad.pk]
+        )
+        self.assertEqual(
+            ShoppingListIngredient.objects.get(user=self.user).total_amount,
+            2
+        )
+
+    def test_repeated_add_does_not_change_counters(self):
+        self.request('post', '/api/recipes/favorite/', [self.soup.pk])
+        statuses = self.request('post', '/api/recipes/favorite/',
+                                [self.soup.pk])
+
+        self.assertEqual(statuses, {self.soup.pk: 'exists'})
+        self.assertEqual(self.get_counts('favorites_count')[self.soup.pk], 1)
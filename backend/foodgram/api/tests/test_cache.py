@@ -0,0 +1,174 @@
+from api.cache_stats import CacheStats
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from recipes.catalog import get_catalog_version
+from recipes.models import AmountIngredientRecipe
+from recipes.tests.factories import (make_ingredient, make_recipe, make_tag,
+                                     make_user)
+from rest_framework.test import APITestCase
+
+
+class CatalogETagTests(APITestCase):
+    """ETag и ответ 304 для справочников."""
+
+    url = '/api/tags/'
+
+    def setUp(self):
+        cache.clear()
+        self.tag = make_tag()
+
+    def test_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_catalog_change_changes_etag(self):
+        etag = self.client.get(self.url)['ETag']
+        new_tag = make_tag()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertIn(new_tag.pk, [tag['id'] for tag in response.data])
+
+    def test_new_version_cached_after_commit(self):
+        etag = self.client.get(self.url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            make_tag()
+
+        with self.assertNumQueries(0):
+            version = get_catalog_version()
+        self.assertNotIn(version, etag)
+
+    def test_etag_survives_cache_eviction(self):
+        etag = self.client.get(self.url)['ETag']
+        cache.clear()
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+
+
+class RecipeFragmentCacheTests(APITestCase):
+    """Кешированные данные рецептов сбрасываются при изменениях."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = make_user()
+        self.salt = make_ingredient()
+        self.recipe = make_recipe(self.author, {self.salt: 5})
+        self.url = f'/api/recipes/{self.recipe.pk}/'
+
+    def test_recipe_change(self):
+        self.client.get(self.url)
+        self.recipe.name = 'Новое название'
+        self.recipe.save()
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.data['name'], 'Новое название')
+
+    def test_ingredient_amount_change(self):
+        self.client.get(self.url)
+        AmountIngredientRecipe.objects.filter(recipe=self.recipe).update(
+            amount=5
+        )
+        amount = AmountIngredientRecipe.objects.get(recipe=self.recipe)
+        amount.amount = 7
+        amount.save()
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.data['ingredients'][0]['amount'], 7)
+
+    def test_author_change(self):
+        self.client.get('/api/recipes/')
+        self.author.first_name = 'Пётр'
+        self.author.save()
+
+        response = self.client.get('/api/recipes/')
+
+        self.assertEqual(
+            response.data['results'][0]['author']['first_name'], 'Пётр'
+        )
+
+    def test_patch_response_is_fresh(self):
+        tag = make_tag()
+        self.client.force_authenticate(self.author)
+        self.client.get(self.url)
+
+        response = self.client.patch(self.url, {
+            'tags': [tag.pk],
+            'ingredients': [{'id': self.salt.pk, 'amount': 9}],
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['ingredients'][0]['amount'], 9)
+        self.assertEqual(response.data['tags'][0]['id'], tag.pk)
+
+    def test_patch_changes_version_once(self):
+        self.client.force_authenticate(self.author)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(self.url, {
+                'tags': [make_tag().pk, make_tag().pk],
+                'ingredients': [
+                    {'id': self.salt.pk, 'amount': 9},
+                    {'id': make_ingredient().pk, 'amount': 1},
+                ],
+            }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len([
+            query for query in queries
+            if query['sql'].startswith(
+                'UPDATE "recipes_recipe" SET "cache_version"'
+            )
+        ]), 1)
+
+    def test_tag_recipes_cleared(self):
+        tag = make_tag()
+        self.recipe.tags.set([tag])
+        self.client.get(self.url)
+
+        tag.recipes_tags.clear()
+
+        self.assertEqual(self.client.get(self.url).data['tags'], [])
+
+
+class CacheStatsTests(APITestCase):
+    """Счётчики попаданий в кеш."""
+
+    def setUp(self):
+        cache.clear()
+        self.stats = CacheStats('test')
+
+    def test_values_survive_cache_eviction(self):
+        self.stats.record(hits=3)
+        self.stats.record(misses=1)
+        cache.clear()
+
+        self.assertEqual(self.stats.get(), {
+            'hits': 3, 'misses': 1, 'hit_rate': 0.75,
+        })
+
+    def test_shared_between_instances(self):
+        self.stats.record(hits=1)
+        self.stats.flush()
+        other = CacheStats('test')
+        other.record(misses=1)
+
+        self.assertEqual(other.get()['hits'], 1)
+        self.assertEqual(self.stats.get()['misses'], 1)
+
+    def test_reset(self):
+        self.stats.record(hits=2)
+        self.stats.reset()
+
+        self.assertEqual(self.stats.get()['hits'], 0)
@@ -0,0 +1,55 @@
+import json
+
+from django.core.cache import cache
+from recipes.models import ShoppingCart
+from recipes.tests.factories import make_ingredient, make_recipe, make_user
+from rest_framework.test import APITestCase
+
+
+class DownloadShoppingCartTests(APITestCase):
+    """Выгрузка списка покупок в разных форматах."""
+
+    url = '/api/recipes/download_shopping_cart/'
+
+    def setUp(self):
+        cache.clear()
+        self.user = make_user(first_name='Иван', last_name='Петров')
+        self.client.force_authenticate(self.user)
+        salt = make_ingredient(name='Соль', measurement_unit='г')
+        recipe = make_recipe(make_user(), {salt: 5})
+        ShoppingCart.objects.create(user=self.user, recipe=recipe)
+
+    def download(self, file_format):
+        response = self.client.get(self.url, {'format': file_format})
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content).decode()
+
+    def test_text(self):
+        content = self.download('txt')
+
+        self.assertIn('Иван Петров', content)
+        self.assertIn('Соль (г) - 5', content)
+
+    def test_csv(self):
+        content = self.download('csv')
+
+        self.assertEqual(
+            content.splitlines(), ['name,measurement_unit,amount', 'Соль,г,5']
+        )
+
+    def test_json(self):
+        content = json.loads(self.download('json'))
+
+        self.assertEqual(content, {
+            'user': 'Иван Петров',
+            'ingredients': [
+                {'name': 'Соль', 'measurement_unit': 'г', 'amount': 5}
+            ],
+        })
+
+    def test_empty_cart(self):
+        ShoppingCart.objects.all().delete()
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 400)
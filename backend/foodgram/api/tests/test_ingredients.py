@@ -0,0 +1,36 @@
+from django.core.cache import cache
+from recipes.tests.factories import make_ingredient
+from rest_framework.test import APITestCase
+
+
+class IngredientSearchTests(APITestCase):
+    """Поиск ингредиентов по началу названия."""
+
+    url = '/api/ingredients/'
+
+    def setUp(self):
+        cache.clear()
+        make_ingredient(name='Соль')
+        make_ingredient(name='Сахар')
+        make_ingredient(name='Перец')
+
+    def search(self, name):
+        response = self.client.get(self.url, {'name': name})
+        self.assertEqual(response.status_code, 200)
+        return [ingredient['name'] for ingredient in response.data]
+
+    def test_prefix(self):
+        self.assertEqual(self.search('с'), ['Сахар', 'Соль'])
+
+    def test_warm_lookup_without_queries(self):
+        self.search('с')
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.search('Со'), ['Соль'])
+
+    def test_new_ingredient(self):
+        self.search('с')
+
+        make_ingredient(name='Сода')
+
+        self.assertEqual(self.search('со'), ['Сода', 'Соль'])
@@ -0,0 +1,88 @@
+from api.metrics import CACHE_STATS
+from api.recipe_cache import fragment_stats
+from django.core.cache import cache
+from django.test import override_settings
+from prometheus_client.parser import text_string_to_metric_families
+from recipes.tests.factories import make_recipe, make_user
+from rest_framework.test import APITestCase
+
+
+@override_settings(METRICS_TOKEN='')
+class MetricsTests(APITestCase):
+    """Метрики Prometheus по адресу /metrics."""
+
+    url = '/metrics'
+
+    def setUp(self):
+        cache.clear()
+
+    def get_samples(self, **headers):
+        response = self.client.get(self.url, **headers)
+        self.assertEqual(response.status_code, 200)
+        return {
+            (sample.name, frozenset(sample.labels.items())): sample.value
+            for family in text_string_to_metric_families(
+                response.content.decode()
+            )
+            for sample in family.samples
+        }
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token(self):
+        for authorization in (None, 'Bearer wrong', 'secret'):
+            with self.subTest(authorization=authorization):
+                headers = {}
+                if authorization:
+                    headers['HTTP_AUTHORIZATION'] = authorization
+                response = self.client.get(self.url, **headers)
+                self.assertEqual(response.status_code, 403)
+
+        self.get_samples(HTTP_AUTHORIZATION='Bearer secret')
+
+    def test_request_counters(self):
+        key = ('foodgram_requests_total', frozenset({
+            'view': 'api:tags-list', 'method': 'GET', 'status': '200',
+        }.items()))
+        before = self.get_samples().get(key, 0)
+
+        self.client.get('/api/tags/')
+        self.client.get('/api/tags/')
+
+        samples = self.get_samples()
+        self.assertEqual(samples[key], before + 2)
+        labels = frozenset({'view': 'api:tags-list', 'method': 'GET'}.items())
+        for name in (
+            'foodgram_request_duration_seconds_count',
+            'foodgram_response_size_bytes_count',
+            'foodgram_db_queries_count',
+            'foodgram_db_duration_seconds_count',
+        ):
+            with self.subTest(name=name):
+                self.assertGreaterEqual(samples[(name, labels)], 2)
+
+    def test_cache_counters(self):
+        make_recipe(make_user())
+        self.client.get('/api/recipes/')
+        self.client.get('/api/recipes/')
+
+        samples = self.get_samples()
+
+        self.assertEqual(
+            samples[('foodgram_cache_hits_total', frozenset({
+                'cache': fragment_stats.name,
+            }.items()))],
+            1
+        )
+        for stats in CACHE_STATS:
+            labels = frozenset({'cache': stats.name}.items())
+            values = stats.get()
+            with self.subTest(cache=stats.name):
+                self.assertEqual(
+                    samples[('foodgram_cache_hits_total', labels)],
+                    values['hits']
+                )
+                self.assertEqual(
+                    samples[('foodgram_cache_misses_total', labels)],
+                    values['misses']
+                )
+                self.assertIn(('foodgram_cache_hit_ratio', labels), samples)
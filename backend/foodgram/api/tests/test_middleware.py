@@ -0,0 +1,45 @@
+import re
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from recipes.models import ShoppingCart
+from recipes.tests.factories import make_ingredient, make_recipe, make_user
+from rest_framework.test import APITestCase
+
+
+@override_settings(SQL_LOG_QUERIES=1)
+class QueryTimingTests(APITestCase):
+    """Учёт запросов к БД в query_timing_middleware."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = make_user()
+        self.client.force_authenticate(self.user)
+        recipe = make_recipe(make_user(), {make_ingredient(): 5})
+        ShoppingCart.objects.create(user=self.user, recipe=recipe)
+
+    def test_server_timing(self):
+        with self.assertLogs('api.middleware', 'WARNING'):
+            response = self.client.get('/api/tags/')
+
+        self.assertRegex(
+            response['Server-Timing'],
+            r'^db;desc="\d+ queries";dur=[\d.]+, total;dur=[\d.]+$'
+        )
+
+    def test_streaming_response(self):
+        with CaptureQueriesContext(connection) as queries:
+            with self.assertLogs('api.middleware', 'WARNING') as logs:
+                response = self.client.get(
+                    '/api/recipes/download_shopping_cart/'
+                )
+                self.assertEqual(logs.output, [])
+                b''.join(response.streaming_content)
+                response.close()
+
+        self.assertNotIn('Server-Timing', response)
+        [output] = logs.output
+        logged = int(re.search(r'(\d+) запросов к БД', output).group(1))
+        self.assertEqual(logged, len(queries))
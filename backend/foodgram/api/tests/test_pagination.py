@@ -0,0 +1,80 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.utils import timezone
+from recipes.models import Follow, Recipe
+from recipes.tests.factories import make_recipe, make_user
+from rest_framework.test import APITestCase
+
+
+class CursorPaginationTests(APITestCase):
+    """Пагинация рецептов по ключу (pub_date, id)."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = make_user()
+        recipes = [make_recipe(self.author) for _ in range(5)]
+        # Две пары рецептов с одинаковой датой публикации: порядок
+        # внутри пары задаёт id.
+        now = timezone.now()
+        for number, recipe in enumerate(recipes):
+            Recipe.objects.filter(pk=recipe.pk).update(
+                pub_date=now + timedelta(minutes=number // 2)
+            )
+        self.expected = list(
+            Recipe.objects.order_by('-pub_date', '-pk').values_list(
+                'pk', flat=True
+            )
+        )
+
+    def collect_pages(self, url, params):
+        ids, pages = [], 0
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            ids += [recipe['id'] for recipe in response.data['results']]
+            pages += 1
+            if response.data['next'] is None:
+                return ids, pages
+            response = self.client.get(response.data['next'])
+
+    def test_cursor_pages(self):
+        ids, pages = self.collect_pages(
+            '/api/recipes/', {'cursor': '', 'limit': 2}
+        )
+
+        self.assertEqual(ids, self.expected)
+        self.assertEqual(pages, 3)
+
+    def test_page_number_pagination_by_default(self):
+        response = self.client.get('/api/recipes/', {'limit': 2})
+
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results']],
+            self.expected[:2]
+        )
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/recipes/', {'cursor': 'abc'})
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_cursor_with_search(self):
+        response = self.client.get(
+            '/api/recipes/', {'cursor': '', 'search': 'Рецепт'}
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('cursor', response.data)
+
+    def test_feed(self):
+        user = make_user()
+        Follow.objects.create(user=user, author=self.author)
+        make_recipe(make_user())
+        self.client.force_authenticate(user)
+
+        ids, _ = self.collect_pages('/api/recipes/feed/', {'limit': 2})
+
+        self.assertEqual(ids, self.expected)
@@ -0,0 +1,310 @@
+import base64
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from api.recipe_cache import fragment_stats
+from api.serializers import RecipesSerializer
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from jobs.models import Job
+from PIL import Image
+from recipes.models import (Favorite, Follow, Recipe, ShoppingCart,
+                            ShoppingListIngredient)
+from recipes.tests.factories import (make_ingredient, make_recipe, make_tag,
+                                     make_user)
+from rest_framework.test import APITestCase
+
+
+def make_image():
+    """Картинка PNG в формате data URL для поля image."""
+
+    buffer = BytesIO()
+    Image.new('RGB', (8, 8)).save(buffer, format='PNG')
+    image = base64.b64encode(buffer.getvalue()).decode()
+    return f'data:image/png;base64,{image}'
+
+
+class RecipeCreateTests(APITestCase):
+    """Создание рецепта через API."""
+
+    url = '/api/recipes/'
+
+    def setUp(self):
+        cache.clear()
+        self.author = make_user()
+        self.breakfast = make_tag()
+        self.dinner = make_tag()
+        self.salt = make_ingredient()
+        self.sugar = make_ingredient()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client.force_authenticate(self.author)
+
+    def post(self, ingredients, tags=None):
+        return self.client.post(self.url, {
+            'name': 'Омлет',
+            'text': 'Взбить и пожарить',
+            'cooking_time': 10,
+            'image': make_image(),
+            'tags': tags or [self.breakfast.pk],
+            'ingredients': [
+                {'id': ingredient_id, 'amount': amount}
+                for ingredient_id, amount in ingredients
+            ],
+        }, format='json')
+
+    def count_create_queries(self, ingredients):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post(
+                (ingredient.pk, 1) for ingredient in ingredients
+            )
+        self.assertEqual(response.status_code, 201)
+        return len(queries)
+
+    def count_rejected_queries(self, ingredient_ids):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post((pk, 1) for pk in ingredient_ids)
+        self.assertEqual(response.status_code, 400)
+        return len(queries)
+
+    def test_create(self):
+        response = self.post(
+            [(self.salt.pk, 5), (self.sugar.pk, 10)],
+            tags=[self.breakfast.pk, self.dinner.pk]
+        )
+
+        self.assertEqual(response.status_code, 201)
+        recipe = Recipe.objects.get(pk=response.data['id'])
+        self.assertEqual(
+            dict(recipe.amount_ingredients.values_list(
+                'ingredient_id', 'amount'
+            )),
+            {self.salt.pk: 5, self.sugar.pk: 10}
+        )
+        self.assertEqual(
+            set(recipe.tags.values_list('pk', flat=True)),
+            {self.breakfast.pk, self.dinner.pk}
+        )
+        self.assertEqual(
+            recipe.tags_mask, self.breakfast.mask | self.dinner.mask
+        )
+
+    def test_created_recipe_found_by_tag(self):
+        response = self.post([(self.salt.pk, 5)], tags=[self.dinner.pk])
+
+        self.assertEqual(response.status_code, 201)
+        response = self.client.get(self.url, {'tags': self.dinner.slug})
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results']],
+            [Recipe.objects.get().pk]
+        )
+
+    def test_create_queries_do_not_depend_on_ingredients(self):
+        ingredients = [make_ingredient() for _ in range(20)]
+        self.count_create_queries(ingredients[:1])
+
+        self.assertEqual(
+            self.count_create_queries(ingredients),
+            self.count_create_queries(ingredients[:1])
+        )
+
+    def test_unknown_and_repeated_ingredients(self):
+        response = self.post([
+            (self.salt.pk, 5), (0, 1), (self.salt.pk, 2), (-1, 1),
+        ])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['ingredients'], [
+            'Ингредиент <<-1>> не существует',
+            'Ингредиент <<0>> не существует',
+            f'Ингредиент <<{self.salt.pk}>> повторяется',
+        ])
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_unknown_tags(self):
+        response = self.post(
+            [(self.salt.pk, 5)], tags=[self.breakfast.pk, 0, -1]
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['tags'], [
+            'Тег <<-1>> не существует', 'Тег <<0>> не существует',
+        ])
+
+    def test_validation_queries_do_not_depend_on_ingredients(self):
+        self.assertEqual(
+            self.count_rejected_queries(range(-20, 0)),
+            self.count_rejected_queries([-1])
+        )
+
+
+class RecipeUpdateTests(APITestCase):
+    """Изменение рецепта через API."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = make_user()
+        self.buyer = make_user()
+        self.tag = make_tag()
+        self.salt = make_ingredient()
+        self.sugar = make_ingredient()
+        self.recipe = make_recipe(
+            self.author, {self.salt: 5, self.sugar: 10}, tags=[self.tag]
+        )
+        ShoppingCart.objects.create(user=self.buyer, recipe=self.recipe)
+        self.client.force_authenticate(self.author)
+
+    def patch(self, **data):
+        data.setdefault('tags', [self.tag.pk])
+        return self.client.patch(
+            f'/api/recipes/{self.recipe.pk}/', data, format='json'
+        )
+
+    def test_update_ingredients_updates_shopping_lists(self):
+        pepper = make_ingredient()
+
+        response = self.patch(ingredients=[
+            {'id': self.salt.pk, 'amount': 7},
+            {'id': pepper.pk, 'amount': 1},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            dict(ShoppingListIngredient.objects.filter(
+                user=self.buyer
+            ).values_list('ingredient_id', 'total_amount')),
+            {self.salt.pk: 7, pepper.pk: 1}
+        )
+
+    def count_update_queries(self, ingredients, amount):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.patch(ingredients=[
+                {'id': ingredient.pk, 'amount': amount}
+                for ingredient in ingredients
+            ])
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_update_query_count_does_not_depend_on_ingredients(self):
+        ingredients = [make_ingredient() for _ in range(30)]
+        self.count_update_queries(ingredients[:1], 1)
+        few = self.count_update_queries(ingredients[:1], 2)
+        self.count_update_queries(ingredients, 1)
+        many = self.count_update_queries(ingredients, 2)
+
+        self.assertEqual(many, few)
+        self.assertEqual(
+            set(ShoppingListIngredient.objects.filter(
+                user=self.buyer
+            ).values_list('total_amount', flat=True)),
+            {2}
+        )
+
+    def test_update_keeps_counters(self):
+        Favorite.objects.create(user=self.buyer, recipe=self.recipe)
+
+        response = self.patch(
+            name='Новое название',
+            ingredients=[{'id': self.salt.pk, 'amount': 5}],
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.favorites_count, 1)
+        self.assertEqual(self.recipe.in_carts_count, 1)
+
+    def test_update_keeps_variants_written_meanwhile(self):
+        variants = {'card': {'webp': 'recipes/images/variants/a_card.webp'}}
+        update_ingredients = RecipesSerializer._update_ingredients
+
+        def write_variants(serializer, *args):
+            # Фоновая задача записывает копии изображения, пока
+            # обрабатывается запрос.
+            Recipe.objects.filter(pk=self.recipe.pk).update(
+                image_variants=variants
+            )
+            return update_ingredients(serializer, *args)
+
+        with mock.patch.object(RecipesSerializer, '_update_ingredients',
+                               write_variants):
+            response = self.patch(
+                name='Новое название',
+                ingredients=[{'id': self.salt.pk, 'amount': 5}],
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.name, 'Новое название')
+        self.assertEqual(self.recipe.image_variants, variants)
+
+    def test_image_change_schedules_stale_variants_cleanup(self):
+        variants = {'card': {'webp': 'recipes/images/variants/a_card.webp'}}
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            image_variants=variants
+        )
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+
+        with override_settings(MEDIA_ROOT=media_root):
+            response = self.patch(
+                image=make_image(),
+                ingredients=[{'id': self.salt.pk, 'amount': 5}],
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_variants, {})
+        job = Job.objects.get(name='recipes.generate_image_variants')
+        self.assertEqual(job.kwargs, {
+            'recipe_id': self.recipe.pk, 'stale_variants': variants,
+        })
+
+
+class RecipeListQueriesTests(APITestCase):
+    """Число запросов списка рецептов не зависит от размера страницы."""
+
+    url = '/api/recipes/'
+
+    def setUp(self):
+        cache.clear()
+        self.user = make_user()
+        tags = [make_tag(), make_tag()]
+        amounts = {make_ingredient(): 5, make_ingredient(): 10}
+        for _ in range(20):
+            author = make_user()
+            recipe = make_recipe(author, amounts, tags=tags)
+            Favorite.objects.create(user=self.user, recipe=recipe)
+            ShoppingCart.objects.create(user=self.user, recipe=recipe)
+            Follow.objects.create(user=self.user, author=author)
+
+    def assert_list_queries(self, limit, cold, warm):
+        cache.clear()
+        # Счётчики попаданий пишутся в БД по времени; сброс перед
+        # каждым запросом не даёт им попасть в измерение.
+        fragment_stats.flush()
+        with self.assertNumQueries(cold):
+            response = self.client.get(self.url, {'limit': limit})
+        self.assertEqual(len(response.data['results']), limit)
+        fragment_stats.flush()
+        with self.assertNumQueries(warm):
+            self.client.get(self.url, {'limit': limit})
+
+    def test_anonymous(self):
+        for limit in (1, 20):
+            with self.subTest(limit=limit):
+                self.assert_list_queries(limit, cold=6, warm=2)
+
+    def test_authenticated(self):
+        self.client.force_authenticate(self.user)
+
+        for limit in (1, 20):
+            with self.subTest(limit=limit):
+                self.assert_list_queries(limit, cold=6, warm=2)
@@ -0,0 +1,42 @@
+from django.core.cache import cache
+from recipes.tests.factories import make_recipe, make_user
+from rest_framework.test import APITestCase
+
+
+class RecipeSearchTests(APITestCase):
+    """Полнотекстовый поиск рецептов."""
+
+    def setUp(self):
+        cache.clear()
+        author = make_user()
+        self.borscht = make_recipe(
+            author, name='Борщ украинский', text='Свёкла, капуста и мясо'
+        )
+        self.salad = make_recipe(
+            author, name='Салат', text='Подходит к борщу или к супу'
+        )
+        self.pie = make_recipe(author, name='Пирог', text='Яблоки и мука')
+
+    def search(self, query):
+        response = self.client.get('/api/recipes/', {'search': query})
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_name_ranked_above_text(self):
+        self.assertEqual(self.search('борщ'), [self.borscht.pk, self.salad.pk])
+
+    def test_all_words_match(self):
+        self.assertEqual(self.search('яблоки мука'), [self.pie.pk])
+        self.assertEqual(self.search('яблоки капуста'), [])
+
+    def test_reindex_after_rename(self):
+        self.pie.name = 'Борщ зелёный'
+        self.pie.save()
+
+        self.assertIn(self.pie.pk, self.search('борщ'))
+        self.assertEqual(self.search('пирог'), [])
+
+    def test_deleted_recipe_not_found(self):
+        self.borscht.delete()
+
+        self.assertEqual(self.search('борщ'), [self.salad.pk])
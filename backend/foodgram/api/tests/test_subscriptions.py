@@ -0,0 +1,67 @@
+from django.core.cache import cache
+from recipes.models import Follow
+from recipes.tests.factories import make_recipe, make_user
+from rest_framework.test import APITestCase
+
+
+class SubscriptionsTests(APITestCase):
+    """Подписки на авторов."""
+
+    def setUp(self):
+        cache.clear()
+        self.user = make_user()
+        self.author = make_user()
+        self.client.force_authenticate(self.user)
+
+    def test_subscriptions_without_follows(self):
+        response = self.client.get(
+            '/api/users/subscriptions/', {'recipes_limit': 3}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [])
+
+    def test_subscriptions_limit_recipes_per_author(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        recipes = [make_recipe(self.author) for _ in range(4)]
+
+        response = self.client.get(
+            '/api/users/subscriptions/', {'recipes_limit': 2}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        [author] = response.data['results']
+        self.assertEqual(author['recipes_count'], 4)
+        self.assertEqual(
+            [recipe['id'] for recipe in author['recipes']],
+            [recipe.pk for recipe in recipes[:-3:-1]]
+        )
+
+    def test_subscribe_with_invalid_limit_does_not_subscribe(self):
+        response = self.client.post(
+            f'/api/users/{self.author.pk}/subscribe/?recipes_limit=abc'
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_subscriptions_with_non_decimal_digit_limit(self):
+        response = self.client.get(
+            '/api/users/subscriptions/', {'recipes_limit': '²'}
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('recipes_limit', response.data)
+
+    def test_subscribe(self):
+        make_recipe(self.author)
+
+        response = self.client.post(
+            f'/api/users/{self.author.pk}/subscribe/?recipes_limit=0'
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['recipes'], [])
+        self.assertTrue(Follow.objects.filter(
+            user=self.user, author=self.author
+        ).exists())
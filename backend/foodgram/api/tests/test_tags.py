@@ -0,0 +1,64 @@
+from django.core.cache import cache
+from recipes.tests.factories import (make_ingredient, make_recipe, make_tag,
+                                     make_user)
+from rest_framework.test import APITestCase
+
+
+class TagTests(APITestCase):
+    """Теги и фильтрация рецептов по тегам."""
+
+    def setUp(self):
+        cache.clear()
+        self.breakfast = make_tag()
+        self.dinner = make_tag()
+        self.lunch = make_tag()
+        author = make_user()
+        self.omelette = make_recipe(author, tags=[self.breakfast])
+        self.steak = make_recipe(author, tags=[self.dinner])
+        self.soup = make_recipe(author, tags=[self.lunch, self.dinner])
+
+    def get_recipe_ids(self, *slugs):
+        response = self.client.get('/api/recipes/', {'tags': slugs})
+        self.assertEqual(response.status_code, 200)
+        return {recipe['id'] for recipe in response.data['results']}
+
+    def test_tag_fields(self):
+        response = self.client.get(f'/api/tags/{self.breakfast.pk}/')
+
+        self.assertEqual(response.data, {
+            'id': self.breakfast.pk,
+            'name': self.breakfast.name,
+            'color': self.breakfast.color,
+            'slug': self.breakfast.slug,
+        })
+
+    def test_filter_by_tag(self):
+        self.assertEqual(
+            self.get_recipe_ids(self.dinner.slug),
+            {self.steak.pk, self.soup.pk}
+        )
+
+    def test_filter_by_any_of_tags(self):
+        self.assertEqual(
+            self.get_recipe_ids(self.breakfast.slug, self.lunch.slug),
+            {self.omelette.pk, self.soup.pk}
+        )
+
+    def test_filter_after_tag_removed(self):
+        self.soup.tags.remove(self.dinner)
+
+        self.assertEqual(self.get_recipe_ids(self.dinner.slug),
+                         {self.steak.pk})
+
+    def test_filter_after_recipe_update(self):
+        self.client.force_authenticate(self.omelette.author)
+
+        response = self.client.patch(f'/api/recipes/{self.omelette.pk}/', {
+            'tags': [self.lunch.pk],
+            'ingredients': [{'id': make_ingredient().pk, 'amount': 1}],
+        }, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.get_recipe_ids(self.lunch.slug),
+                         {self.omelette.pk, self.soup.pk})
+        self.assertEqual(self.get_recipe_ids(self.breakfast.slug), set())
@@ -1,8 +1,11 @@
 from api.views import (IngredientViewSet, RecipesViewSet, TagViewSet,
                        UsersViewSet)
+from django.conf import settings
 from django.urls import include, path, re_path
 from rest_framework.routers import DefaultRouter
 
+from .async_views import async_read_view
+
 app_name = 'api'
 
 router = DefaultRouter()
@@ -16,3 +19,81 @@ urlpatterns = [
     path('', include(router.urls)),
     re_path('auth/', include('djoser.urls.authtoken')),
 ]
+
+if settings.ASYNC_READ_VIEWS:
+    # Те же адреса, что и у роутера, но с асинхронными вьюхами.
+    # Стоят раньше маршрутов роутера, поэтому id только числовые:
+    # иначе recipes/feed/ и другие действия вьюсета попадут в detail.
+    async_urlpatterns = [
+        re_path(
+            r'^recipes/$',
+            async_read_view(
+                RecipesViewSet,
+                {'get': 'list', 'post': 'create'},
+                basename='recipes',
+                detail=False
+            ),
+            name='recipes-list'
+        ),
+        re_path(
+            r'^recipes/(?P<pk>\d+)/$',
+            async_read_view(
+                RecipesViewSet,
+                {
+                    'get': 'retrieve',
+                    'put': 'update',
+                    'patch': 'partial_update',
+                    'delete': 'destroy',
+                },
+                basename='recipes',
+                detail=True
+            ),
+            name='recipes-detail'
+        ),
+        re_path(
+            r'^tags/$',
+            async_read_view(
+                TagViewSet, {'get': 'list'}, basename='tags', detail=False
+            ),
+            name='tags-list'
+        ),
+        re_path(
+            r'^tags/(?P<pk>\d+)/$',
+            async_read_view(
+                TagViewSet, {'get': 'retrieve'}, basename='tags', detail=True
+            ),
+            name='tags-detail'
+        ),
+        re_path(
+            r'^ingredients/$',
+            async_read_view(
+                IngredientViewSet,
+                {'get': 'list'},
+                basename='ingredients',
+                detail=False
+            ),
+            name='ingredients-list'
+        ),
+        re_path(
+            r'^ingredients/(?P<pk>\d+)/$',
+            async_read_view(
+                IngredientViewSet,
+                {'get': 'retrieve'},
+                basename='ingredients',
+                detail=True
+            ),
+            name='ingredients-detail'
+        ),
+        re_path(
+            r'^users/subscriptions/$',
+            async_read_view(
+                UsersViewSet,
+                {'get': 'subscriptions'},
+                basename='users',
+                detail=False,
+                **UsersViewSet.subscriptions.kwargs
+            ),
+            name='users-subscriptions'
+        ),
+    ]
+    urlpatterns = async_urlpatterns + urlpatterns
@@ -1,18 +1,27 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import F, Sum
-from django.http.response import HttpResponse
+from django.db.models import (BooleanField, F, Prefetch, Value,
+                              prefetch_related_objects)
+from django.http.response import (HttpResponse, HttpResponseForbidden,
+                                  StreamingHttpResponse)
+from django.utils.crypto import constant_time_compare
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet as DjoserUserViewSet
-from recipes.models import (AmountIngredientRecipe, Favorite, Follow,
-                            Ingredient, Recipe, ShoppingCart, Tag)
-from rest_framework import permissions, status, viewsets
+from recipes.ingredient_index import ingredient_index
+from recipes.models import (Favorite, Follow, Ingredient, Recipe, ShoppingCart,
+                            Tag)
+from rest_framework import permissions, serializers, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
 
 from .filters import IngredientFilter, RecipeFilter
-from .mixins import FavoriteShoppingcartMixin
+from .metrics import render_metrics
+from .mixins import CatalogCacheMixin, FavoriteShoppingcartMixin
+from .pagination import FeedPagination, RecipePagination
 from .permissions import IsOwnerAdminOrReadOnly
+from .renderers import (CSVShoppingListRenderer, JSONShoppingListRenderer,
+                        TextShoppingListRenderer)
 from .serializers import (FollowSerializer, IngredientSerializer,
                           RecipesSerializer, TagSerializer)
 
@@ -22,6 +31,22 @@ User = get_user_model()
 class UsersViewSet(DjoserUserViewSet):
     """Вьюсет для пользователей"""
 
+    def get_recipes_limit(self):
+        """
+        Получает ограничение количества рецептов из параметра recipes_limit.
+
+        :return: Целое неотрицательное число или None, если не передано.
+        """
+
+        recipes_limit = self.request.query_params.get('recipes_limit')
+        if recipes_limit is None:
+            return None
+        if not recipes_limit.isdecimal():
+            raise serializers.ValidationError(
+                {'recipes_limit': 'Должно быть целым неотрицательным числом'}
+            )
+        return int(recipes_limit)
+
     @action(
         methods=['post', 'delete'],
         detail=True,
@@ -65,11 +90,15 @@ class UsersViewSet(DjoserUserViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        recipes_limit = self.get_recipes_limit()
         Follow.objects.create(user=user, author=author)
 
         serializer = FollowSerializer(
             author,
-            context={'request': request}
+            context={
+                'request': request,
+                'recipes_limit': recipes_limit,
+            }
         )
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -82,13 +111,30 @@ class UsersViewSet(DjoserUserViewSet):
         """
         Получаем всех пользователей на которых подписан.
 
+        Параметр recipes_limit ограничивает количество рецептов каждого
+        автора. Количество рецептов берётся из счётчика автора, а сами
+        рецепты подгружаются одним запросом для всей страницы.
+
         :param request: данные запроса.
         :return: Возвращает сериализованные данные через FollowSerializer
                  с пагинацией.
         """
 
-        queryset = User.objects.filter(following__user_id=request.user.id)
+        queryset = User.objects.filter(
+            following__user_id=request.user.id
+        ).annotate(
+            is_subscribed=Value(True, output_field=BooleanField()),
+        ).order_by('username')
         page = self.paginate_queryset(queryset)
+
+        recipes = Recipe.objects.filter(author__in=page)
+        recipes_limit = self.get_recipes_limit()
+        if recipes_limit is not None:
+            recipes = recipes.limit_per_author(recipes_limit)
+        prefetch_related_objects(
+            page,
+            Prefetch('recipes', queryset=recipes, to_attr='limited_recipes')
+        )
         serializer = FollowSerializer(
             page,
             many=True,
@@ -97,7 +143,7 @@ class UsersViewSet(DjoserUserViewSet):
         return self.get_paginated_response(serializer.data)
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(CatalogCacheMixin, viewsets.ReadOnlyModelViewSet):
     """
     Вьюсет для тегов.
 
@@ -109,7 +155,7 @@ class TagViewSet(viewsets.ReadOnlyModelViewSet):
     pagination_class = None
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(CatalogCacheMixin, viewsets.ReadOnlyModelViewSet):
     """
     Вьюсет для ингредиентов.
 
@@ -123,16 +169,56 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
 
+    def list(self, request, *args, **kwargs):
+        """
+        Список ингредиентов с поиском по началу названия.
+
+        Данные берутся из индекса в памяти процесса без запросов к БД,
+        поэтому дополнительно в кеше не сохраняются.
+        """
+
+        return self.get_catalog_response(
+            self.search_ingredients, request, cache_data=False
+        )
+
+    def search_ingredients(self, request):
+        return Response(ingredient_index.search(
+            request.query_params.get('name', ''), self.catalog_version
+        ))
+
 
 class RecipesViewSet(viewsets.ModelViewSet, FavoriteShoppingcartMixin):
     """Вьюсет для рецептов"""
 
-    queryset = Recipe.objects.all()
     serializer_class = RecipesSerializer
     permission_classes = (IsOwnerAdminOrReadOnly,)
+    pagination_class = RecipePagination
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
 
+    def get_queryset(self):
+        """
+        Рецепты с признаками для текущего пользователя.
+
+        Связанные данные подгружаются сериализатором только для рецептов,
+        которых нет в кеше, поэтому количество запросов к БД на страницу
+        не зависит от её размера.
+        """
+
+        return Recipe.objects.with_user_flags(self.request.user)
+
+    def perform_create(self, serializer):
+        serializer.save()
+        serializer.instance = self.get_queryset().get(
+            pk=serializer.instance.pk
+        )
+
+    def perform_update(self, serializer):
+        serializer.save()
+        serializer.instance = self.get_queryset().get(
+            pk=serializer.instance.pk
+        )
+
     @action(
         methods=['post', 'delete'],
         detail=True,
@@ -175,17 +261,80 @@ class RecipesViewSet(viewsets.ModelViewSet, FavoriteShoppingcartMixin):
             related_model=ShoppingCart
         )
 
+    @action(
+        methods=['post', 'delete'],
+        detail=False,
+        url_path='favorite',
+        permission_classes=[permissions.IsAuthenticated],
+    )
+    def favorite_bulk(self, request):
+        """
+        Добавляет(удаляет) несколько рецептов в избранное.
+
+        :param request: данные запроса со списком id в поле recipes.
+        :return: Статус операции для каждого id.
+        """
+
+        return self.bulk_add_del_to_db(request, Favorite)
+
+    @action(
+        methods=['post', 'delete'],
+        detail=False,
+        url_path='shopping_cart',
+        permission_classes=[permissions.IsAuthenticated],
+    )
+    def shopping_cart_bulk(self, request):
+        """
+        Добавляет(удаляет) несколько рецептов в корзину для покупок.
+
+        :param request: данные запроса со списком id в поле recipes.
+        :return: Статус операции для каждого id.
+        """
+
+        return self.bulk_add_del_to_db(request, ShoppingCart)
+
+    @action(
+        methods=['get'],
+        detail=False,
+        permission_classes=[permissions.IsAuthenticated],
+        pagination_class=FeedPagination,
+    )
+    def feed(self, request):
+        """
+        Лента рецептов авторов, на которых подписан пользователь.
+
+        Рецепты отсортированы по дате публикации. Пагинация по ключу:
+        следующая страница доступна по ссылке next.
+
+        :param request: данные запроса.
+        :return: Страница сериализованных рецептов.
+        """
+
+        page = self.paginate_queryset(
+            self.get_queryset().followed_by(request.user)
+        )
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
     @action(
         methods=['get'],
         detail=False,
         permission_classes=[IsOwnerAdminOrReadOnly],
+        renderer_classes=[
+            TextShoppingListRenderer,
+            CSVShoppingListRenderer,
+            JSONShoppingListRenderer,
+        ],
     )
     def download_shopping_cart(self, request):
         """
         Формирует файл списка продуктов из рецептов в списке покупок.
 
-        :param request:
-        :return:
+        Формат файла выбирается параметром format: txt (по умолчанию),
+        csv или json. Файл отдаётся потоком по мере чтения строк из БД.
+
+        :param request: данные запроса.
+        :return: Потоковый ответ с файлом списка продуктов.
         """
 
         user = request.user
@@ -196,29 +345,35 @@ class RecipesViewSet(viewsets.ModelViewSet, FavoriteShoppingcartMixin):
         if not user.shoppingcart.all().exists():
             return Response(status=status.HTTP_400_BAD_REQUEST)
 
-        recipes_of_user = user.shoppingcart.values('recipe')
-        ingredients_in_recipes = AmountIngredientRecipe.objects.filter(
-            recipe__in=recipes_of_user
-        )
-        sum_ingredients = ingredients_in_recipes.values(
+        sum_ingredients = user.shopping_list.values(
             ingredient_name=F('ingredient__name'),
-            measurement_unit=F('ingredient__measurement_unit')
-        ).annotate(amount=Sum('amount'))
-
-        list_ingredients = (f'Список продуктов для пользователя с именем: '
-                            f'{user.get_full_name()}\n\n')
-
-        for ingredient in sum_ingredients:
-            ingredient_str = (f'{ingredient["ingredient_name"]} '
-                              f'({ingredient["measurement_unit"]}) - '
-                              f'{ingredient["amount"]}\n')
-            list_ingredients += ingredient_str
-
-        file_name = f'shopping_cart_{user.username}.txt'
-        response = HttpResponse(
-            content=list_ingredients,
-            content_type='text/plain; charset=utf-8',
+            measurement_unit=F('ingredient__measurement_unit'),
+            amount=F('total_amount'),
+        ).order_by('ingredient_name')
+
+        renderer = request.accepted_renderer
+        file_name = f'shopping_cart_{user.username}.{renderer.extension}'
+        response = StreamingHttpResponse(
+            renderer.stream(user, sum_ingredients.iterator()),
+            content_type=f'{renderer.media_type}; charset=utf-8',
             status=status.HTTP_200_OK,
         )
         response['Content-Disposition'] = f'attachment; filename={file_name}'
         return response
+
+
+def metrics(request):
+    """
+    Метрики приложения в текстовом формате Prometheus.
+
+    Если задан METRICS_TOKEN, требуется заголовок
+    Authorization: Bearer <токен>.
+    """
+
+    token = settings.METRICS_TOKEN
+    if token and not constant_time_compare(
+        request.headers.get('Authorization', ''), f'Bearer {token}'
+    ):
+        return HttpResponseForbidden()
+    content, content_type = render_metrics()
+    return HttpResponse(content, content_type=content_type)
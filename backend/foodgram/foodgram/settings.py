@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/3.2/ref/settings/
 """
 
 import os
+import tempfile
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -49,10 +50,13 @@ INSTALLED_APPS = [
     'djoser',
     'django_filters',
     'recipes',
+    'jobs',
     'corsheaders',
 ]
 
 MIDDLEWARE = [
+    'api.middleware.query_timing_middleware',
+    'api.middleware.metrics_middleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -98,6 +102,30 @@ DATABASES = {
     }
 }
 
+# Кеш используется для версий справочников и сериализованных данных.
+# Для нескольких процессов gunicorn он должен быть общим.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            'django.core.cache.backends.filebased.FileBasedCache'
+        ),
+        'LOCATION': os.getenv(
+            'CACHE_LOCATION',
+            os.path.join(tempfile.gettempdir(), 'foodgram_cache')
+        ),
+    }
+}
+# Версии данных и статистика кеша хранятся в БД, в кеше лежат только
+# данные, которые можно вычислить заново. Лимит записей задаётся для
+# файлового кеша и кеша в памяти; memcached передаёт OPTIONS клиенту
+# и ограничивает объём сам.
+if CACHES['default']['BACKEND'].endswith(('FileBasedCache', 'LocMemCache')):
+    CACHES['default']['OPTIONS'] = {
+        'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 5000)),
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -150,7 +178,7 @@ AUTH_USER_MODEL = 'users.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
@@ -162,6 +190,27 @@ REST_FRAMEWORK = {
     ),
 }
 
+# Асинхронные вьюхи чтения рецептов, тегов, ингредиентов и подписок.
+# Включаются только для процессов, запущенных через ASGI (foodgram.asgi).
+ASYNC_READ_VIEWS = os.getenv('ASYNC_READ_VIEWS', 'False') == 'True'
+
+# Размер пула потоков для запросов к БД из асинхронных вьюх.
+# Каждый поток держит своё соединение с БД.
+ASYNC_DB_THREADS = int(os.getenv('ASYNC_DB_THREADS', 8))
+
+# Время хранения токена и пользователя в кеше, секунды
+AUTH_TOKEN_CACHE_TIMEOUT = int(os.getenv('AUTH_TOKEN_CACHE_TIMEOUT', 300))
+
+# Пороги записи в лог запросов: полное время и время работы с БД в мс,
+# количество запросов к БД и повторов одного запроса (признак N+1)
+SQL_LOG_REQUEST_TIME = int(os.getenv('SQL_LOG_REQUEST_TIME', 1000))
+SQL_LOG_DB_TIME = int(os.getenv('SQL_LOG_DB_TIME', 300))
+SQL_LOG_QUERIES = int(os.getenv('SQL_LOG_QUERIES', 30))
+SQL_REPEAT_THRESHOLD = int(os.getenv('SQL_REPEAT_THRESHOLD', 5))
+
+# Токен для доступа к /metrics; если не задан, метрики доступны всем
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
 # Настройка djoser
 
 DJOSER = {
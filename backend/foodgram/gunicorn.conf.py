@@ -0,0 +1,22 @@
+import os
+import shutil
+
+# Каталог, через который воркеры делятся метриками для /metrics.
+# Задаётся до импорта prometheus_client: режим выбирается при импорте.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', '/tmp/foodgram_metrics')
+
+
+def on_starting(server):
+    """Удаляет метрики предыдущего запуска."""
+
+    path = os.environ['PROMETHEUS_MULTIPROC_DIR']
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path)
+
+
+def child_exit(server, worker):
+    """Убирает из метрик значения завершившегося воркера."""
+
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,16 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    """Настройки отображения фоновых задач в админке"""
+
+    list_display = (
+        'id', 'name', 'status', 'attempts', 'run_at', 'created', 'finished'
+    )
+    list_filter = ('status',)
+    search_fields = ('name',)
+    readonly_fields = ('attempts', 'locked_until', 'last_error', 'finished')
+    list_per_page = 20
@@ -0,0 +1,51 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from jobs.models import Job
+
+
+class Command(BaseCommand):
+    help = 'Показывает состояние очереди фоновых задач'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'job_id',
+            nargs='?',
+            type=int,
+            help='id задачи для подробного вывода'
+        )
+        parser.add_argument(
+            '--failed',
+            type=int,
+            default=5,
+            help='Сколько последних задач с ошибкой показать'
+        )
+
+    def handle(self, *args, **options):
+        if options['job_id'] is not None:
+            self.show_job(options['job_id'])
+            return
+
+        counts = Job.objects.order_by().values(
+            'name', 'status'
+        ).annotate(total=Count('pk')).order_by('name', 'status')
+        for row in counts:
+            self.stdout.write(
+                f'{row["name"]:<40} {row["status"]:<10} {row["total"]}')
+
+        failed = Job.objects.filter(status=Job.FAILED).order_by(
+            '-finished')[:options['failed']]
+        for job in failed:
+            error = job.last_error.strip().splitlines()
+            self.stdout.write(self.style.ERROR(
+                f'#{job.pk} {job.name} {job.finished:%Y-%m-%d %H:%M:%S}: '
+                f'{error[-1] if error else ""}'))
+
+    def show_job(self, job_id):
+        job = Job.objects.filter(pk=job_id).first()
+        if job is None:
+            raise CommandError(f'Задача {job_id} не найдена')
+        for field in ('name', 'kwargs', 'status', 'attempts', 'max_attempts',
+                      'run_at', 'locked_until', 'created', 'finished'):
+            self.stdout.write(f'{field}: {getattr(job, field)}')
+        if job.last_error:
+            self.stdout.write(job.last_error)
@@ -0,0 +1,127 @@
+import logging
+import signal
+import threading
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from jobs.queue import claim, purge_finished, run_job
+
+PURGE_INTERVAL = 3600
+ERROR_BACKOFF_MAX = 60
+
+logger = logging.getLogger(__name__)
+
+
+def work(stop, lease, interval, burst):
+    """
+    Цикл обработчика: забирает задачи из очереди и выполняет их.
+
+    Ошибка при получении задачи или записи результата, например
+    разрыв соединения с БД, не завершает поток: соединение закрывается,
+    и после паузы, растущей с каждой ошибкой подряд, цикл продолжается
+    с новым соединением.
+
+    :param stop: threading.Event для остановки.
+    :param lease: Время блокировки задачи.
+    :param interval: Пауза между опросами пустой очереди в секундах.
+    :param burst: Завершиться, когда очередь опустеет.
+    """
+
+    errors = 0
+    try:
+        while not stop.is_set():
+            close_old_connections()
+            try:
+                job = claim(lease)
+                if job is not None:
+                    run_job(job)
+            except Exception:
+                logger.exception('Ошибка обработчика задач')
+                connection.close()
+                errors += 1
+                stop.wait(min(interval * 2 ** errors, ERROR_BACKOFF_MAX))
+                continue
+            errors = 0
+            if job is not None:
+                continue
+            if burst:
+                break
+            stop.wait(interval)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Запускает обработчик фоновых задач из очереди в БД'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-c',
+            '--concurrency',
+            type=int,
+            default=1,
+            help='Количество потоков-обработчиков'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='Пауза между опросами пустой очереди, секунды'
+        )
+        parser.add_argument(
+            '--lease',
+            type=int,
+            default=300,
+            help='Через сколько секунд зависшая задача снова доступна'
+        )
+        parser.add_argument(
+            '--retention',
+            type=int,
+            default=7,
+            help=('Сколько дней хранить завершённые задачи; '
+                  '0 — не удалять')
+        )
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='Выполнить задачи из очереди и завершиться'
+        )
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *args: stop.set())
+
+        workers = [
+            threading.Thread(
+                target=work,
+                args=(
+                    stop,
+                    timedelta(seconds=options['lease']),
+                    options['interval'],
+                    options['burst'],
+                ),
+                name=f'worker-{number}',
+            )
+            for number in range(options['concurrency'])
+        ]
+        for worker in workers:
+            worker.start()
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработчик запущен, потоков: {options["concurrency"]}'))
+
+        retention = timedelta(days=options['retention'])
+        purged_at = None
+        try:
+            while any(worker.is_alive() for worker in workers):
+                if retention and (purged_at is None or time.monotonic()
+                                  - purged_at >= PURGE_INTERVAL):
+                    purge_finished(retention)
+                    purged_at = time.monotonic()
+                for worker in workers:
+                    worker.join(timeout=1)
+        finally:
+            connection.close()
+        self.stdout.write(self.style.SUCCESS('Обработчик остановлен.'))
@@ -0,0 +1,178 @@
+import logging
+import traceback
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+BACKOFF_BASE = 10
+BACKOFF_MAX = 3600
+
+registry = {}
+
+
+def task(name, max_attempts=Job.MAX_ATTEMPTS):
+    """
+    Регистрирует функцию как фоновую задачу.
+
+    :param name: Уникальное имя задачи в очереди.
+    :param max_attempts: Количество попыток выполнения по умолчанию.
+    :return: Декоратор, возвращающий функцию без изменений.
+    """
+
+    def decorator(func):
+        func.task_name = name
+        func.max_attempts = max_attempts
+        registry[name] = func
+        return func
+
+    return decorator
+
+
+def enqueue(name, delay=0, **kwargs):
+    """
+    Ставит задачу в очередь.
+
+    Если вызов выполняется внутри транзакции, задача станет видна
+    обработчикам только после её фиксации.
+
+    :param name: Имя зарегистрированной задачи.
+    :param delay: Задержка запуска в секундах.
+    :param kwargs: Именованные аргументы задачи, сериализуемые в JSON.
+    :return: Созданный объект Job.
+    """
+
+    func = registry.get(name)
+    return Job.objects.create(
+        name=name,
+        kwargs=kwargs,
+        max_attempts=getattr(func, 'max_attempts', Job.MAX_ATTEMPTS),
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def claim(lease):
+    """
+    Забирает следующую готовую к запуску задачу.
+
+    В PostgreSQL строка выбирается через SELECT ... FOR UPDATE SKIP LOCKED,
+    поэтому обработчики не ждут друг друга. Задача, обработчик которой
+    не уложился в lease, снова становится доступной, если попытки
+    не исчерпаны, иначе помечается как завершённая с ошибкой.
+
+    :param lease: Время блокировки задачи, timedelta.
+    :return: Объект Job или None, если очередь пуста.
+    """
+
+    now = timezone.now()
+    fail_expired(now)
+    with transaction.atomic():
+        job = Job.objects.select_for_update(skip_locked=True).filter(
+            Q(status=Job.QUEUED, run_at__lte=now)
+            | Q(status=Job.RUNNING, locked_until__lt=now,
+                attempts__lt=F('max_attempts'))
+        ).order_by('run_at', 'pk').first()
+        if job is None:
+            return None
+        claimed = Job.objects.filter(
+            pk=job.pk, attempts=job.attempts
+        ).update(
+            status=Job.RUNNING,
+            attempts=F('attempts') + 1,
+            locked_until=now + lease,
+        )
+    if not claimed:
+        return None
+    job.refresh_from_db()
+    return job
+
+
+def fail_expired(now):
+    """
+    Завершает с ошибкой зависшие задачи, у которых не осталось попыток.
+
+    :param now: Текущее время.
+    :return: Количество таких задач.
+    """
+
+    return Job.objects.filter(
+        status=Job.RUNNING,
+        locked_until__lt=now,
+        attempts__gte=F('max_attempts'),
+    ).update(
+        status=Job.FAILED,
+        locked_until=None,
+        finished=now,
+        last_error='Обработчик не завершил задачу за время блокировки',
+    )
+
+
+def purge_finished(retention):
+    """
+    Удаляет завершённые задачи старше retention.
+
+    :param retention: Сколько хранить выполненные и завершённые
+        с ошибкой задачи, timedelta.
+    :return: Количество удалённых задач.
+    """
+
+    return Job.objects.filter(
+        status__in=(Job.DONE, Job.FAILED),
+        finished__lt=timezone.now() - retention,
+    ).delete()[0]
+
+
+def get_backoff(attempts):
+    """Пауза перед повторной попыткой, растущая экспоненциально."""
+
+    return timedelta(seconds=min(BACKOFF_BASE * 2 ** (attempts - 1),
+                                 BACKOFF_MAX))
+
+
+def run_job(job):
+    """
+    Выполняет задачу и записывает результат.
+
+    При ошибке задача возвращается в очередь с паузой, пока не исчерпаны
+    попытки, после чего помечается как завершённая с ошибкой.
+    Результат записывается, только если задачу с этой попыткой
+    не забрал другой обработчик после истечения блокировки.
+
+    :param job: Объект Job, полученный через claim.
+    :return: Итоговый статус задачи или None, если результат
+        не записан.
+    """
+
+    func = registry.get(job.name)
+    try:
+        if func is None:
+            raise LookupError(f'Задача {job.name} не зарегистрирована')
+        func(**job.kwargs)
+    except Exception:
+        logger.exception('Ошибка фоновой задачи %s', job)
+        now = timezone.now()
+        fields = {'locked_until': None, 'last_error': traceback.format_exc()}
+        if job.attempts < job.max_attempts:
+            fields.update(status=Job.QUEUED,
+                          run_at=now + get_backoff(job.attempts))
+        else:
+            fields.update(status=Job.FAILED, finished=now)
+    else:
+        fields = {
+            'status': Job.DONE,
+            'locked_until': None,
+            'finished': timezone.now(),
+        }
+    updated = Job.objects.filter(
+        pk=job.pk, status=Job.RUNNING, attempts=job.attempts
+    ).update(**fields)
+    if not updated:
+        logger.warning('Задачу %s забрал другой обработчик, результат '
+                       'попытки %s не записан', job, job.attempts)
+        return None
+    return fields['status']
@@ -0,0 +1,138 @@
+import threading
+from datetime import timedelta
+from unittest import mock
+
+from django.db import OperationalError
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from jobs.management.commands.run_worker import work
+from jobs.models import Job
+from jobs.queue import claim, enqueue, purge_finished, run_job, task
+
+LEASE = timedelta(minutes=5)
+calls = []
+
+
+@task('tests.record', max_attempts=2)
+def record(value):
+    calls.append(value)
+
+
+@task('tests.fail', max_attempts=2)
+def fail():
+    raise RuntimeError('Ошибка')
+
+
+class QueueTests(TestCase):
+    """Очередь фоновых задач в БД."""
+
+    def setUp(self):
+        calls.clear()
+
+    def expire(self, job):
+        Job.objects.filter(pk=job.pk).update(
+            locked_until=timezone.now() - timedelta(seconds=1)
+        )
+
+    def test_run(self):
+        enqueue('tests.record', value=1)
+
+        job = claim(LEASE)
+
+        self.assertEqual(run_job(job), Job.DONE)
+        self.assertEqual(calls, [1])
+        self.assertIsNone(claim(LEASE))
+
+    def test_retry_then_fail(self):
+        enqueue('tests.fail')
+
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            job = claim(LEASE)
+            self.assertEqual(run_job(job), Job.QUEUED)
+            Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+            job = claim(LEASE)
+
+            self.assertEqual(job.attempts, 2)
+            self.assertEqual(run_job(job), Job.FAILED)
+        self.assertIsNone(claim(LEASE))
+
+    def test_reclaim_expired_job(self):
+        job = enqueue('tests.record', value=1)
+        claim(LEASE)
+        self.expire(job)
+
+        job = claim(LEASE)
+
+        self.assertEqual(job.status, Job.RUNNING)
+        self.assertEqual(job.attempts, 2)
+
+    def test_expired_job_without_attempts_fails(self):
+        job = enqueue('tests.record', value=1)
+        claim(LEASE)
+        self.expire(job)
+        claim(LEASE)
+        self.expire(job)
+
+        self.assertIsNone(claim(LEASE))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+        self.assertIsNotNone(job.finished)
+
+    def test_result_of_reclaimed_job_not_written(self):
+        enqueue('tests.record', value=1)
+        stale = claim(LEASE)
+        self.expire(stale)
+        job = claim(LEASE)
+
+        with self.assertLogs('jobs.queue', 'WARNING'):
+            self.assertIsNone(run_job(stale))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.RUNNING)
+        self.assertIsNone(job.finished)
+        self.assertEqual(run_job(job), Job.DONE)
+
+    def test_purge_finished(self):
+        old = timezone.now() - timedelta(days=8)
+        done = enqueue('tests.record', value=1)
+        failed = enqueue('tests.record', value=2)
+        recent = enqueue('tests.record', value=3)
+        queued = enqueue('tests.record', value=4)
+        Job.objects.filter(pk__in=[done.pk, failed.pk]).update(
+            status=Job.DONE, finished=old
+        )
+        Job.objects.filter(pk=failed.pk).update(status=Job.FAILED)
+        Job.objects.filter(pk=recent.pk).update(
+            status=Job.DONE, finished=timezone.now()
+        )
+
+        self.assertEqual(purge_finished(timedelta(days=7)), 2)
+        self.assertEqual(
+            set(Job.objects.values_list('pk', flat=True)),
+            {recent.pk, queued.pk}
+        )
+
+
+class WorkerTests(TransactionTestCase):
+    """Цикл обработчика задач."""
+
+    def setUp(self):
+        calls.clear()
+
+    def test_database_error_does_not_stop_worker(self):
+        enqueue('tests.record', value=1)
+        errors = [OperationalError('Соединение с БД разорвано')]
+
+        def flaky_claim(lease):
+            if errors:
+                raise errors.pop()
+            return claim(lease)
+
+        with mock.patch('jobs.management.commands.run_worker.claim',
+                        flaky_claim):
+            with self.assertLogs('jobs.management.commands.run_worker',
+                                 'ERROR'):
+                work(threading.Event(), LEASE, 0, burst=True)
+
+        self.assertEqual(calls, [1])
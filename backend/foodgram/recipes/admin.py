@@ -1,89 +1,145 @@
 from django.contrib import admin
+from django.utils.text import Truncator
 
 from .models import (AmountIngredientRecipe, Favorite, Follow, Ingredient,
                      Recipe, ShoppingCart, Tag)
+from .paginator import EstimatedCountPaginator
 
 admin.site.site_header = 'Администрирование Foodgram'
 admin.site.index_title = 'Управление Foodgram'
 
 
+class LargeTableAdmin(admin.ModelAdmin):
+    """
+    Базовые настройки админки для больших таблиц.
+
+    Не считает общее количество строк при поиске и фильтрации,
+    а для списка без фильтров использует оценку количества строк.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 20
+
+
+class AmountIngredientInline(admin.TabularInline):
+    """
+    Ингредиенты на странице рецепта.
+
+    Изменённые строки сохраняются через save() и delete(), поэтому
+    обработчики сигналов из recipes.signals переносят правки в списки
+    продуктов пользователей.
+    """
+
+    model = AmountIngredientRecipe
+    autocomplete_fields = ('ingredient',)
+    extra = 0
+    min_num = 1
+
+
 @admin.register(Recipe)
-class RecipesAdmin(admin.ModelAdmin):
+class RecipesAdmin(LargeTableAdmin):
     """Настройки отображения рецептов в админке"""
 
     list_display = (
         'id',
         'name',
         'author',
-        'text',
+        'short_text',
         'cooking_time',
         'image',
         'pub_date',
         'in_favorite'
     )
     list_display_links = ('name',)
-    list_filter = ('tags', 'author', 'name')
-    search_fields = ('name', 'author__username', 'tags__slug')
-    list_per_page = 20
+    list_select_related = ('author',)
+    list_filter = ('tags',)
+    search_fields = ('name', 'author__username')
+    autocomplete_fields = ('author', 'tags')
+    inlines = (AmountIngredientInline,)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).defer('image_variants')
+
+    def short_text(self, obj):
+        """
+        Начало текста рецепта.
+
+        :param obj: Объект рецепта.
+        :return: Первые 50 символов текста.
+        """
+
+        return Truncator(obj.text).chars(50)
+
+    short_text.short_description = 'Текст'
 
     def in_favorite(self, obj):
         """
-        Вычисляет количество добавлений рецепта в избранное.
+        Количество добавлений рецепта в избранное.
 
         :param obj: Объект рецепта.
         :return: Количество рецепта в избранном у всех пользователей.
         """
 
-        return len(Favorite.objects.filter(recipe=obj.id))
+        return obj.favorites_count
 
     in_favorite.short_description = 'В избранном'
+    in_favorite.admin_order_field = 'favorites_count'
 
 
 @admin.register(Ingredient)
-class IngredientAdmin(admin.ModelAdmin):
+class IngredientAdmin(LargeTableAdmin):
     """Настройки отображения ингредиентов в админке"""
 
     list_display = ('name', 'measurement_unit')
-    list_filter = ('name',)
     search_fields = ('name',)
-    list_per_page = 20
+    ordering = ('name',)
 
 
 @admin.register(AmountIngredientRecipe)
-class AmountIngredientRecipeAdmin(admin.ModelAdmin):
-    """Настройки отображения количества ингредиентов в админке"""
+class AmountIngredientRecipeAdmin(LargeTableAdmin):
+    """
+    Настройки отображения количества ингредиентов в админке.
+
+    Правки в списке, как и в AmountIngredientInline, обновляют списки
+    продуктов через сигналы.
+    """
 
     list_display = ('id', 'amount', 'ingredient', 'recipe')
     list_editable = ('amount',)
+    list_select_related = ('ingredient', 'recipe')
     search_fields = ('ingredient__name', 'recipe__name')
-    list_per_page = 20
+    autocomplete_fields = ('ingredient', 'recipe')
 
 
 @admin.register(Favorite)
-class FavoriteAdmin(admin.ModelAdmin):
+class FavoriteAdmin(LargeTableAdmin):
     """Настройки отображения избранного в админке"""
 
     list_display = ('id', 'user', 'recipe')
+    list_select_related = ('user', 'recipe')
     search_fields = ('user__username', 'recipe__name')
-    list_per_page = 20
+    autocomplete_fields = ('user', 'recipe')
 
 
 @admin.register(ShoppingCart)
-class ShoppingCartAdmin(admin.ModelAdmin):
+class ShoppingCartAdmin(LargeTableAdmin):
     """Настройки отображения корзин покупок пользователей в админке"""
 
     list_display = ('id', 'user', 'recipe')
+    list_select_related = ('user', 'recipe')
     search_fields = ('user__username', 'recipe__name')
-    list_per_page = 20
+    autocomplete_fields = ('user', 'recipe')
 
 
 @admin.register(Follow)
-class FollowAdmin(admin.ModelAdmin):
+class FollowAdmin(LargeTableAdmin):
     """Настройки отображения подписок пользователей в админке"""
 
     list_display = ('id', 'user', 'author')
+    list_select_related = ('user', 'author')
     search_fields = ('user__username', 'author__username')
-    list_per_page = 20
+    autocomplete_fields = ('user', 'author')
 
 
 @admin.register(Tag)
@@ -91,3 +147,5 @@ class TagAdmin(admin.ModelAdmin):
     """Настройки отображения тегов в админке"""
 
     list_display = ('id', 'color', 'name', 'slug')
+    search_fields = ('name', 'slug')
+    ordering = ('name',)
@@ -0,0 +1,80 @@
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import CatalogVersion, Recipe, Tag
+
+CATALOG_VERSION_ID = 1
+CATALOG_VERSION_KEY = 'catalog:version'
+
+
+def get_catalog_version():
+    """
+    Текущая версия справочников тегов и ингредиентов.
+
+    Версия читается из общего кеша без запросов к БД. Если запись
+    вытеснена, она восстанавливается из CatalogVersion через cache.add,
+    чтобы не затереть версию, записанную одновременно
+    bump_catalog_version.
+
+    :return: Строка, которая меняется при каждом изменении справочников.
+    """
+
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        version = CatalogVersion.objects.get_or_create(
+            pk=CATALOG_VERSION_ID
+        )[0].version.hex
+        cache.add(CATALOG_VERSION_KEY, version, timeout=None)
+    return version
+
+
+def bump_catalog_version():
+    """
+    Меняет версию справочников после изменения тегов или ингредиентов.
+
+    Новая версия попадает в общий кеш только после фиксации транзакции:
+    иначе другие процессы сохранили бы в кеш старые данные под новой
+    версией. До фиксации запись удаляется, и в этой транзакции версия
+    читается из БД.
+    """
+
+    version = uuid.uuid4().hex
+    CatalogVersion.objects.update_or_create(
+        pk=CATALOG_VERSION_ID, defaults={'version': version}
+    )
+    cache.delete(CATALOG_VERSION_KEY)
+    transaction.on_commit(
+        lambda: cache.set(CATALOG_VERSION_KEY, version, timeout=None)
+    )
+
+
+def get_tag_masks():
+    """
+    Битовые маски тегов для текущей версии справочников.
+
+    :return: Словарь {slug тега: маска}.
+    """
+    cache_key = f'catalog:{get_catalog_version()}:tag_masks'
+    tag_masks = cache.get(cache_key)
+    if tag_masks is None:
+        tag_masks = {tag.slug: tag.mask for tag in Tag.objects.all()}
+        cache.set(cache_key, tag_masks)
+    return tag_masks
+
+
+def bump_recipe_versions(recipe_ids):
+    """
+    Меняет версии рецептов после изменения их данных или автора.
+
+    Версия хранится в Recipe.cache_version и меняется в той же
+    транзакции, что и данные рецепта.
+
+    :param recipe_ids: Список id рецептов.
+    :return: Новая версия.
+    """
+
+    version = uuid.uuid4()
+    Recipe.objects.filter(pk__in=recipe_ids).update(cache_version=version)
+    return version
@@ -0,0 +1,64 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Favorite, Follow, Recipe, ShoppingCart
+
+User = get_user_model()
+
+COUNTERS = {
+    Recipe: (User, 'author', 'recipes_count'),
+    Favorite: (Recipe, 'recipe', 'favorites_count'),
+    ShoppingCart: (Recipe, 'recipe', 'in_carts_count'),
+    Follow: (User, 'author', 'followers_count'),
+}
+
+
+def change_counter(instance, delta):
+    """
+    Изменяет счётчик объекта, на который ссылается instance.
+
+    Обновление выполняется выражением F(), поэтому одновременные
+    изменения не теряются. Счётчик не опускается ниже нуля, а
+    накопившиеся расхождения исправляет команда reconcile_counters.
+
+    :param instance: Созданный или удалённый объект.
+    :param delta: Величина изменения счётчика.
+    """
+
+    field = COUNTERS[type(instance)][1]
+    pk = getattr(instance, f'{field}_id')
+    if pk is not None:
+        change_counters(type(instance), [pk], delta)
+
+
+def change_counters(related_model, pks, delta):
+    """
+    Изменяет счётчики нескольких объектов одним запросом.
+
+    Используется после bulk_create, который не отправляет сигналы.
+
+    :param related_model: Модель созданных или удалённых записей.
+    :param pks: id объектов, счётчики которых изменяются.
+    :param delta: Величина изменения каждого счётчика.
+    """
+
+    model, _, counter = COUNTERS[related_model]
+    model.objects.filter(pk__in=pks).update(
+        **{counter: Greatest(F(counter) + delta, 0)}
+    )
+
+
+def count_related(related_model, field):
+    """
+    Выражение с фактическим количеством связанных записей.
+
+    :param related_model: Модель, записи которой считаются.
+    :param field: Поле related_model со ссылкой на объект счётчика.
+    :return: Подзапрос для annotate или update.
+    """
+
+    return Coalesce(Subquery(
+        related_model.objects.filter(**{field: OuterRef('pk')}).order_by(
+        ).values(field).annotate(total=Count('pk')).values('total')
+    ), 0)
@@ -0,0 +1,103 @@
+import os
+import uuid
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+
+from .models import Recipe
+
+VARIANT_SIZES = {
+    'thumbnail': 160,
+    'card': 480,
+    'full': 1200,
+}
+VARIANT_FORMATS = {
+    'webp': 'WEBP',
+    'jpeg': 'JPEG',
+}
+VARIANTS_DIR = 'recipes/images/variants/'
+
+
+def render_variant(image, size, image_format):
+    """
+    Уменьшает изображение и кодирует его в нужный формат.
+
+    :param image: Исходное изображение Pillow.
+    :param size: Максимальная ширина и высота в пикселях.
+    :param image_format: Формат Pillow (WEBP или JPEG).
+    :return: Байты закодированного изображения.
+    """
+
+    variant = image.copy()
+    variant.thumbnail((size, size), Image.Resampling.LANCZOS)
+    if image_format == 'JPEG' and variant.mode != 'RGB':
+        variant = variant.convert('RGB')
+    buffer = BytesIO()
+    variant.save(buffer, format=image_format, quality=80, optimize=True)
+    return buffer.getvalue()
+
+
+def delete_variants(variants, keep=frozenset()):
+    """
+    Удаляет файлы уменьшенных копий изображения.
+
+    :param variants: Словарь вида Recipe.image_variants.
+    :param keep: Пути файлов, которые нужно оставить.
+    """
+
+    for formats in variants.values():
+        for name in formats.values():
+            if name not in keep:
+                default_storage.delete(name)
+
+
+def generate_image_variants(recipe_id, stale_variants=None):
+    """
+    Создаёт уменьшенные копии изображения рецепта.
+
+    Пути к файлам сохраняются в Recipe.image_variants, только если
+    изображение рецепта не поменялось за время обработки, иначе
+    созданные файлы удаляются. Копии прежнего изображения удаляются
+    после создания новых.
+
+    :param recipe_id: id рецепта.
+    :param stale_variants: Копии прежнего изображения рецепта, которые
+        уже убраны из Recipe.image_variants.
+    """
+
+    recipe = Recipe.objects.filter(pk=recipe_id).only(
+        'image', 'image_variants'
+    ).first()
+    if recipe is None or not recipe.image:
+        return
+
+    stem = os.path.splitext(os.path.basename(recipe.image.name))[0]
+    with recipe.image.open('rb') as image_file:
+        image = Image.open(image_file)
+        image.load()
+
+    variants = {}
+    for size_name, size in VARIANT_SIZES.items():
+        variants[size_name] = {}
+        for extension, image_format in VARIANT_FORMATS.items():
+            name = f'{VARIANTS_DIR}{stem}_{size_name}.{extension}'
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            variants[size_name][extension] = default_storage.save(
+                name,
+                ContentFile(render_variant(image, size, image_format))
+            )
+
+    updated = Recipe.objects.filter(
+        pk=recipe_id, image=recipe.image.name
+    ).update(image_variants=variants, cache_version=uuid.uuid4())
+    new_names = {
+        name for formats in variants.values() for name in formats.values()
+    }
+    delete_variants(stale_variants or {}, keep=new_names)
+    if updated:
+        delete_variants(recipe.image_variants, keep=new_names)
+    else:
+        delete_variants(variants)
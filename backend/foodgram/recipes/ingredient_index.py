@@ -0,0 +1,72 @@
+import threading
+from bisect import bisect_left
+
+from .catalog import bump_catalog_version, get_catalog_version
+from .models import Ingredient
+
+
+class IngredientPrefixIndex:
+    """
+    Отсортированный индекс ингредиентов в памяти процесса.
+
+    Поиск по началу названия выполняется бинарным поиском без запросов
+    к БД. Индекс привязан к версии справочников из общего кеша: при её
+    изменении каждый процесс перестраивает свой индекс при следующем
+    поиске.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._index = ([], [])
+
+    def build(self, version=None):
+        """
+        Загружает ингредиенты из БД и строит индекс.
+
+        :param version: Версия справочников, для которой строится
+            индекс. По умолчанию текущая.
+        """
+
+        with self._lock:
+            if version is None:
+                version = get_catalog_version()
+            items = sorted(
+                Ingredient.objects.values('id', 'name', 'measurement_unit'),
+                key=lambda item: (item['name'].casefold(), item['id'])
+            )
+            keys = [item['name'].casefold() for item in items]
+            self._index = (keys, items)
+            self._version = version
+
+    def invalidate(self):
+        """Помечает индексы всех процессов устаревшими."""
+
+        bump_catalog_version()
+        self._version = None
+
+    def search(self, prefix='', version=None):
+        """
+        Ищет ингредиенты, название которых начинается с prefix.
+
+        Регистр не учитывается. Результат отсортирован по названию,
+        поэтому точное совпадение с prefix всегда идёт первым.
+
+        :param prefix: Начало названия ингредиента.
+        :param version: Версия справочников, если вызывающий код её
+            уже прочитал. По умолчанию текущая.
+        :return: Список словарей с ключами id, name и measurement_unit.
+        """
+
+        if version is None:
+            version = get_catalog_version()
+        if self._version != version:
+            self.build(version)
+        keys, items = self._index
+        prefix = prefix.casefold()
+        start = bisect_left(keys, prefix)
+        end = bisect_left(keys, prefix + chr(0x10FFFF), lo=start)
+        return items[start:end]
+
+
+ingredient_index = IngredientPrefixIndex()
@@ -0,0 +1,78 @@
+import random
+from statistics import mean, quantiles
+from time import perf_counter
+
+from api.filters import IngredientFilter
+from api.serializers import IngredientSerializer
+from django.core.management.base import BaseCommand, CommandError
+from recipes.ingredient_index import ingredient_index
+from recipes.models import Ingredient
+
+
+def measure(search, prefixes):
+    """
+    Замеряет время поиска для каждого префикса.
+
+    :param search: Функция поиска, принимающая префикс.
+    :param prefixes: Список префиксов.
+    :return: Список длительностей в микросекундах.
+    """
+
+    timings = []
+    for prefix in prefixes:
+        start = perf_counter()
+        search(prefix)
+        timings.append((perf_counter() - start) * 1_000_000)
+    return timings
+
+
+def search_orm(prefix):
+    """Поиск через фильтр вьюсета, как до появления индекса."""
+
+    queryset = IngredientFilter(
+        {'name': prefix}, queryset=Ingredient.objects.all()
+    ).qs
+    return IngredientSerializer(queryset, many=True).data
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает поиск ингредиентов по индексу в памяти '
+            'с поиском через ORM')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '-n',
+            '--lookups',
+            type=int,
+            default=1000,
+            help='Количество поисковых запросов'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Зерно генератора случайных префиксов'
+        )
+
+    def handle(self, *args, **options):
+        names = list(Ingredient.objects.values_list('name', flat=True))
+        if not names:
+            raise CommandError('В базе данных нет ингредиентов')
+
+        rnd = random.Random(options['seed'])
+        prefixes = [
+            name[:rnd.randint(1, min(len(name), 5))]
+            for name in rnd.choices(names, k=options['lookups'])
+        ]
+
+        ingredient_index.build()
+        for label, search in (('ORM', search_orm),
+                              ('Индекс', ingredient_index.search)):
+            timings = measure(search, prefixes)
+            percentiles = quantiles(timings, n=100)
+            self.stdout.write(
+                f'{label:<8} среднее {mean(timings):10.1f} мкс  '
+                f'p50 {percentiles[49]:10.1f} мкс  '
+                f'p95 {percentiles[94]:10.1f} мкс  '
+                f'p99 {percentiles[98]:10.1f} мкс'
+            )
@@ -0,0 +1,127 @@
+import random
+from statistics import mean
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from recipes.models import Recipe, Tag
+
+User = get_user_model()
+
+
+def measure(queryset, page_size, repeats):
+    """
+    Замеряет подсчёт и загрузку первой страницы кверисета.
+
+    :return: Среднее время в миллисекундах и количество рецептов.
+    """
+
+    timings = []
+    for _ in range(repeats):
+        start = perf_counter()
+        total = queryset.count()
+        list(queryset.order_by('-pub_date', '-pk')[:page_size])
+        timings.append((perf_counter() - start) * 1000)
+    return mean(timings), total
+
+
+class Command(BaseCommand):
+    help = ('Сравнивает фильтрацию рецептов по тегам через соединение '
+            'с тегами и через маску тегов на синтетических данных. '
+            'Данные создаются в транзакции и откатываются.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipes',
+            type=int,
+            default=100000,
+            help='Количество синтетических рецептов'
+        )
+        parser.add_argument(
+            '--tags',
+            type=int,
+            default=20,
+            help='Общее количество тегов'
+        )
+        parser.add_argument(
+            '--repeats',
+            type=int,
+            default=5,
+            help='Количество повторов каждого замера'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Зерно генератора случайных чисел'
+        )
+
+    def handle(self, *args, **options):
+        rnd = random.Random(options['seed'])
+        with transaction.atomic():
+            tags = self.create_tags(options['tags'])
+            self.create_recipes(rnd, tags, options['recipes'])
+
+            for selected in (tags[:1], tags[:3]):
+                slugs = [tag.slug for tag in selected]
+                joined = Recipe.objects.filter(tags__slug__in=slugs).distinct()
+                masked = Recipe.objects.filter_tags(
+                    sum(tag.mask for tag in selected)
+                )
+                self.stdout.write(f'Теги: {", ".join(slugs)}')
+                for label, queryset in (('JOIN + DISTINCT', joined),
+                                        ('tags_mask', masked)):
+                    elapsed, total = measure(queryset, 6, options['repeats'])
+                    self.stdout.write(
+                        f'  {label:<16} {elapsed:10.1f} мс  '
+                        f'(рецептов: {total})'
+                    )
+            transaction.set_rollback(True)
+
+    def create_tags(self, count):
+        """Дополняет теги до нужного количества."""
+
+        existing = Tag.objects.count()
+        for number in range(existing, min(count, Tag.MAX_TAGS)):
+            Tag.objects.create(
+                name=f'bench-{number}',
+                color=f'#{number:06x}',
+                slug=f'bench-{number}',
+            )
+        return list(Tag.objects.order_by('bit'))
+
+    def create_recipes(self, rnd, tags, count):
+        """Создаёт рецепты со случайными 1-3 тегами пачками."""
+
+        author = User.objects.create_user(
+            username='bench_tag_filter',
+            email='bench_tag_filter@example.com',
+        )
+        through = Recipe.tags.through
+        batch_size = 5000
+        for offset in range(0, count, batch_size):
+            chosen_tags = [
+                rnd.sample(tags, rnd.randint(1, 3))
+                for _ in range(min(batch_size, count - offset))
+            ]
+            recipes = Recipe.objects.bulk_create(
+                Recipe(
+                    author=author,
+                    name=f'bench-{offset + number}',
+                    text='bench',
+                    image='recipes/images/bench.png',
+                    cooking_time=1,
+                    tags_mask=sum(tag.mask for tag in recipe_tags),
+                )
+                for number, recipe_tags in enumerate(chosen_tags)
+            )
+            if recipes[0].pk is None:
+                recipes = Recipe.objects.filter(
+                    author=author
+                ).order_by('-pk')[:len(recipes)][::-1]
+            through.objects.bulk_create(
+                through(recipe_id=recipe.pk, tag_id=tag.pk)
+                for recipe, recipe_tags in zip(recipes, chosen_tags)
+                for tag in recipe_tags
+            )
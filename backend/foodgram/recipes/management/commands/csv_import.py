@@ -1,43 +1,243 @@
 import csv
+import io
+import json
 import os
+from itertools import islice
+from time import perf_counter
 
-import django.db.utils
-from django.core.management.base import BaseCommand
-from django.db import connection
-from recipes.models import Ingredient
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from recipes.catalog import bump_recipe_versions
+from recipes.ingredient_index import ingredient_index
+from recipes.models import (AmountIngredientRecipe, Ingredient,
+                            ShoppingListIngredient, Tag, delete_rows)
 
+DATA_DIR = 'data/'
+DEFAULT_FILES = ('ingredients.csv', 'tags.csv')
+FIELDS = {
+    'ingredients': ('name', 'measurement_unit'),
+    'tags': ('name', 'color', 'slug'),
+}
 
-def read_csv(name_file):
-    """Считывает данные из csv и возвращает список строк таблицы"""
-    path = os.path.join('data/', name_file)
-    with open(path, encoding='utf-8') as csv_file:
-        reader = csv.reader(csv_file, delimiter=',')
-        return list(reader)
 
+def iter_csv(file, fields):
+    """Лениво читает строки CSV без заголовка в словари."""
 
-def load_data(model, name_file):
+    for line, row in enumerate(csv.reader(file), start=1):
+        if not row:
+            continue
+        if len(row) != len(fields):
+            raise CommandError(
+                f'Строка {line}: ожидается {len(fields)} столбца, '
+                f'получено {len(row)}'
+            )
+        yield dict(zip(fields, row))
+
+
+def iter_json(file, fields, chunk_size=1 << 16):
     """
-    Загрузка данных по имени модели.
+    Лениво читает JSON-массив объектов.
+
+    Файл читается частями, в памяти держится только текущий объект.
     """
-    table = read_csv(name_file)
-    model.objects.bulk_create(
-        model(name=row[0], measurement_unit=row[1]) for row in table
-    )
+
+    decoder = json.JSONDecoder()
+    buffer = file.read(chunk_size).lstrip()
+    if not buffer.startswith('['):
+        raise CommandError('JSON-файл должен содержать массив объектов')
+    buffer = buffer[1:]
+    while True:
+        buffer = buffer.lstrip().lstrip(',').lstrip()
+        if buffer.startswith(']'):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                raise CommandError('JSON-файл обрывается')
+            buffer += chunk
+            continue
+        try:
+            yield {field: item[field] for field in fields}
+        except (KeyError, TypeError):
+            raise CommandError(f'В объекте {item} нет полей {fields}')
+        buffer = buffer[end:]
+
+
+def read_rows(path, fields):
+    """
+    Лениво читает строки каталога из CSV- или JSON-файла.
+
+    :param path: Путь к файлу.
+    :param fields: Имена столбцов по порядку.
+    :return: Генератор словарей с очищенными от пробелов значениями.
+    """
+
+    reader = iter_json if path.endswith('.json') else iter_csv
+    with open(path, encoding='utf-8') as file:
+        for row in reader(file, fields):
+            yield {key: str(value).strip() for key, value in row.items()}
+
+
+def batches(rows, batch_size):
+    """Разбивает итератор на списки по batch_size элементов."""
+
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
 
 
-def del_data(model):
-    """Удаляет данныее из таблицы"""
-    model.objects.all().delete()
-    with connection.cursor() as cursor:
+def copy_ingredients(rows, batch_size):
+    """
+    Загружает ингредиенты в PostgreSQL через COPY во временную таблицу.
+
+    Новые ингредиенты переносятся одним INSERT ... ON CONFLICT DO NOTHING.
+
+    :return: Количество прочитанных и добавленных строк.
+    """
+
+    table = Ingredient._meta.db_table
+    read = 0
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            'CREATE TEMP TABLE ingredient_import '
+            '(name varchar(200), measurement_unit varchar(200)) '
+            'ON COMMIT DROP'
+        )
+        for batch in batches(rows, batch_size):
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerows(
+                (row['name'], row['measurement_unit']) for row in batch
+            )
+            buffer.seek(0)
+            cursor.copy_expert(
+                'COPY ingredient_import (name, measurement_unit) '
+                'FROM STDIN WITH (FORMAT csv)',
+                buffer
+            )
+            read += len(batch)
         cursor.execute(
-            'TRUNCATE TABLE recipes_ingredient RESTART IDENTITY CASCADE'
+            f'INSERT INTO {table} (name, measurement_unit) '
+            f'SELECT DISTINCT name, measurement_unit FROM ingredient_import '
+            f'ON CONFLICT (name, measurement_unit) DO NOTHING'
+        )
+        created = cursor.rowcount
+    return read, created
+
+
+def insert_ingredients(rows, batch_size):
+    """
+    Загружает ингредиенты пачками через ORM, пропуская существующие.
+
+    :return: Количество прочитанных и добавленных строк.
+    """
+
+    read = 0
+    before = Ingredient.objects.count()
+    with transaction.atomic():
+        for batch in batches(rows, batch_size):
+            Ingredient.objects.bulk_create(
+                (Ingredient(**row) for row in batch),
+                ignore_conflicts=True
+            )
+            read += len(batch)
+    return read, Ingredient.objects.count() - before
+
+
+def load_ingredients(rows, batch_size):
+    """Загружает ингредиенты самым быстрым способом для текущей БД."""
+
+    if connection.vendor == 'postgresql':
+        load = copy_ingredients
+    else:
+        load = insert_ingredients
+    try:
+        return load(rows, batch_size)
+    finally:
+        ingredient_index.invalidate()
+
+
+def load_tags(rows, batch_size):
+    """
+    Создаёт и обновляет теги по slug.
+
+    Теги сохраняются по одному, чтобы им назначались биты маски тегов.
+
+    :return: Количество прочитанных и добавленных строк.
+    """
+
+    read = created = 0
+    with transaction.atomic():
+        for row in rows:
+            slug = row.pop('slug')
+            created += Tag.objects.update_or_create(
+                slug=slug, defaults=row
+            )[1]
+            read += 1
+    return read, created
+
+
+LOADERS = {
+    'ingredients': load_ingredients,
+    'tags': load_tags,
+}
+
+
+def del_data():
+    """
+    Удаляет ингредиенты вместе с их строками в рецептах и списках продуктов.
+
+    Строки удаляются без сигналов: иначе каждый удалённый ингредиент
+    менял бы версию справочников. Версии рецептов и справочников
+    меняются здесь по одному разу.
+    """
+
+    with transaction.atomic():
+        bump_recipe_versions(
+            AmountIngredientRecipe.objects.values('recipe_id')
         )
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'TRUNCATE TABLE recipes_ingredient '
+                    'RESTART IDENTITY CASCADE'
+                )
+        else:
+            delete_rows(ShoppingListIngredient.objects.all())
+            delete_rows(AmountIngredientRecipe.objects.all())
+            delete_rows(Ingredient.objects.all())
+        ingredient_index.invalidate()
 
 
 class Command(BaseCommand):
-    help = 'Импортирует data/ingredients.csv в базу данных'
+    help = ('Импортирует ингредиенты и теги из CSV- и JSON-файлов. '
+            'Повторный импорт не создаёт дублей: ингредиенты сверяются '
+            'по названию и единице измерения, теги — по slug.')
 
     def add_arguments(self, parser):
+        parser.add_argument(
+            'files',
+            nargs='*',
+            help=('Файлы для импорта. Тип данных определяется по имени '
+                  'файла (ingredients* или tags*). По умолчанию '
+                  'data/ingredients.csv и data/tags.csv')
+        )
+        parser.add_argument(
+            '--model',
+            choices=sorted(LOADERS),
+            help='Тип данных, если его нельзя определить по имени файла'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Количество строк в одной пачке'
+        )
         parser.add_argument(
             '-c',
             '--clear',
@@ -46,19 +246,38 @@ class Command(BaseCommand):
         )
 
     def handle(self, *args, **options):
-        try:
-            if options['clear']:
-                del_data(Ingredient)
-                self.stdout.write(
-                    self.style.SUCCESS('Ингредиенты удалены из базы данных'))
-            else:
-                load_data(Ingredient, 'ingredients.csv')
-                self.stdout.write(
-                    self.style.SUCCESS('Таблицы загружены в базу данных.'))
-        except django.db.utils.IntegrityError as e:
+        if options['clear']:
+            del_data()
             self.stdout.write(
-                self.style.ERROR('Ошибка загрузки. База данных не пуста. '
-                                 'Совпадение уникальных полей. "%s"' % e))
-        except Exception as e:
-            self.stdout.write(self.style.ERROR('Ошибка загрузки данных:'
-                                               ' "%s"' % e))
+                self.style.SUCCESS('Ингредиенты удалены из базы данных'))
+            return
+
+        files = options['files'] or [
+            os.path.join(DATA_DIR, name) for name in DEFAULT_FILES
+        ]
+        for path in files:
+            model = options['model'] or self.detect_model(path)
+            start = perf_counter()
+            try:
+                read, created = LOADERS[model](
+                    read_rows(path, FIELDS[model]), options['batch_size']
+                )
+            except OSError as error:
+                raise CommandError(f'Не удалось прочитать {path}: {error}')
+            elapsed = perf_counter() - start
+            self.stdout.write(self.style.SUCCESS(
+                f'{path}: прочитано {read}, добавлено {created} '
+                f'за {elapsed:.2f} с ({read / max(elapsed, 1e-6):.0f} строк/с)'
+            ))
+
+    def detect_model(self, path):
+        """Определяет тип данных по имени файла."""
+
+        name = os.path.basename(path)
+        for model in LOADERS:
+            if name.startswith(model):
+                return model
+        raise CommandError(
+            f'Не удалось определить тип данных файла {path}, '
+            f'укажите --model'
+        )
@@ -0,0 +1,195 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+from jobs.models import Job
+from recipes.models import (AmountIngredientRecipe, Favorite, Follow,
+                            Ingredient, Recipe, ShoppingCart,
+                            ShoppingListIngredient)
+
+User = get_user_model()
+
+POSTGRES_PATTERNS = (
+    (re.compile(r'Seq Scan on (?P<table>\w+)'),
+     'последовательное чтение таблицы'),
+    (re.compile(r'Sort  \(cost=\S+ rows=(?P<rows>\d+)'),
+     'сортировка без индекса'),
+)
+SQLITE_PATTERNS = (
+    (re.compile(r'\bSCAN (?:TABLE )?(?P<table>\w+)(?!.*\bUSING\b)'),
+     'последовательное чтение таблицы'),
+    (re.compile(r'USE TEMP B-TREE FOR ORDER BY'), 'сортировка без индекса'),
+)
+PLAN_TABLE_PATTERN = re.compile(r'\b(?:SCAN|SEARCH) (?:TABLE )?(\w+)')
+
+
+def get_hot_paths(user, page_size=6):
+    """
+    Запросы, которые выполняются на каждом популярном эндпоинте.
+
+    :param user: Пользователь, от имени которого строятся запросы.
+    :param page_size: Размер страницы ленты рецептов.
+    :return: Список пар (название, кверисет).
+    """
+
+    recipes = Recipe.objects.with_user_flags(user)
+    recipe = Recipe.objects.order_by('-pk').first()
+    recipe_id = recipe.pk if recipe else 0
+    now = timezone.now()
+    return [
+        ('Лента рецептов', recipes[:page_size]),
+        ('Количество рецептов', Recipe.objects.all()),
+        ('Рецепт по id', recipes.filter(pk=recipe_id)),
+        ('Фильтр по тегам', recipes.filter_tags(1)[:page_size]),
+        ('Фильтр по автору', recipes.filter(author=user)[:page_size]),
+        ('Фильтр по избранному',
+         recipes.filter(favorite__user=user)[:page_size]),
+        ('Фильтр по корзине',
+         recipes.filter(shoppingcart__user=user)[:page_size]),
+        ('Ингредиенты рецептов',
+         AmountIngredientRecipe.objects.filter(
+             recipe_id__in=[recipe_id]
+         ).select_related('ingredient')),
+        ('Рецепт в избранном',
+         Favorite.objects.filter(user=user, recipe_id=recipe_id)),
+        ('Корзины с рецептом',
+         ShoppingCart.objects.filter(recipe_id=recipe_id)),
+        ('Лента подписок',
+         recipes.followed_by(user).limit_feed(
+             user, page_size + 1
+         )[:page_size + 1]),
+        ('Подписки',
+         User.objects.filter(following__user=user).order_by('username')),
+        ('Последние рецепты авторов',
+         Recipe.objects.filter(
+             author__in=Follow.objects.filter(user=user).values('author')
+         ).limit_per_author(3)),
+        ('Список покупок',
+         ShoppingListIngredient.objects.filter(user=user).order_by(
+             'ingredient__name'
+         )),
+        ('Поиск ингредиента',
+         Ingredient.objects.filter(name__istartswith='а')),
+        ('Очередь фоновых задач',
+         Job.objects.filter(
+             Q(status=Job.QUEUED, run_at__lte=now)
+             | Q(status=Job.RUNNING, locked_until__lt=now)
+         ).order_by('run_at', 'pk')[:1]),
+    ]
+
+
+class Command(BaseCommand):
+    help = ('Выполняет EXPLAIN для запросов популярных эндпоинтов и '
+            'сообщает о последовательном чтении больших таблиц и '
+            'сортировках без индекса.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--analyze',
+            action='store_true',
+            help='Выполнять запросы (EXPLAIN ANALYZE в PostgreSQL)'
+        )
+        parser.add_argument(
+            '--min-rows',
+            type=int,
+            default=1000,
+            help='Не предупреждать о таблицах с меньшим числом строк'
+        )
+        parser.add_argument(
+            '--verbose-plans',
+            action='store_true',
+            help='Выводить планы всех запросов'
+        )
+        parser.add_argument(
+            '--fail-on-warning',
+            action='store_true',
+            help='Завершаться с ошибкой при наличии предупреждений'
+        )
+
+    def handle(self, *args, **options):
+        user = User.objects.order_by('pk').first()
+        if user is None:
+            raise CommandError('В базе нет пользователей')
+        if connection.vendor == 'postgresql':
+            patterns = POSTGRES_PATTERNS
+        else:
+            patterns = SQLITE_PATTERNS
+
+        warnings = 0
+        for name, queryset in get_hot_paths(user):
+            plan = self.explain(queryset, options['analyze'])
+            problems = self.find_problems(plan, patterns, options['min_rows'])
+            warnings += len(problems)
+            style = self.style.WARNING if problems else self.style.SUCCESS
+            self.stdout.write(style(f'{name}: проблем {len(problems)}'))
+            for problem in problems:
+                self.stdout.write(f'  {problem}')
+            if problems or options['verbose_plans']:
+                for line in plan.splitlines():
+                    self.stdout.write(f'    {line}')
+
+        if warnings and options['fail_on_warning']:
+            raise CommandError(f'Найдено проблем в планах: {warnings}')
+
+    def explain(self, queryset, analyze):
+        """Возвращает текстовый план запроса."""
+
+        if analyze and connection.vendor == 'postgresql':
+            return queryset.explain(analyze=True, buffers=True)
+        return queryset.explain()
+
+    def find_problems(self, plan, patterns, min_rows):
+        """
+        Ищет в плане чтение больших таблиц целиком и сортировки.
+
+        Для таблиц порог сравнивается с их размером, для сортировок
+        в PostgreSQL — с оценкой количества сортируемых строк, а в SQLite —
+        с размером самой большой таблицы запроса.
+
+        :param plan: Текстовый план запроса.
+        :param patterns: Пары (регулярное выражение, описание проблемы).
+        :param min_rows: Порог размера таблицы в строках.
+        :return: Список описаний найденных проблем.
+        """
+
+        problems = []
+        for line in plan.splitlines():
+            for pattern, description in patterns:
+                match = pattern.search(line)
+                if match is None:
+                    continue
+                groups = match.groupdict()
+                if 'table' in groups:
+                    rows = self.count_rows(groups['table'])
+                elif 'rows' in groups:
+                    rows = int(groups['rows'])
+                else:
+                    rows = max((
+                        self.count_rows(table)
+                        for table in PLAN_TABLE_PATTERN.findall(plan)
+                    ), default=0)
+                if rows < min_rows:
+                    continue
+                problems.append(f'{description}: {line.strip()}')
+        return problems
+
+    def count_rows(self, table):
+        """Оценивает количество строк в таблице."""
+
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(
+                    'SELECT reltuples FROM pg_class WHERE relname = %s',
+                    [table]
+                )
+                row = cursor.fetchone()
+                return int(row[0]) if row else 0
+            if table not in connection.introspection.table_names(cursor):
+                return 0
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {connection.ops.quote_name(table)}'
+            )
+            return cursor.fetchone()[0]
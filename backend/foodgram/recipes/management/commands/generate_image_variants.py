@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+from recipes.images import generate_image_variants
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = 'Создаёт уменьшенные копии изображений рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--missing',
+            action='store_true',
+            help='Обрабатывает только рецепты без копий изображения'
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.order_by('pk')
+        if options['missing']:
+            recipes = recipes.filter(image_variants={})
+
+        processed = 0
+        for recipe_id in recipes.values_list('pk', flat=True).iterator():
+            try:
+                generate_image_variants(recipe_id)
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(
+                    f'Рецепт {recipe_id}: ошибка обработки "{e}"'))
+            else:
+                processed += 1
+        self.stdout.write(
+            self.style.SUCCESS(f'Обработано рецептов: {processed}'))
@@ -0,0 +1,78 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from recipes.models import ShoppingListIngredient
+
+
+def get_differences():
+    """
+    Сравнивает сводные списки продуктов с корзинами покупок.
+
+    :return: Список кортежей (user_id, ingredient_id, в таблице, ожидается).
+    """
+
+    expected = {
+        (row['user_id'], row['ingredient_id']): row['total_amount']
+        for row in ShoppingListIngredient.objects.from_shopping_carts()
+    }
+    stored = {
+        (row['user_id'], row['ingredient_id']): row['total_amount']
+        for row in ShoppingListIngredient.objects.values(
+            'user_id', 'ingredient_id', 'total_amount'
+        )
+    }
+    return [
+        (*key, stored.get(key), expected.get(key))
+        for key in sorted(expected.keys() | stored.keys())
+        if stored.get(key) != expected.get(key)
+    ]
+
+
+def rebuild(batch_size):
+    """Заполняет таблицу списков продуктов заново по корзинам покупок."""
+
+    with transaction.atomic():
+        ShoppingListIngredient.objects.all().delete()
+        ShoppingListIngredient.objects.bulk_create(
+            (
+                ShoppingListIngredient(**row)
+                for row in ShoppingListIngredient.objects.from_shopping_carts()
+            ),
+            batch_size=batch_size
+        )
+
+
+class Command(BaseCommand):
+    help = ('Пересобирает сводные списки продуктов пользователей '
+            'и сверяет их с корзинами покупок')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только сверяет таблицу, не изменяя её'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Размер пачки при вставке строк'
+        )
+
+    def handle(self, *args, **options):
+        if not options['check']:
+            rebuild(options['batch_size'])
+            self.stdout.write(
+                self.style.SUCCESS('Списки продуктов пересобраны.'))
+
+        differences = get_differences()
+        for user_id, ingredient_id, stored, expected in differences:
+            self.stdout.write(
+                f'user={user_id} ingredient={ingredient_id}: '
+                f'в таблице {stored}, ожидается {expected}'
+            )
+        if differences:
+            raise CommandError(
+                f'Найдено расхождений: {len(differences)}'
+            )
+        self.stdout.write(
+            self.style.SUCCESS('Списки продуктов совпадают с корзинами.'))
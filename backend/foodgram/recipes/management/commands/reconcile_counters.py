@@ -0,0 +1,79 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F
+from recipes.counters import COUNTERS, count_related
+
+
+def get_differences():
+    """
+    Сравнивает счётчики с фактическим количеством записей.
+
+    :return: Список кортежей (модель, pk, счётчик, в таблице, ожидается).
+    """
+
+    differences = []
+    for related_model, (model, field, counter) in COUNTERS.items():
+        rows = model.objects.annotate(
+            actual=count_related(related_model, field)
+        ).exclude(**{counter: F('actual')}).values_list(
+            'pk', counter, 'actual'
+        )
+        differences.extend(
+            (model, pk, counter, stored, actual)
+            for pk, stored, actual in rows
+        )
+    return differences
+
+
+def reconcile(differences, batch_size):
+    """
+    Пересчитывает счётчики объектов с расхождениями.
+
+    Значение вычисляется в том же UPDATE, поэтому изменения, сделанные
+    после сверки, тоже учитываются.
+    """
+
+    for related_model, (model, field, counter) in COUNTERS.items():
+        pks = [
+            pk for diff_model, pk, diff_counter, *_ in differences
+            if diff_model is model and diff_counter == counter
+        ]
+        for offset in range(0, len(pks), batch_size):
+            model.objects.filter(
+                pk__in=pks[offset:offset + batch_size]
+            ).update(**{counter: count_related(related_model, field)})
+
+
+class Command(BaseCommand):
+    help = ('Сверяет счётчики избранного, корзин, рецептов и подписчиков '
+            'с фактическими записями и исправляет расхождения')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только сверяет счётчики, не изменяя их'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество объектов в одном UPDATE'
+        )
+
+    def handle(self, *args, **options):
+        differences = get_differences()
+        for model, pk, counter, stored, expected in differences:
+            self.stdout.write(
+                f'{model._meta.label} id={pk} {counter}: '
+                f'в таблице {stored}, ожидается {expected}'
+            )
+        if not differences:
+            self.stdout.write(
+                self.style.SUCCESS('Счётчики совпадают с записями.'))
+            return
+        if options['check']:
+            raise CommandError(f'Найдено расхождений: {len(differences)}')
+
+        reconcile(differences, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено расхождений: {len(differences)}'))
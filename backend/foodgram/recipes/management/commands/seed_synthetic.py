@@ -0,0 +1,498 @@
+import random
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate, islice
+from time import perf_counter
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max, Q
+from recipes.catalog import bump_catalog_version
+from recipes.counters import COUNTERS, count_related
+from recipes.models import (AmountIngredientRecipe, Favorite, Follow,
+                            Ingredient, Recipe, ShoppingCart,
+                            ShoppingListIngredient, Tag, delete_rows)
+from recipes.search import delete_from_search_index
+from rest_framework.authtoken.models import Token
+
+from .reconcile_counters import get_differences, reconcile
+
+User = get_user_model()
+
+START_DATE = datetime(2023, 1, 1, tzinfo=timezone.utc)
+PASSWORD = 'synthetic-password'
+IMAGE = 'recipes/images/synthetic.png'
+
+FIRST_NAMES = (
+    'Анна', 'Иван', 'Мария', 'Пётр', 'Ольга', 'Сергей', 'Елена', 'Дмитрий',
+    'Наталья', 'Алексей', 'Татьяна', 'Михаил', 'Ирина', 'Андрей', 'Юлия',
+)
+LAST_NAMES = (
+    'Иванов', 'Смирнов', 'Кузнецов', 'Попов', 'Васильев', 'Петров',
+    'Соколов', 'Михайлов', 'Новиков', 'Фёдоров', 'Морозов', 'Волков',
+)
+DISHES = (
+    'Суп', 'Салат', 'Пирог', 'Рагу', 'Омлет', 'Плов', 'Запеканка', 'Каша',
+    'Паста', 'Котлеты', 'Блины', 'Оладьи', 'Жаркое', 'Гуляш', 'Шарлотка',
+)
+STYLES = (
+    'по-домашнему', 'по-деревенски', 'быстрый', 'праздничный', 'лёгкий',
+    'острый', 'сытный', 'летний', 'бабушкин', 'постный',
+)
+AMOUNT_RANGES = {
+    'г': (10, 500, 10),
+    'мл': (50, 500, 50),
+    'кг': (1, 2, 1),
+    'л': (1, 2, 1),
+}
+DEFAULT_AMOUNT_RANGE = (1, 5, 1)
+
+
+def zipf_weights(count, exponent):
+    """
+    Накопленные веса распределения Ципфа для count элементов.
+
+    Первый элемент самый популярный, вес k-го пропорционален k^-exponent.
+    """
+
+    return list(accumulate(rank ** -exponent for rank in range(1, count + 1)))
+
+
+def sample_distinct(rnd, population, cum_weights, count, exclude=None):
+    """
+    Выбирает до count разных элементов с весами.
+
+    :return: Список элементов; может быть короче count, если
+        популярные элементы выпадали повторно.
+    """
+
+    chosen = []
+    seen = {exclude}
+    for item in rnd.choices(population, cum_weights=cum_weights,
+                            k=count * 2):
+        if item not in seen:
+            seen.add(item)
+            chosen.append(item)
+            if len(chosen) == count:
+                break
+    return chosen
+
+
+def draw_count(rnd, average, maximum):
+    """Случайное количество с экспоненциальным распределением."""
+
+    if average <= 0:
+        return 0
+    return min(int(rnd.expovariate(1 / average)), maximum)
+
+
+def draw_amount(rnd, measurement_unit):
+    start, stop, step = AMOUNT_RANGES.get(
+        measurement_unit, DEFAULT_AMOUNT_RANGE
+    )
+    return rnd.randrange(start, stop + 1, step)
+
+
+def set_pub_dates(pub_dates):
+    """
+    Записывает даты публикации рецептов.
+
+    bulk_create заполняет pub_date (auto_now_add) текущим временем,
+    поэтому даты записываются после вставки запросом
+    UPDATE ... FROM (VALUES ...). bulk_update построил бы для пакета
+    выражение CASE с веткой на каждый рецепт.
+
+    :param pub_dates: Список пар (id рецепта, дата публикации).
+    """
+
+    field = Recipe._meta.get_field('pub_date')
+    table = connection.ops.quote_name(Recipe._meta.db_table)
+    column = connection.ops.quote_name(field.column)
+    # Параметров в запросе два на рецепт, SQLite ограничивает их число.
+    batch_size = (connection.features.max_query_params or len(pub_dates)) // 2
+    with connection.cursor() as cursor:
+        for start in range(0, len(pub_dates), batch_size):
+            batch = pub_dates[start:start + batch_size]
+            cursor.execute(
+                f'UPDATE {table} SET {column} = dates.column2 '
+                f'FROM (VALUES {", ".join(["(%s, %s)"] * len(batch))}) '
+                f'AS dates WHERE {table}.id = dates.column1',
+                [
+                    value
+                    for pk, pub_date in batch
+                    for value in (
+                        pk, field.get_db_prep_value(pub_date, connection)
+                    )
+                ]
+            )
+
+
+def next_id(model):
+    return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+
+def reset_sequences(*models):
+    """Сдвигает последовательности id после вставки с явными id."""
+
+    statements = connection.ops.sequence_reset_sql(no_style(), models)
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+class Command(BaseCommand):
+    help = ('Создаёт воспроизводимый синтетический набор данных для '
+            'нагрузочного тестирования: пользователей, рецепты с '
+            'ингредиентами из справочника, теги, подписки, избранное и '
+            'корзины. При одинаковых параметрах и зерне данные совпадают.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=1000,
+            help='Количество пользователей'
+        )
+        parser.add_argument(
+            '--recipes',
+            type=int,
+            default=10000,
+            help='Количество рецептов'
+        )
+        parser.add_argument(
+            '--follows',
+            type=float,
+            default=20,
+            help='Среднее количество подписок на пользователя'
+        )
+        parser.add_argument(
+            '--favorites',
+            type=float,
+            default=30,
+            help='Среднее количество рецептов в избранном'
+        )
+        parser.add_argument(
+            '--carts',
+            type=float,
+            default=5,
+            help='Среднее количество рецептов в корзине'
+        )
+        parser.add_argument(
+            '--exponent',
+            type=float,
+            default=1.1,
+            help=('Показатель степенного закона популярности авторов, '
+                  'рецептов и ингредиентов')
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Зерно генератора случайных чисел'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Количество строк в одном INSERT'
+        )
+        parser.add_argument(
+            '--prefix',
+            default='synthetic',
+            help='Префикс имён синтетических пользователей'
+        )
+        parser.add_argument(
+            '-c',
+            '--clear',
+            action='store_true',
+            help='Удаляет синтетических пользователей с этим префиксом '
+                 'и их данные перед созданием новых'
+        )
+
+    def handle(self, *args, **options):
+        self.rnd = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.exponent = options['exponent']
+        self.prefix = options['prefix']
+
+        self.ingredients = list(
+            Ingredient.objects.order_by('pk').values_list(
+                'pk', 'measurement_unit'
+            )
+        )
+        self.tags = list(Tag.objects.order_by('bit'))
+        if options['users'] < 2 or options['recipes'] < 1:
+            raise CommandError('Нужно хотя бы 2 пользователя и 1 рецепт')
+        if not self.ingredients or not self.tags:
+            raise CommandError(
+                'Справочники пусты: загрузите ингредиенты и теги командой '
+                'csv_import'
+            )
+
+        if options['clear']:
+            self.step('Удаление старых данных', self.clear)
+        if User.objects.filter(username__startswith=self.prefix).exists():
+            raise CommandError(
+                f'Пользователи с префиксом {self.prefix} уже есть: '
+                f'используйте --clear или другой --prefix'
+            )
+
+        with transaction.atomic():
+            users = self.step(
+                'Пользователи', self.create_users, options['users']
+            )
+            recipes = self.step(
+                'Рецепты', self.create_recipes, users, options['recipes']
+            )
+            self.step('Подписки', self.create_follows, users,
+                      options['follows'])
+            self.step('Избранное', self.create_lists, Favorite, users,
+                      recipes, options['favorites'])
+            self.step('Корзины', self.create_lists, ShoppingCart, users,
+                      recipes, options['carts'])
+            self.step('Счётчики и списки продуктов', self.fill_derived,
+                      users, recipes)
+
+    def step(self, title, method, *args):
+        """Выполняет этап и выводит его продолжительность."""
+
+        start = perf_counter()
+        result = method(*args)
+        rows = len(result) if isinstance(result, range) else result
+        self.stdout.write(
+            f'{title}: {rows} за {perf_counter() - start:.1f} с'
+            if rows is not None else
+            f'{title} за {perf_counter() - start:.1f} с'
+        )
+        return result
+
+    def clear(self):
+        """
+        Удаляет синтетических пользователей и все связанные с ними данные.
+
+        Строки удаляются набором DELETE без загрузки объектов и сигналов
+        (см. delete_rows), иначе удаление миллионов строк заняло бы часы.
+        Поэтому после удаления сбрасываются кеши данных рецептов,
+        а счётчики и списки продуктов остальных пользователей
+        пересчитываются. Токены удаляются обычным способом, чтобы они
+        пропали из кеша авторизации.
+        """
+
+        users = User.objects.filter(username__startswith=self.prefix)
+        recipes = Recipe.objects.filter(author__in=users)
+        Token.objects.filter(user__in=users).delete()
+        affected_users = list(ShoppingCart.objects.filter(
+            recipe__in=recipes
+        ).exclude(user__in=users).values_list('user_id', flat=True).distinct())
+        recipe_ids = recipes.values_list('pk', flat=True).iterator()
+        while True:
+            batch = list(islice(recipe_ids, self.batch_size))
+            if not batch:
+                break
+            delete_from_search_index(batch)
+
+        with transaction.atomic():
+            for queryset in (
+                ShoppingListIngredient.objects.filter(
+                    Q(user__in=users) | Q(user__in=affected_users)
+                ),
+                Favorite.objects.filter(
+                    Q(user__in=users) | Q(recipe__in=recipes)
+                ),
+                ShoppingCart.objects.filter(
+                    Q(user__in=users) | Q(recipe__in=recipes)
+                ),
+                Follow.objects.filter(Q(user__in=users) | Q(author__in=users)),
+                AmountIngredientRecipe.objects.filter(recipe__in=recipes),
+                Recipe.tags.through.objects.filter(recipe__in=recipes),
+                recipes,
+                users,
+            ):
+                delete_rows(queryset)
+            self.fill_shopping_lists(user_id__in=affected_users)
+            reconcile(get_differences(), self.batch_size)
+        bump_catalog_version()
+
+    def create_users(self, count):
+        """
+        Создаёт пользователей с явными id.
+
+        Пароль у всех одинаковый и хешируется один раз.
+
+        :return: Диапазон id созданных пользователей.
+        """
+
+        first_id = next_id(User)
+        password = make_password(PASSWORD)
+        for offset in range(0, count, self.batch_size):
+            User.objects.bulk_create(
+                User(
+                    pk=first_id + number,
+                    username=f'{self.prefix}{number}',
+                    email=f'{self.prefix}{number}@example.com',
+                    first_name=self.rnd.choice(FIRST_NAMES),
+                    last_name=self.rnd.choice(LAST_NAMES),
+                    password=password,
+                )
+                for number in range(offset, min(offset + self.batch_size,
+                                                count))
+            )
+        reset_sequences(User)
+        return range(first_id, first_id + count)
+
+    def create_recipes(self, users, count):
+        """
+        Создаёт рецепты с тегами и ингредиентами.
+
+        Авторы выбираются по степенному закону: немногие пишут много.
+        В рецепте от 2 до 15 ингредиентов, чаще около 7; популярные
+        ингредиенты встречаются чаще остальных.
+
+        :return: Диапазон id созданных рецептов.
+        """
+
+        authors = list(users)
+        self.rnd.shuffle(authors)
+        author_weights = zipf_weights(len(authors), self.exponent)
+        ingredients = list(self.ingredients)
+        self.rnd.shuffle(ingredients)
+        ingredient_weights = zipf_weights(len(ingredients), self.exponent)
+        first_id = next_id(Recipe)
+        through = Recipe.tags.through
+
+        for offset in range(0, count, self.batch_size):
+            recipes, pub_dates, amounts, tags = [], [], [], []
+            for number in range(offset, min(offset + self.batch_size, count)):
+                pk = first_id + number
+                recipe_tags = self.rnd.sample(
+                    self.tags, self.rnd.choice((1, 1, 2, 2, 3))
+                )
+                recipe_ingredients = sample_distinct(
+                    self.rnd, ingredients, ingredient_weights,
+                    round(self.rnd.triangular(2, 15, 7))
+                )
+                name = (f'{self.rnd.choice(DISHES)} '
+                        f'{self.rnd.choice(STYLES)} №{number}')
+                recipes.append(Recipe(
+                    pk=pk,
+                    author_id=self.rnd.choices(
+                        authors, cum_weights=author_weights
+                    )[0],
+                    name=name,
+                    text=f'{name}. Готовится из '
+                         f'{len(recipe_ingredients)} ингредиентов.',
+                    image=IMAGE,
+                    cooking_time=self.rnd.randint(5, 180),
+                    tags_mask=sum(tag.mask for tag in recipe_tags),
+                ))
+                pub_dates.append((pk, START_DATE + timedelta(
+                    minutes=number * 10 + self.rnd.randrange(10)
+                )))
+                tags += [
+                    through(recipe_id=pk, tag_id=tag.pk)
+                    for tag in recipe_tags
+                ]
+                amounts += [
+                    AmountIngredientRecipe(
+                        recipe_id=pk,
+                        ingredient_id=ingredient_id,
+                        amount=draw_amount(self.rnd, unit),
+                    )
+                    for ingredient_id, unit in recipe_ingredients
+                ]
+            Recipe.objects.bulk_create(recipes)
+            set_pub_dates(pub_dates)
+            through.objects.bulk_create(tags)
+            AmountIngredientRecipe.objects.bulk_create(amounts)
+            Recipe.objects.filter(
+                pk__range=(recipes[0].pk, recipes[-1].pk)
+            ).refresh_search_index()
+        reset_sequences(Recipe)
+        return range(first_id, first_id + count)
+
+    def create_follows(self, users, average):
+        """
+        Создаёт подписки.
+
+        Количество подписок пользователя распределено экспоненциально,
+        популярность авторов — по степенному закону, поэтому у немногих
+        авторов большинство подписчиков.
+
+        :return: Количество подписок.
+        """
+
+        authors = list(users)
+        self.rnd.shuffle(authors)
+        weights = zipf_weights(len(authors), self.exponent)
+        return self.insert(
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id in users
+            for author_id in sample_distinct(
+                self.rnd, authors, weights,
+                draw_count(self.rnd, average, len(authors) - 1),
+                exclude=user_id
+            )
+        )
+
+    def create_lists(self, model, users, recipes, average):
+        """
+        Заполняет избранное или корзины пользователей.
+
+        :return: Количество записей.
+        """
+
+        recipes = list(recipes)
+        self.rnd.shuffle(recipes)
+        weights = zipf_weights(len(recipes), self.exponent)
+        return self.insert(
+            model(user_id=user_id, recipe_id=recipe_id)
+            for user_id in users
+            for recipe_id in sample_distinct(
+                self.rnd, recipes, weights,
+                draw_count(self.rnd, average, len(recipes))
+            )
+        )
+
+    def insert(self, objects):
+        """Вставляет объекты одной модели пачками."""
+
+        objects = iter(objects)
+        total = 0
+        while True:
+            batch = [obj for _, obj in zip(range(self.batch_size), objects)]
+            if not batch:
+                return total
+            type(batch[0]).objects.bulk_create(batch)
+            total += len(batch)
+
+    def fill_derived(self, users, recipes):
+        """
+        Заполняет счётчики и сводные списки продуктов.
+
+        bulk_create не отправляет сигналы, поэтому производные данные
+        считаются одним запросом на каждую таблицу. Рецепты могли
+        получить id удалённых ранее рецептов, поэтому их кеш сбрасывается
+        сменой версии справочников.
+        """
+
+        ranges = {User: users, Recipe: recipes}
+        for related_model, (model, field, counter) in COUNTERS.items():
+            model.objects.filter(
+                pk__range=(ranges[model][0], ranges[model][-1])
+            ).update(**{counter: count_related(related_model, field)})
+        self.fill_shopping_lists(user_id__range=(users[0], users[-1]))
+        bump_catalog_version()
+
+    def fill_shopping_lists(self, **filters):
+        """Строит сводные списки продуктов пользователей по корзинам."""
+
+        ShoppingListIngredient.objects.bulk_create(
+            (
+                ShoppingListIngredient(**row)
+                for row in ShoppingListIngredient.objects.from_shopping_carts(
+                ).filter(**filters)
+            ),
+            batch_size=self.batch_size
+        )
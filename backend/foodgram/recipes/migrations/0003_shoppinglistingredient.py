@@ -0,0 +1,52 @@
+# Generated by Django 3.2.16 on 2026-10-18 16:39
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_shopping_lists(apps, schema_editor):
+    AmountIngredientRecipe = apps.get_model('recipes', 'AmountIngredientRecipe')
+    ShoppingListIngredient = apps.get_model('recipes', 'ShoppingListIngredient')
+    totals = AmountIngredientRecipe.objects.filter(
+        recipe__shoppingcart__isnull=False
+    ).order_by().values(
+        'ingredient_id',
+        user_id=models.F('recipe__shoppingcart__user_id'),
+    ).annotate(total_amount=models.Sum('amount'))
+    ShoppingListIngredient.objects.bulk_create(
+        (ShoppingListIngredient(**total) for total in totals.iterator()),
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0002_add_tags'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingListIngredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_amount', models.PositiveIntegerField(default=0, verbose_name='Количество')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list', to='recipes.ingredient', verbose_name='Ингредиент')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Список продуктов',
+                'verbose_name_plural': 'Списки продуктов',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shoppinglistingredient',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_shopping_list_ingredient'),
+        ),
+        migrations.RunPython(
+            fill_shopping_lists,
+            migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 3.2.16 on 2026-10-18 16:48
+
+from django.db import migrations, models
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    """Объединяет повторяющиеся ингредиенты рецепта в одну строку."""
+
+    AmountIngredientRecipe = apps.get_model(
+        'recipes', 'AmountIngredientRecipe'
+    )
+    duplicates = AmountIngredientRecipe.objects.order_by().values(
+        'recipe_id', 'ingredient_id'
+    ).annotate(
+        total=models.Sum('amount'),
+        rows=models.Count('pk'),
+        keep=models.Min('pk'),
+    ).filter(rows__gt=1)
+    for duplicate in duplicates.iterator():
+        AmountIngredientRecipe.objects.filter(
+            pk=duplicate['keep']
+        ).update(amount=min(duplicate['total'], 32767))
+        AmountIngredientRecipe.objects.filter(
+            recipe_id=duplicate['recipe_id'],
+            ingredient_id=duplicate['ingredient_id'],
+        ).exclude(pk=duplicate['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_tags_mask'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients,
+            migrations.RunPython.noop
+        ),
+        migrations.AddIndex(
+            model_name='favorite',
+            index=models.Index(fields=['recipe', 'user'], name='favorite_recipe_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', '-pub_date', '-id'], name='recipe_author_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shoppingcart',
+            index=models.Index(fields=['recipe', 'user'], name='shoppingcart_recipe_user_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='amountingredientrecipe',
+            constraint=models.UniqueConstraint(fields=('recipe', 'ingredient'), name='unique_recipe_ingredient'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 3.2.16 on 2026-10-18 16:51
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+COUNTERS = (
+    ('recipes', 'Recipe', 'favorites_count', 'recipes', 'Favorite', 'recipe'),
+    ('recipes', 'Recipe', 'in_carts_count',
+     'recipes', 'ShoppingCart', 'recipe'),
+    ('users', 'User', 'recipes_count', 'recipes', 'Recipe', 'author'),
+    ('users', 'User', 'followers_count', 'recipes', 'Follow', 'author'),
+)
+
+
+def fill_counters(apps, schema_editor):
+    """Заполняет счётчики по существующим записям."""
+
+    for app, model, counter, related_app, related, field in COUNTERS:
+        related_objects = apps.get_model(related_app, related).objects
+        apps.get_model(app, model).objects.update(**{
+            counter: Coalesce(Subquery(
+                related_objects.filter(**{field: OuterRef('pk')}).order_by(
+                ).values(field).annotate(total=Count('pk')).values('total')
+            ), 0)
+        })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_hot_path_indexes'),
+        ('users', '0004_user_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество добавлений в избранное'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество добавлений в корзину'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
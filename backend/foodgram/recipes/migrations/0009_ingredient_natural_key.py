@@ -0,0 +1,70 @@
+# Generated by Django 3.2.16 on 2026-10-18 16:53
+
+from django.db import migrations, models
+
+
+def merge_into(queryset, keep, amount_field, key_field):
+    """Переносит ссылки на ингредиент-дубль на оставляемый ингредиент."""
+
+    for row in queryset:
+        existing = queryset.model.objects.filter(
+            ingredient=keep, **{key_field: getattr(row, key_field)}
+        ).first()
+        if existing is None:
+            row.ingredient = keep
+            row.save(update_fields=['ingredient'])
+            continue
+        setattr(existing, amount_field,
+                getattr(existing, amount_field) + getattr(row, amount_field))
+        existing.save(update_fields=[amount_field])
+        row.delete()
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    """Объединяет ингредиенты с одинаковыми названием и единицей."""
+
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    AmountIngredientRecipe = apps.get_model(
+        'recipes', 'AmountIngredientRecipe'
+    )
+    ShoppingListIngredient = apps.get_model(
+        'recipes', 'ShoppingListIngredient'
+    )
+    duplicates = Ingredient.objects.order_by().values(
+        'name', 'measurement_unit'
+    ).annotate(
+        rows=models.Count('pk'), keep=models.Min('pk')
+    ).filter(rows__gt=1)
+    for duplicate in duplicates:
+        keep = Ingredient.objects.get(pk=duplicate['keep'])
+        for ingredient in Ingredient.objects.filter(
+            name=duplicate['name'],
+            measurement_unit=duplicate['measurement_unit'],
+        ).exclude(pk=keep.pk):
+            merge_into(
+                AmountIngredientRecipe.objects.filter(ingredient=ingredient),
+                keep, 'amount', 'recipe_id'
+            )
+            merge_into(
+                ShoppingListIngredient.objects.filter(ingredient=ingredient),
+                keep, 'total_amount', 'user_id'
+            )
+            ingredient.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients,
+            migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(fields=('name', 'measurement_unit'), name='unique_ingredient_unit'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 3.2.16 on 2026-10-18 17:42
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_recipe_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.UUIDField(default=uuid.uuid4, verbose_name='Версия')),
+            ],
+            options={
+                'verbose_name': 'Версия справочников',
+                'verbose_name_plural': 'Версия справочников',
+            },
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='cache_version',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, verbose_name='Версия данных в кеше'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 3.2.16 on 2026-10-18 17:55
+
+from django.db import migrations
+
+POSTGRES_FORWARD = (
+    'CREATE FUNCTION recipe_tag_bits(mask bigint) RETURNS integer[] '
+    'LANGUAGE sql IMMUTABLE PARALLEL SAFE AS $$ '
+    "SELECT coalesce(array_agg(bit), '{}') "
+    'FROM generate_series(0, 62) AS bit '
+    'WHERE mask & (1::bigint << bit) <> 0 $$',
+    'CREATE INDEX recipe_tag_bits_idx ON recipes_recipe '
+    'USING gin (recipe_tag_bits(tags_mask))',
+)
+POSTGRES_BACKWARD = (
+    'DROP INDEX IF EXISTS recipe_tag_bits_idx',
+    'DROP FUNCTION IF EXISTS recipe_tag_bits(bigint)',
+)
+
+
+def run_for_vendor(postgres):
+    """Выполняет SQL только в PostgreSQL."""
+
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in postgres:
+            schema_editor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_cache_versions'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_for_vendor(POSTGRES_FORWARD),
+            run_for_vendor(POSTGRES_BACKWARD),
+        ),
+    ]
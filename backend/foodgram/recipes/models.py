@@ -1,13 +1,60 @@
+import uuid
+from collections import defaultdict
+
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.search import SearchVectorField
+from django.core.exceptions import EmptyResultSet, ValidationError
 from django.core.validators import MinValueValidator
-from django.db import models
-from django.db.models import CheckConstraint, F, Q, UniqueConstraint
+from django.db import connections, models, transaction
+from django.db.models import (CheckConstraint, Exists, F, Func, IntegerField,
+                              OuterRef, Prefetch, Q, Sum, UniqueConstraint,
+                              Value, Window)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
+from users.mixins import CounterFieldsMixin
+
+from .search import search_recipes, update_search_index
 
 User = get_user_model()
 
 
+def delete_rows(queryset):
+    """
+    Удаляет строки кверисета одним запросом DELETE.
+
+    В отличие от QuerySet.delete() объекты не загружаются и сигналы
+    pre_delete и post_delete не отправляются, поэтому производные
+    данные вызывающий код обновляет сам.
+
+    :param queryset: Кверисет удаляемых строк.
+    :return: Количество удалённых строк.
+    """
+
+    meta = queryset.model._meta
+    try:
+        sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    except EmptyResultSet:
+        return 0
+    connection = connections[queryset.db]
+    quote_name = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote_name(meta.db_table)} '
+            f'WHERE {quote_name(meta.pk.column)} IN ({sql})',
+            params
+        )
+        return cursor.rowcount
+
+
 class Tag(models.Model):
-    """Теги для рецептов"""
+    """
+    Теги для рецептов.
+
+    Каждому тегу назначается номер бита в Recipe.tags_mask.
+    """
+
+    MAX_TAGS = 63
 
     name = models.CharField(
         max_length=200,
@@ -22,6 +69,11 @@ class Tag(models.Model):
     slug = models.SlugField(
         unique=True,
     )
+    bit = models.PositiveSmallIntegerField(
+        unique=True,
+        editable=False,
+        verbose_name='Бит в маске тегов рецепта',
+    )
 
     class Meta:
         verbose_name = 'Теги'
@@ -30,9 +82,31 @@ class Tag(models.Model):
     def __str__(self):
         return self.slug
 
+    def save(self, *args, **kwargs):
+        if self.bit is None:
+            used_bits = set(Tag.objects.values_list('bit', flat=True))
+            free_bits = [
+                bit for bit in range(self.MAX_TAGS) if bit not in used_bits
+            ]
+            if not free_bits:
+                raise ValidationError(
+                    f'Количество тегов не может быть больше {self.MAX_TAGS}'
+                )
+            self.bit = free_bits[0]
+        super().save(*args, **kwargs)
+
+    @property
+    def mask(self):
+        return 1 << self.bit
+
 
 class Ingredient(models.Model):
-    """Ингредиенты для рецепта"""
+    """
+    Ингредиенты для рецепта.
+
+    Естественный ключ — пара (name, measurement_unit), по нему
+    csv_import обновляет справочник без дублей.
+    """
 
     name = models.CharField(
         max_length=200,
@@ -46,12 +120,220 @@ class Ingredient(models.Model):
     class Meta:
         verbose_name = 'Ингредиенты'
         verbose_name_plural = 'Ингредиенты'
+        constraints = (
+            UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='unique_ingredient_unit'
+            ),
+        )
 
     def __str__(self):
         return self.name
 
 
-class Recipe(models.Model):
+class CatalogVersion(models.Model):
+    """
+    Версия справочников тегов и ингредиентов.
+
+    Читается из общего кеша (см. recipes.catalog), а в БД хранится,
+    чтобы после вытеснения записи из кеша версия осталась той же
+    для всех процессов и серверов.
+    """
+
+    version = models.UUIDField(
+        verbose_name='Версия',
+        default=uuid.uuid4,
+    )
+
+    class Meta:
+        verbose_name = 'Версия справочников'
+        verbose_name_plural = 'Версия справочников'
+
+    def __str__(self):
+        return self.version.hex
+
+
+class TagBits(Func):
+    """
+    Номера тегов из Recipe.tags_mask в виде массива (только PostgreSQL).
+
+    Функция recipe_tag_bits создаётся миграцией 0012 вместе
+    с GIN-индексом по её значению.
+    """
+
+    function = 'recipe_tag_bits'
+    output_field = ArrayField(IntegerField())
+
+
+class RecipeQuerySet(models.QuerySet):
+    """Кверисет рецептов с данными для сериализатора."""
+
+    def with_user_flags(self, user):
+        """
+        Добавляет признаки, зависящие от текущего пользователя.
+
+        :param user: Текущий пользователь.
+        :return: Кверисет с аннотациями is_favorited, is_in_shopping_cart
+                 и author_is_subscribed.
+        """
+
+        if user.is_anonymous:
+            false = Value(False, output_field=models.BooleanField())
+            return self.annotate(
+                is_favorited=false,
+                is_in_shopping_cart=false,
+                author_is_subscribed=false,
+            )
+        return self.annotate(
+            is_favorited=Exists(
+                Favorite.objects.filter(user=user, recipe=OuterRef('pk'))
+            ),
+            is_in_shopping_cart=Exists(
+                ShoppingCart.objects.filter(user=user, recipe=OuterRef('pk'))
+            ),
+            author_is_subscribed=Exists(
+                Follow.objects.filter(user=user, author=OuterRef('author'))
+            ),
+        )
+
+    @staticmethod
+    def get_related_lookups():
+        """Связанные данные рецепта, не зависящие от пользователя."""
+
+        return (
+            'tags',
+            Prefetch(
+                'amount_ingredients',
+                queryset=AmountIngredientRecipe.objects.select_related(
+                    'ingredient'
+                )
+            ),
+        )
+
+    def filter_tags(self, mask):
+        """
+        Оставляет рецепты, у которых есть хотя бы один тег из маски.
+
+        Фильтрация идёт по столбцу tags_mask без соединения с тегами.
+        В PostgreSQL условие записывается как пересечение массивов
+        номеров тегов и использует GIN-индекс recipe_tag_bits_idx,
+        в остальных БД проверяется побитовое И.
+
+        :param mask: Битовая маска тегов.
+        :return: Отфильтрованный кверисет.
+        """
+
+        if connections[self.db].vendor == 'postgresql':
+            return self.alias(tag_bits=TagBits('tags_mask')).filter(
+                tag_bits__overlap=[
+                    bit for bit in range(Tag.MAX_TAGS) if mask >> bit & 1
+                ]
+            )
+        return self.alias(
+            tags_match=F('tags_mask').bitand(mask)
+        ).filter(tags_match__gt=0)
+
+    def search(self, query):
+        """
+        Полнотекстовый поиск по названию и тексту рецепта.
+
+        :param query: Строка поиска.
+        :return: Кверисет, отсортированный по релевантности.
+        """
+
+        return search_recipes(self, query)
+
+    def refresh_search_index(self):
+        """Пересчитывает поисковый индекс рецептов кверисета."""
+
+        update_search_index(self)
+
+    def refresh_tags_mask(self):
+        """Пересчитывает tags_mask рецептов кверисета по их тегам."""
+
+        masks = defaultdict(int)
+        for recipe_id, bit in Recipe.tags.through.objects.filter(
+            recipe__in=self.values('pk')
+        ).values_list('recipe_id', 'tag__bit'):
+            masks[recipe_id] |= 1 << bit
+        recipes = list(self.order_by().only('pk'))
+        for recipe in recipes:
+            recipe.tags_mask = masks[recipe.pk]
+        Recipe.objects.bulk_update(recipes, ['tags_mask'], batch_size=1000)
+
+    def followed_by(self, user):
+        """
+        Рецепты авторов, на которых подписан пользователь.
+
+        :param user: Подписчик.
+        :return: Отфильтрованный кверисет.
+        """
+
+        return self.filter(
+            author__in=Follow.objects.filter(user=user).values('author')
+        )
+
+    def limit_feed(self, user, limit, position=None):
+        """
+        Ограничивает ленту подписок последними рецептами каждого автора.
+
+        В PostgreSQL для каждой подписки выполняется LATERAL-подзапрос,
+        который читает не больше limit рецептов автора после позиции
+        курсора по индексу (author, pub_date, id). Страница ленты всегда
+        находится среди этих рецептов. В других БД кверисет не меняется.
+
+        :param user: Подписчик.
+        :param limit: Количество рецептов на странице ленты.
+        :param position: Кортеж (pub_date, id) последнего рецепта
+            предыдущей страницы или None.
+        :return: Отфильтрованный кверисет.
+        """
+
+        if connections[self.db].vendor != 'postgresql':
+            return self
+        condition, params = '', []
+        if position is not None:
+            condition = 'AND (recipe.pub_date, recipe.id) < (%s, %s)'
+            params = list(position)
+        return self.filter(pk__in=RawSQL(
+            f'SELECT feed.id FROM {Follow._meta.db_table} AS follow '
+            f'CROSS JOIN LATERAL ('
+            f'SELECT recipe.id FROM {Recipe._meta.db_table} AS recipe '
+            f'WHERE recipe.author_id = follow.author_id {condition} '
+            f'ORDER BY recipe.pub_date DESC, recipe.id DESC LIMIT %s'
+            f') AS feed WHERE follow.user_id = %s',
+            (*params, limit, user.pk)
+        ))
+
+    def limit_per_author(self, limit):
+        """
+        Оставляет не более limit последних рецептов каждого автора.
+
+        Ограничение выполняется в БД оконной функцией ROW_NUMBER().
+
+        :param limit: Количество рецептов на одного автора.
+        :return: Отфильтрованный кверисет.
+        """
+
+        ranked = self.order_by().annotate(
+            row_number=Window(
+                expression=RowNumber(),
+                partition_by=F('author'),
+                order_by=(F('pub_date').desc(), F('pk').desc()),
+            )
+        ).values('pk', 'row_number')
+        try:
+            sql, params = ranked.query.sql_with_params()
+        except EmptyResultSet:
+            return self.none()
+        return self.filter(pk__in=RawSQL(
+            f'SELECT ranked.id FROM ({sql}) AS ranked '
+            f'WHERE ranked.row_number <= %s',
+            (*params, limit)
+        ))
+
+
+class Recipe(CounterFieldsMixin, models.Model):
     """Рецепт"""
 
     tags = models.ManyToManyField(
@@ -59,6 +341,11 @@ class Recipe(models.Model):
         related_name='recipes_tags',
         verbose_name='Тег',
     )
+    tags_mask = models.BigIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Битовая маска тегов',
+    )
     ingredients = models.ManyToManyField(
         Ingredient,
         through='AmountIngredientRecipe',
@@ -69,11 +356,14 @@ class Recipe(models.Model):
         verbose_name='Дата публикации',
         auto_now_add=True,
     )
+    # Поиск по автору обслуживает индекс recipe_author_pub_date_idx,
+    # отдельный индекс внешнего ключа был бы его префиксом.
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
         related_name='recipes',
         verbose_name='Автор',
+        db_index=False,
     )
     name = models.CharField(
         max_length=200,
@@ -83,6 +373,12 @@ class Recipe(models.Model):
         verbose_name='Изображение',
         upload_to='recipes/images/',
     )
+    image_variants = models.JSONField(
+        verbose_name='Уменьшенные копии изображения',
+        default=dict,
+        blank=True,
+        editable=False,
+    )
     text = models.TextField(
         verbose_name='Текст поста',
     )
@@ -93,11 +389,46 @@ class Recipe(models.Model):
             MinValueValidator(1, 'Количество должно быть не меньше 1')
         ]
     )
+    search_vector = SearchVectorField(
+        verbose_name='Поисковый вектор',
+        null=True,
+        editable=False,
+    )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='Количество добавлений в избранное',
+        default=0,
+        editable=False,
+    )
+    in_carts_count = models.PositiveIntegerField(
+        verbose_name='Количество добавлений в корзину',
+        default=0,
+        editable=False,
+    )
+    cache_version = models.UUIDField(
+        verbose_name='Версия данных в кеше',
+        default=uuid.uuid4,
+        editable=False,
+    )
+
+    counter_fields = ('favorites_count', 'in_carts_count')
+    background_fields = ('image_variants', 'search_vector', 'cache_version')
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'Рецепты'
         verbose_name_plural = 'Рецепты'
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
+        indexes = (
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='recipe_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='recipe_author_pub_date_idx'
+            ),
+        )
 
     def __str__(self):
         return self.name
@@ -129,6 +460,12 @@ class AmountIngredientRecipe(models.Model):
     class Meta:
         verbose_name = 'Количество ингредиентов'
         verbose_name_plural = 'Количество ингредиентов'
+        constraints = (
+            UniqueConstraint(
+                fields=['recipe', 'ingredient'],
+                name='unique_recipe_ingredient'
+            ),
+        )
 
 
 class BaseList(models.Model):
@@ -155,6 +492,12 @@ class BaseList(models.Model):
                 name='%(app_label)s_%(class)s_is_unique'
             ),
         )
+        indexes = (
+            models.Index(
+                fields=['recipe', 'user'],
+                name='%(class)s_recipe_user_idx'
+            ),
+        )
 
 
 class Favorite(BaseList):
@@ -166,12 +509,159 @@ class Favorite(BaseList):
 
 
 class ShoppingCart(BaseList):
-    """Список покупок пользователя"""
+    """
+    Список покупок пользователя.
+
+    Сводный список продуктов ShoppingListIngredient обновляют
+    обработчики сигналов post_save и post_delete (см. recipes.signals),
+    поэтому он остаётся верным и при удалении кверисетом или каскадом.
+    """
 
     class Meta(BaseList.Meta):
         verbose_name = 'Продуктовая корзина'
         verbose_name_plural = 'Продуктовые корзины'
 
+    def save(self, *args, **kwargs):
+        # Запись и изменение списка продуктов в post_save — одна транзакция
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+class ShoppingListQuerySet(models.QuerySet):
+    """Кверисет сводных списков продуктов."""
+
+    def apply_changes(self, user_ids, amounts):
+        """
+        Изменяет количество ингредиентов в списках продуктов пользователей.
+
+        Строки блокируются на время транзакции, строки с нулевым
+        количеством удаляются.
+
+        :param user_ids: id пользователей, чьи списки изменяются.
+        :param amounts: Словарь {id ингредиента: изменение количества}.
+        """
+
+        user_ids = list(user_ids)
+        amounts = {
+            ingredient_id: amount
+            for ingredient_id, amount in amounts.items() if amount
+        }
+        if not user_ids or not amounts:
+            return
+
+        with transaction.atomic():
+            self.bulk_create(
+                (
+                    self.model(
+                        user_id=user_id,
+                        ingredient_id=ingredient_id,
+                        total_amount=0
+                    )
+                    for user_id in user_ids for ingredient_id in amounts
+                ),
+                ignore_conflicts=True
+            )
+            items = list(self.select_for_update().filter(
+                user_id__in=user_ids,
+                ingredient_id__in=amounts
+            ))
+            for item in items:
+                item.total_amount += amounts[item.ingredient_id]
+            self.filter(
+                pk__in=[item.pk for item in items if item.total_amount <= 0]
+            ).delete()
+            self.bulk_update(
+                [item for item in items if item.total_amount > 0],
+                ['total_amount']
+            )
+
+    @staticmethod
+    def get_recipe_amounts(recipe_ids):
+        """
+        Суммарное количество каждого ингредиента в рецептах.
+
+        Читается только таблица ингредиентов рецептов, поэтому работает
+        и во время каскадного удаления самих рецептов.
+
+        :param recipe_ids: id рецептов.
+        :return: Словарь {id ингредиента: количество}.
+        """
+
+        return dict(
+            AmountIngredientRecipe.objects.filter(
+                recipe_id__in=recipe_ids
+            ).order_by().values_list('ingredient_id').annotate(
+                total=Sum('amount')
+            )
+        )
+
+    def add_recipes(self, user_ids, recipe_ids):
+        """Добавляет ингредиенты рецептов в списки продуктов."""
+
+        self.apply_changes(user_ids, self.get_recipe_amounts(recipe_ids))
+
+    def remove_recipes(self, user_ids, recipe_ids):
+        """Убирает ингредиенты рецептов из списков продуктов."""
+
+        self.apply_changes(user_ids, {
+            ingredient_id: -amount
+            for ingredient_id, amount
+            in self.get_recipe_amounts(recipe_ids).items()
+        })
+
+    def from_shopping_carts(self):
+        """
+        Вычисляет списки продуктов заново по корзинам покупок.
+
+        :return: Кверисет словарей с ключами user_id, ingredient_id
+            и total_amount.
+        """
+
+        return AmountIngredientRecipe.objects.filter(
+            recipe__shoppingcart__isnull=False
+        ).order_by().values(
+            'ingredient_id',
+            user_id=F('recipe__shoppingcart__user_id'),
+        ).annotate(total_amount=Sum('amount'))
+
+
+class ShoppingListIngredient(models.Model):
+    """
+    Сводный список продуктов пользователя.
+
+    Хранит суммарное количество каждого ингредиента из рецептов
+    в корзине покупок пользователя.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+        verbose_name='Ингредиент'
+    )
+    total_amount = models.PositiveIntegerField(
+        verbose_name='Количество',
+        default=0,
+    )
+
+    objects = ShoppingListQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Список продуктов'
+        verbose_name_plural = 'Списки продуктов'
+        constraints = (
+            UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_shopping_list_ingredient'
+            ),
+        )
+
 
 class Follow(models.Model):
     """Подписка на автора рецепта"""
@@ -0,0 +1,112 @@
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+SEARCH_CONFIG = 'russian'
+SQLITE_TABLE = 'recipes_recipe_fts'
+
+
+def get_search_vector():
+    """Выражение tsvector: название важнее текста рецепта."""
+
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('text', weight='B', config=SEARCH_CONFIG)
+    )
+
+
+def get_fts5_query(query):
+    """
+    Превращает строку поиска в запрос FTS5.
+
+    Каждое слово берётся в кавычки, поэтому спецсимволы FTS5 в запросе
+    пользователя не ломают синтаксис. Слова ищутся как префиксы.
+    """
+
+    words = (word.replace('"', '""') for word in query.split())
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def update_search_index(queryset):
+    """
+    Обновляет поисковый индекс для рецептов кверисета.
+
+    :param queryset: Кверисет рецептов.
+    """
+
+    connection = connections[queryset.db]
+    if connection.vendor == 'postgresql':
+        queryset.update(search_vector=get_search_vector())
+    elif connection.vendor == 'sqlite':
+        rows = list(queryset.order_by().values_list('pk', 'name', 'text'))
+        delete_from_search_index([pk for pk, *_ in rows], queryset.db)
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {SQLITE_TABLE} (rowid, name, text) '
+                f'VALUES (%s, %s, %s)',
+                rows
+            )
+
+
+def delete_from_search_index(recipe_ids, using=DEFAULT_DB_ALIAS):
+    """
+    Удаляет рецепты из поискового индекса SQLite.
+
+    :param recipe_ids: id рецептов.
+    :param using: Псевдоним БД.
+    """
+
+    connection = connections[using]
+    if connection.vendor != 'sqlite' or not recipe_ids:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {SQLITE_TABLE} '
+            f'WHERE rowid IN ({", ".join(["%s"] * len(recipe_ids))})',
+            list(recipe_ids)
+        )
+
+
+def search_recipes(queryset, query):
+    """
+    Полнотекстовый поиск рецептов с ранжированием.
+
+    В PostgreSQL используется столбец search_vector с GIN-индексом,
+    в SQLite — виртуальная таблица FTS5. В остальных БД выполняется
+    поиск подстроки без ранжирования.
+
+    :param queryset: Кверисет рецептов.
+    :param query: Строка поиска.
+    :return: Кверисет с аннотацией rank, отсортированный по ней.
+    """
+
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        search_query = SearchQuery(
+            query, config=SEARCH_CONFIG, search_type='websearch'
+        )
+        queryset = queryset.filter(search_vector=search_query).annotate(
+            rank=SearchRank(F('search_vector'), search_query)
+        )
+    elif vendor == 'sqlite':
+        fts5_query = get_fts5_query(query)
+        if not fts5_query:
+            return queryset
+        table = queryset.model._meta.db_table
+        queryset = queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {SQLITE_TABLE} WHERE {SQLITE_TABLE} MATCH %s',
+            (fts5_query,)
+        )).annotate(rank=RawSQL(
+            f'SELECT -bm25({SQLITE_TABLE}, 2.0, 1.0) FROM {SQLITE_TABLE} '
+            f'WHERE {SQLITE_TABLE} MATCH %s '
+            f'AND {SQLITE_TABLE}.rowid = {table}.id',
+            (fts5_query,),
+            output_field=FloatField()
+        ))
+    else:
+        queryset = queryset.filter(
+            Q(name__icontains=query) | Q(text__icontains=query)
+        ).annotate(rank=Value(1.0, output_field=FloatField()))
+    return queryset.order_by('-rank', '-pub_date', '-pk')
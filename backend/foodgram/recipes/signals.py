@@ -0,0 +1,221 @@
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_save)
+from django.dispatch import receiver
+
+from .catalog import bump_catalog_version, bump_recipe_versions
+from .counters import change_counter
+from .models import (AmountIngredientRecipe, Favorite, Follow, Ingredient,
+                     Recipe, ShoppingCart, ShoppingListIngredient, Tag)
+from .search import delete_from_search_index
+
+User = get_user_model()
+
+AUTHOR_FIELDS = {'username', 'email', 'first_name', 'last_name'}
+
+
+@receiver((post_save, post_delete), sender=Tag)
+@receiver((post_save, post_delete), sender=Ingredient)
+def update_catalog_version(**kwargs):
+    """Меняет версию справочников при изменении тега или ингредиента."""
+
+    bump_catalog_version()
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def update_tags_mask(instance, action, reverse, pk_set, **kwargs):
+    """Синхронизирует Recipe.tags_mask с тегами рецепта."""
+
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        instance.tags_mask = sum(
+            tag.mask for tag in instance.tags.only('bit')
+        )
+        Recipe.objects.filter(pk=instance.pk).update(
+            tags_mask=instance.tags_mask
+        )
+    elif action == 'post_clear':
+        remove_tag_from_masks(instance)
+    else:
+        Recipe.objects.filter(pk__in=pk_set).refresh_tags_mask()
+
+
+@receiver(post_delete, sender=Tag)
+def remove_tag_from_masks(instance, **kwargs):
+    """Убирает бит удалённого тега из масок рецептов."""
+
+    Recipe.objects.filter_tags(instance.mask).update(
+        tags_mask=F('tags_mask').bitand(~instance.mask)
+    )
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Follow)
+def increment_counter(instance, created, raw, **kwargs):
+    """Увеличивает денормализованный счётчик при создании записи."""
+
+    if created and not raw:
+        change_counter(instance, 1)
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Follow)
+def decrement_counter(instance, **kwargs):
+    """Уменьшает счётчик при удалении записи."""
+
+    change_counter(instance, -1)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_to_shopping_list(instance, created, raw, **kwargs):
+    """Добавляет ингредиенты рецепта в список продуктов пользователя."""
+
+    if created and not raw:
+        ShoppingListIngredient.objects.add_recipes(
+            [instance.user_id], [instance.recipe_id]
+        )
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def remove_from_shopping_list(instance, **kwargs):
+    """
+    Убирает ингредиенты рецепта из списка продуктов пользователя.
+
+    Срабатывает и при каскадном удалении рецепта или пользователя.
+    Если ингредиенты рецепта уже удалены, их количество вычли
+    обработчики удаления ингредиентов, и здесь вычитать нечего.
+    """
+
+    ShoppingListIngredient.objects.remove_recipes(
+        [instance.user_id], [instance.recipe_id]
+    )
+
+
+def get_cart_user_ids(recipe_id):
+    """id пользователей, у которых рецепт в корзине покупок."""
+
+    return ShoppingCart.objects.filter(
+        recipe_id=recipe_id
+    ).values_list('user_id', flat=True)
+
+
+@receiver(pre_save, sender=AmountIngredientRecipe)
+def remember_ingredient_amount(instance, raw, **kwargs):
+    """Запоминает сохранённые ингредиент и количество перед изменением."""
+
+    instance.saved_amount = None
+    if instance.pk is not None and not raw:
+        instance.saved_amount = AmountIngredientRecipe.objects.filter(
+            pk=instance.pk
+        ).values_list('ingredient_id', 'amount').first()
+
+
+@receiver(post_save, sender=AmountIngredientRecipe)
+def update_shopping_lists(instance, raw, **kwargs):
+    """
+    Переносит изменение ингредиента рецепта в списки продуктов.
+
+    Так списки остаются верными при правке рецепта в админке.
+    """
+
+    if raw:
+        return
+    changes = defaultdict(int)
+    changes[instance.ingredient_id] += instance.amount
+    saved_amount = getattr(instance, 'saved_amount', None)
+    if saved_amount is not None:
+        ingredient_id, amount = saved_amount
+        changes[ingredient_id] -= amount
+    ShoppingListIngredient.objects.apply_changes(
+        get_cart_user_ids(instance.recipe_id), changes
+    )
+
+
+@receiver(post_delete, sender=AmountIngredientRecipe)
+def remove_ingredient_from_shopping_lists(instance, **kwargs):
+    """Убирает удалённый ингредиент рецепта из списков продуктов."""
+
+    ShoppingListIngredient.objects.apply_changes(
+        get_cart_user_ids(instance.recipe_id),
+        {instance.ingredient_id: -instance.amount}
+    )
+
+
+@receiver(post_save, sender=Recipe)
+def update_search_index(instance, raw, using, update_fields, **kwargs):
+    """Обновляет поисковый индекс после сохранения рецепта."""
+
+    if raw or (update_fields and not {'name', 'text'} & set(update_fields)):
+        return
+    Recipe.objects.using(using).filter(pk=instance.pk).refresh_search_index()
+
+
+@receiver(post_delete, sender=Recipe)
+def remove_from_search_index(instance, using, **kwargs):
+    """Удаляет рецепт из поискового индекса."""
+
+    delete_from_search_index([instance.pk], using)
+
+
+def invalidate_recipes(recipe_ids):
+    """Сбрасывает кеш данных рецептов."""
+
+    bump_recipe_versions(recipe_ids)
+
+
+@receiver(post_save, sender=Recipe)
+def invalidate_recipe(instance, created, raw, **kwargs):
+    """
+    Сбрасывает кеш рецепта после его сохранения.
+
+    Новый рецепт получает версию при создании, и кеша для него ещё нет.
+    """
+
+    if not created and not raw:
+        instance.cache_version = bump_recipe_versions([instance.pk])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_tags(instance, action, reverse, pk_set, **kwargs):
+    """
+    Сбрасывает кеш рецептов после изменения их тегов.
+
+    При очистке рецептов тега pk_set не передаётся, поэтому рецепты
+    находятся до удаления связей, в той же транзакции.
+    """
+
+    if reverse and action == 'pre_clear':
+        invalidate_recipes(Recipe.tags.through.objects.filter(
+            tag=instance
+        ).values('recipe_id'))
+    elif action in ('post_add', 'post_remove'):
+        invalidate_recipes(pk_set if reverse else [instance.pk])
+    elif action == 'post_clear' and not reverse:
+        invalidate_recipes([instance.pk])
+
+
+@receiver((post_save, post_delete), sender=AmountIngredientRecipe)
+def invalidate_recipe_ingredients(instance, **kwargs):
+    """Сбрасывает кеш рецепта после изменения его ингредиентов."""
+
+    invalidate_recipes([instance.recipe_id])
+
+
+@receiver(post_save, sender=User)
+def invalidate_author_recipes(instance, created, update_fields, **kwargs):
+    """Сбрасывает кеш рецептов автора после изменения его данных."""
+
+    if created or (update_fields and not AUTHOR_FIELDS & set(update_fields)):
+        return
+    invalidate_recipes(
+        Recipe.objects.filter(author=instance).values_list('pk', flat=True)
+    )
@@ -0,0 +1,25 @@
+from jobs.queue import enqueue, task
+
+from .images import generate_image_variants
+
+task('recipes.generate_image_variants', max_attempts=3)(
+    generate_image_variants
+)
+
+
+def schedule_image_variants(recipe, stale_variants=None):
+    """
+    Ставит создание уменьшенных копий изображения в очередь задач.
+
+    Задача попадает в ту же транзакцию, что и изменение рецепта.
+
+    :param recipe: Рецепт с новым изображением.
+    :param stale_variants: Копии прежнего изображения, которые задача
+        удалит после создания новых.
+    """
+
+    enqueue(
+        'recipes.generate_image_variants',
+        recipe_id=recipe.pk,
+        stale_variants=stale_variants or {},
+    )
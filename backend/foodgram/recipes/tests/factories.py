@@ -0,0 +1,63 @@
+from itertools import count
+
+from django.contrib.auth import get_user_model
+from recipes.models import AmountIngredientRecipe, Ingredient, Recipe, Tag
+
+User = get_user_model()
+
+sequence = count(1)
+
+
+def make_user(**kwargs):
+    """Создаёт пользователя с уникальными username и email."""
+
+    number = next(sequence)
+    kwargs.setdefault('username', f'user{number}')
+    kwargs.setdefault('email', f'user{number}@example.com')
+    kwargs.setdefault('first_name', 'Имя')
+    kwargs.setdefault('last_name', 'Фамилия')
+    return User.objects.create_user(password='password', **kwargs)
+
+
+def make_tag(**kwargs):
+    """Создаёт тег с уникальными названием, цветом и slug."""
+
+    number = next(sequence)
+    kwargs.setdefault('name', f'Тег {number}')
+    kwargs.setdefault('color', f'#{number:06x}')
+    kwargs.setdefault('slug', f'tag{number}')
+    return Tag.objects.create(**kwargs)
+
+
+def make_ingredient(**kwargs):
+    """Создаёт ингредиент с уникальным названием."""
+
+    kwargs.setdefault('name', f'Ингредиент {next(sequence)}')
+    kwargs.setdefault('measurement_unit', 'г')
+    return Ingredient.objects.create(**kwargs)
+
+
+def make_recipe(author, amounts=None, tags=(), **kwargs):
+    """
+    Создаёт рецепт автора.
+
+    :param author: Автор рецепта.
+    :param amounts: Словарь {ингредиент: количество}.
+    :param tags: Теги рецепта.
+    :return: Созданный рецепт.
+    """
+
+    kwargs.setdefault('name', f'Рецепт {next(sequence)}')
+    kwargs.setdefault('text', 'Текст рецепта')
+    kwargs.setdefault('cooking_time', 10)
+    kwargs.setdefault('image', 'recipes/images/test.png')
+    recipe = Recipe.objects.create(author=author, **kwargs)
+    AmountIngredientRecipe.objects.bulk_create(
+        AmountIngredientRecipe(
+            recipe=recipe, ingredient=ingredient, amount=amount
+        )
+        for ingredient, amount in (amounts or {}).items()
+    )
+    if tags:
+        recipe.tags.set(tags)
+    return recipe
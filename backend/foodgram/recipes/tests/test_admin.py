@@ -0,0 +1,83 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from recipes.models import (AmountIngredientRecipe, ShoppingCart,
+                            ShoppingListIngredient)
+
+from .factories import make_ingredient, make_recipe, make_tag, make_user
+
+User = get_user_model()
+
+
+class AdminShoppingListTests(TestCase):
+    """Правка количества ингредиентов в админке меняет списки продуктов."""
+
+    def setUp(self):
+        cache.clear()
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='password'
+        )
+        self.client.force_login(admin)
+        self.buyer = make_user()
+        self.tag = make_tag()
+        self.salt = make_ingredient()
+        self.sugar = make_ingredient()
+        self.recipe = make_recipe(
+            make_user(), {self.salt: 5, self.sugar: 10}, tags=[self.tag]
+        )
+        ShoppingCart.objects.create(user=self.buyer, recipe=self.recipe)
+
+    def get_shopping_list(self):
+        return dict(ShoppingListIngredient.objects.filter(
+            user=self.buyer
+        ).values_list('ingredient_id', 'total_amount'))
+
+    def test_list_editable_amount(self):
+        amount = AmountIngredientRecipe.objects.get(ingredient=self.salt)
+
+        response = self.client.post(
+            '/admin/recipes/amountingredientrecipe/', {
+                'form-TOTAL_FORMS': 1,
+                'form-INITIAL_FORMS': 1,
+                'form-0-id': amount.pk,
+                'form-0-amount': 8,
+                '_save': 'Сохранить',
+            }
+        )
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.get_shopping_list(), {
+            self.salt.pk: 8, self.sugar.pk: 10,
+        })
+
+    def test_recipe_inline(self):
+        salt, sugar = AmountIngredientRecipe.objects.filter(
+            recipe=self.recipe
+        ).order_by('ingredient_id')
+
+        response = self.client.post(
+            f'/admin/recipes/recipe/{self.recipe.pk}/change/', {
+                'name': self.recipe.name,
+                'text': self.recipe.text,
+                'cooking_time': self.recipe.cooking_time,
+                'author': self.recipe.author_id,
+                'tags': [self.tag.pk],
+                'amount_ingredients-TOTAL_FORMS': 2,
+                'amount_ingredients-INITIAL_FORMS': 2,
+                'amount_ingredients-MIN_NUM_FORMS': 1,
+                'amount_ingredients-MAX_NUM_FORMS': 1000,
+                'amount_ingredients-0-id': salt.pk,
+                'amount_ingredients-0-recipe': self.recipe.pk,
+                'amount_ingredients-0-ingredient': self.salt.pk,
+                'amount_ingredients-0-amount': 3,
+                'amount_ingredients-1-id': sugar.pk,
+                'amount_ingredients-1-recipe': self.recipe.pk,
+                'amount_ingredients-1-ingredient': self.sugar.pk,
+                'amount_ingredients-1-amount': 10,
+                'amount_ingredients-1-DELETE': 'on',
+                '_save': 'Сохранить',
+            }
+        )
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.get_shopping_list(), {self.salt.pk: 3})
@@ -0,0 +1,81 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase
+from recipes.models import Favorite, Follow, Recipe, ShoppingCart
+
+from .factories import make_recipe, make_user
+
+User = get_user_model()
+
+
+class CounterTests(TestCase):
+    """Денормализованные счётчики пользователей и рецептов."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = make_user()
+        self.user = make_user()
+        self.recipe = make_recipe(self.author)
+
+    def refresh(self):
+        self.author.refresh_from_db()
+        self.recipe.refresh_from_db()
+
+    def test_create_and_delete(self):
+        Follow.objects.create(user=self.user, author=self.author)
+        Favorite.objects.create(user=self.user, recipe=self.recipe)
+        ShoppingCart.objects.create(user=self.user, recipe=self.recipe)
+        self.refresh()
+
+        self.assertEqual(self.author.recipes_count, 1)
+        self.assertEqual(self.author.followers_count, 1)
+        self.assertEqual(self.recipe.favorites_count, 1)
+        self.assertEqual(self.recipe.in_carts_count, 1)
+
+        Favorite.objects.filter(user=self.user).delete()
+        self.user.delete()
+        self.refresh()
+
+        self.assertEqual(self.author.followers_count, 0)
+        self.assertEqual(self.recipe.favorites_count, 0)
+        self.assertEqual(self.recipe.in_carts_count, 0)
+
+    def test_stale_user_save_keeps_counters(self):
+        stale_author = User.objects.get(pk=self.author.pk)
+        Follow.objects.create(user=self.user, author=self.author)
+
+        stale_author.set_password('new-password')
+        stale_author.save()
+        self.refresh()
+
+        self.assertEqual(self.author.followers_count, 1)
+        self.assertEqual(self.author.recipes_count, 1)
+        self.assertTrue(self.author.check_password('new-password'))
+
+    def test_stale_recipe_save_keeps_counters(self):
+        stale_recipe = Recipe.objects.get(pk=self.recipe.pk)
+        Favorite.objects.create(user=self.user, recipe=self.recipe)
+        ShoppingCart.objects.create(user=self.user, recipe=self.recipe)
+
+        stale_recipe.name = 'Новое название'
+        stale_recipe.save()
+        self.refresh()
+
+        self.assertEqual(self.recipe.name, 'Новое название')
+        self.assertEqual(self.recipe.favorites_count, 1)
+        self.assertEqual(self.recipe.in_carts_count, 1)
+
+    def test_stale_recipe_save_keeps_background_fields(self):
+        stale_recipe = Recipe.objects.get(pk=self.recipe.pk)
+        variants = {'card': {'webp': 'recipes/images/variants/a.webp'}}
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            image_variants=variants
+        )
+
+        stale_recipe.name = 'Новое название'
+        stale_recipe.save()
+        self.refresh()
+
+        self.assertEqual(self.recipe.name, 'Новое название')
+        self.assertEqual(self.recipe.image_variants, variants)
+        self.assertEqual(self.recipe.cache_version, stale_recipe.cache_version)
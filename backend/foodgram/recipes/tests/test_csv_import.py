@@ -0,0 +1,64 @@
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+from recipes.models import (AmountIngredientRecipe, Ingredient, Recipe,
+                            ShoppingCart, ShoppingListIngredient, Tag)
+
+from .factories import make_ingredient, make_recipe, make_user
+
+
+class CsvImportTests(TestCase):
+    """Импорт справочников командой csv_import."""
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.ingredients = os.path.join(directory.name, 'ingredients.csv')
+        self.tags = os.path.join(directory.name, 'tags.csv')
+        with open(self.ingredients, 'w', encoding='utf-8') as file:
+            file.write('соль,г\nсахар,г\nсахар,кг\n')
+        with open(self.tags, 'w', encoding='utf-8') as file:
+            file.write('Завтрак,#dce61e,breakfast\nОбед,#0abf28,lunch\n')
+
+    def import_files(self, *args):
+        call_command('csv_import', *args, stdout=StringIO())
+
+    def test_repeated_import(self):
+        self.import_files(self.ingredients, self.tags)
+        counts = Ingredient.objects.count(), Tag.objects.count()
+
+        self.import_files(self.ingredients, self.tags)
+
+        self.assertEqual(counts[0], 3)
+        self.assertEqual(
+            (Ingredient.objects.count(), Tag.objects.count()), counts
+        )
+
+    def test_clear(self):
+        ingredient = make_ingredient()
+        recipe = make_recipe(make_user(), amounts={ingredient: 100})
+        ShoppingCart.objects.create(user=make_user(), recipe=recipe)
+        make_ingredient()
+
+        with mock.patch(
+            'recipes.ingredient_index.bump_catalog_version'
+        ) as bump_catalog_version, mock.patch(
+            'recipes.signals.bump_catalog_version'
+        ) as bump_on_delete:
+            self.import_files('--clear')
+
+        bump_catalog_version.assert_called_once_with()
+        bump_on_delete.assert_not_called()
+        self.assertFalse(Ingredient.objects.exists())
+        self.assertFalse(AmountIngredientRecipe.objects.exists())
+        self.assertFalse(ShoppingListIngredient.objects.exists())
+        self.assertNotEqual(
+            Recipe.objects.get(pk=recipe.pk).cache_version,
+            recipe.cache_version
+        )
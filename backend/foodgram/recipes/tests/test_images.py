@@ -0,0 +1,86 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from PIL import Image
+from recipes.images import generate_image_variants, render_variant
+from recipes.models import Recipe
+
+from .factories import make_recipe, make_user
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def save_image(name):
+    """Сохраняет в хранилище небольшое PNG-изображение."""
+
+    buffer = BytesIO()
+    Image.new('RGB', (32, 32), 'red').save(buffer, format='PNG')
+    return default_storage.save(
+        f'recipes/images/{name}.png', ContentFile(buffer.getvalue())
+    )
+
+
+def get_names(variants):
+    return {name for formats in variants.values() for name in formats.values()}
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImageVariantsTests(TestCase):
+    """Уменьшенные копии изображения рецепта."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.recipe = make_recipe(make_user(), image=save_image('old'))
+        generate_image_variants(self.recipe.pk)
+        self.recipe.refresh_from_db()
+        self.old_names = get_names(self.recipe.image_variants)
+
+    def assert_exist(self, names, exist=True):
+        for name in names:
+            self.assertEqual(default_storage.exists(name), exist, name)
+
+    def test_variants_created(self):
+        self.assertEqual(len(self.old_names), 6)
+        self.assert_exist(self.old_names)
+
+    def test_stale_variants_deleted_after_image_change(self):
+        stale_variants = self.recipe.image_variants
+        Recipe.objects.filter(pk=self.recipe.pk).update(
+            image=save_image('new'), image_variants={}
+        )
+
+        generate_image_variants(self.recipe.pk, stale_variants)
+
+        self.recipe.refresh_from_db()
+        new_names = get_names(self.recipe.image_variants)
+        self.assertEqual(len(new_names), 6)
+        self.assert_exist(new_names)
+        self.assert_exist(self.old_names, exist=False)
+
+    def test_image_changed_during_processing(self):
+        new_image = save_image('new')
+
+        def change_image(*args):
+            Recipe.objects.filter(pk=self.recipe.pk).update(
+                image=new_image, image_variants={}
+            )
+            return render_variant(*args)
+
+        with mock.patch('recipes.images.render_variant',
+                        side_effect=change_image):
+            generate_image_variants(self.recipe.pk)
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image_variants, {})
+        self.assert_exist(self.old_names, exist=False)
@@ -0,0 +1,133 @@
+from django.core.cache import cache
+from django.test import TestCase
+from recipes.models import (AmountIngredientRecipe, Recipe, ShoppingCart,
+                            ShoppingListIngredient)
+
+from .factories import make_ingredient, make_recipe, make_user
+
+
+class ShoppingListTests(TestCase):
+    """Сводный список продуктов ShoppingListIngredient."""
+
+    def setUp(self):
+        cache.clear()
+        self.author = make_user()
+        self.user = make_user()
+        self.other_user = make_user()
+        self.salt = make_ingredient()
+        self.sugar = make_ingredient()
+        self.soup = make_recipe(self.author, {self.salt: 5, self.sugar: 10})
+        self.cake = make_recipe(self.author, {self.sugar: 100})
+        for user in (self.user, self.other_user):
+            ShoppingCart.objects.create(user=user, recipe=self.soup)
+            ShoppingCart.objects.create(user=user, recipe=self.cake)
+
+    def get_shopping_list(self, user):
+        return dict(ShoppingListIngredient.objects.filter(
+            user=user
+        ).values_list('ingredient_id', 'total_amount'))
+
+    def assert_shopping_lists_consistent(self):
+        """Сводный список совпадает с пересчитанным по корзинам."""
+
+        expected = {
+            (row['user_id'], row['ingredient_id']): row['total_amount']
+            for row in ShoppingListIngredient.objects.from_shopping_carts()
+        }
+        actual = {
+            (user_id, ingredient_id): total_amount
+            for user_id, ingredient_id, total_amount
+            in ShoppingListIngredient.objects.values_list(
+                'user_id', 'ingredient_id', 'total_amount'
+            )
+        }
+        self.assertEqual(actual, expected)
+
+    def test_add_to_cart(self):
+        self.assertEqual(self.get_shopping_list(self.user), {
+            self.salt.pk: 5, self.sugar.pk: 110,
+        })
+        self.assert_shopping_lists_consistent()
+
+    def test_delete_cart_instance(self):
+        ShoppingCart.objects.get(user=self.user, recipe=self.cake).delete()
+
+        self.assertEqual(self.get_shopping_list(self.user), {
+            self.salt.pk: 5, self.sugar.pk: 10,
+        })
+        self.assert_shopping_lists_consistent()
+
+    def test_delete_cart_queryset(self):
+        ShoppingCart.objects.filter(user=self.user).delete()
+
+        self.assertEqual(self.get_shopping_list(self.user), {})
+        self.assert_shopping_lists_consistent()
+
+    def test_delete_recipe_queryset_cascade(self):
+        Recipe.objects.filter(pk=self.soup.pk).delete()
+
+        self.assertEqual(self.get_shopping_list(self.user), {
+            self.sugar.pk: 100,
+        })
+        self.assert_shopping_lists_consistent()
+
+    def test_delete_recipe_instance_cascade(self):
+        self.cake.delete()
+
+        self.assertEqual(self.get_shopping_list(self.other_user), {
+            self.salt.pk: 5, self.sugar.pk: 10,
+        })
+        self.assert_shopping_lists_consistent()
+
+    def test_delete_cart_owner_cascade(self):
+        self.user.delete()
+
+        self.assert_shopping_lists_consistent()
+        self.assertEqual(self.get_shopping_list(self.other_user), {
+            self.salt.pk: 5, self.sugar.pk: 110,
+        })
+
+    def test_delete_author_cascade(self):
+        self.author.delete()
+
+        self.assertEqual(ShoppingListIngredient.objects.count(), 0)
+        self.assert_shopping_lists_consistent()
+
+    def test_change_ingredient_amount(self):
+        amount = AmountIngredientRecipe.objects.get(
+            recipe=self.soup, ingredient=self.salt
+        )
+        amount.amount = 7
+        amount.save()
+
+        self.assertEqual(self.get_shopping_list(self.user), {
+            self.salt.pk: 7, self.sugar.pk: 110,
+        })
+        self.assert_shopping_lists_consistent()
+
+    def test_replace_ingredient(self):
+        pepper = make_ingredient()
+        amount = AmountIngredientRecipe.objects.get(
+            recipe=self.soup, ingredient=self.salt
+        )
+        amount.ingredient = pepper
+        amount.save()
+
+        self.assertEqual(self.get_shopping_list(self.user), {
+            pepper.pk: 5, self.sugar.pk: 110,
+        })
+        self.assert_shopping_lists_consistent()
+
+    def test_add_and_remove_recipe_ingredient(self):
+        pepper = make_ingredient()
+        AmountIngredientRecipe.objects.create(
+            recipe=self.cake, ingredient=pepper, amount=2
+        )
+        AmountIngredientRecipe.objects.filter(
+            recipe=self.cake, ingredient=self.sugar
+        ).delete()
+
+        self.assertEqual(self.get_shopping_list(self.user), {
+            self.salt.pk: 5, self.sugar.pk: 10, pepper.pk: 2,
+        })
+        self.assert_shopping_lists_consistent()
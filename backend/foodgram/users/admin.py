@@ -1,4 +1,5 @@
 from django.contrib import admin
+from recipes.paginator import EstimatedCountPaginator
 
 from .models import User
 
@@ -6,10 +7,13 @@ from .models import User
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
     list_display = (
-        'id', 'username', 'email', 'first_name', 'last_name', 'role'
+        'id', 'username', 'email', 'first_name', 'last_name', 'role',
+        'recipes_count', 'followers_count'
     )
     search_fields = ('username', 'email')
-    list_filter = ('role', 'username', 'email')
+    list_filter = ('role',)
     list_display_links = ('username', 'email')
     list_editable = ('role',)
     list_per_page = 10
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
@@ -0,0 +1,32 @@
+class CounterFieldsMixin:
+    """
+    Модель с денормализованными счётчиками.
+
+    Счётчики из counter_fields изменяются только запросами UPDATE
+    с выражением F() (см. recipes.counters). Обычное сохранение
+    существующего объекта их не записывает, поэтому объект, загруженный
+    до изменения счётчика, не затирает его старым значением.
+
+    Поля из background_fields записывают фоновые задачи и обработчики
+    сигналов. Сохранение без update_fields их тоже пропускает, но их
+    можно явно перечислить в update_fields.
+    """
+
+    counter_fields = ()
+    background_fields = ()
+
+    def save(self, *args, update_fields=None, **kwargs):
+        if not self._state.adding and not kwargs.get('force_insert'):
+            if update_fields is None:
+                deferred = self.get_deferred_fields()
+                update_fields = [
+                    field.attname for field in self._meta.concrete_fields
+                    if not field.primary_key
+                    and field.attname not in deferred
+                    and field.attname not in self.background_fields
+                ]
+            update_fields = [
+                field for field in update_fields
+                if field not in self.counter_fields
+            ]
+        super().save(*args, update_fields=update_fields, **kwargs)